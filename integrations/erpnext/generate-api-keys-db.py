@@ -1,11 +1,24 @@
 #!/usr/bin/env python3
 """
 Script pour générer les clés API directement via la base de données
+
+Sans argument : rotation des clés de Administrator (erpnext-api-keys.json)
+Mode groupé   : rotation pour une liste ou un filtre d'utilisateurs, par lots
+                transactionnels sur une seule connexion, résultats en JSONL
+
+    python generate-api-keys-db.py --users svc-ocr,svc-n8n
+    python generate-api-keys-db.py --users-file users.txt --chunk-size 500
+    python generate-api-keys-db.py --user-type "System User" --role "Accounts User"
+    python generate-api-keys-db.py --email-like "%@tenant-hypervisual.ch" --dry-run
 """
 import pymysql
 import hashlib
 import secrets
 import json
+import os
+import sys
+import time
+import argparse
 
 # Configuration base de données
 DB_CONFIG = {
@@ -16,6 +29,25 @@ DB_CONFIG = {
     'database': 'erpnext'
 }
 
+ERPNEXT_URL = "http://localhost:8083"
+
+# Comptes système Frappe jamais concernés par une rotation groupée
+EXCLUDED_USERS = ('Guest',)
+
+def chunk_update_query(size):
+    """Un seul UPDATE ... CASE pour tout un lot (executemany n'est pas groupé par pymysql pour UPDATE)"""
+    cases = " ".join(["WHEN %s THEN %s"] * size)
+    placeholders = ", ".join(["%s"] * size)
+    return (f"UPDATE tabUser SET api_key = CASE name {cases} END, "
+            f"api_secret = CASE name {cases} END "
+            f"WHERE name IN ({placeholders})")
+
+def chunk_update_params(chunk):
+    """Paramètres de chunk_update_query, dans l'ordre des marqueurs"""
+    key_params = [value for user, key, _ in chunk for value in (user, key)]
+    secret_params = [value for user, _, secret in chunk for value in (user, secret)]
+    return key_params + secret_params + [user for user, _, _ in chunk]
+
 def generate_api_key():
     """Générer une clé API aléatoire"""
     return secrets.token_urlsafe(32)
@@ -49,7 +81,7 @@ def update_user_api_keys():
         result = {
             "api_key": api_key,
             "api_secret": api_secret,
-            "url": "http://localhost:8083",
+            "url": ERPNEXT_URL,
             "username": "Administrator"
         }
         
@@ -69,6 +101,152 @@ def update_user_api_keys():
         print(f"❌ Erreur : {str(e)}")
         return None
 
+def read_users_file(path):
+    """Un utilisateur par ligne ; lignes vides et commentaires (#) ignorés"""
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+def select_users(cursor, names=None, user_type=None, email_like=None, role=None,
+                 include_disabled=False):
+    """Utilisateurs ciblés, en une seule requête
+
+    names restreint à une liste explicite ; les autres critères s'ajoutent en ET.
+    Retourne (utilisateurs trouvés, noms demandés introuvables)
+    """
+    clauses = ["u.name NOT IN %s"]
+    params = [EXCLUDED_USERS]
+    if names:
+        clauses.append("u.name IN %s")
+        params.append(tuple(names))
+    if user_type:
+        clauses.append("u.user_type = %s")
+        params.append(user_type)
+    if email_like:
+        clauses.append("u.email LIKE %s")
+        params.append(email_like)
+    if role:
+        clauses.append("EXISTS (SELECT 1 FROM `tabHas Role` r "
+                       "WHERE r.parent = u.name AND r.parenttype = 'User' AND r.role = %s)")
+        params.append(role)
+    if not include_disabled:
+        clauses.append("u.enabled = 1")
+
+    cursor.execute(f"SELECT u.name FROM tabUser u WHERE {' AND '.join(clauses)} ORDER BY u.name",
+                   params)
+    found = [row[0] for row in cursor.fetchall()]
+    missing = sorted(set(names or ()) - set(found))
+    return found, missing
+
+def generate_credentials(users):
+    """Clé et secret de chaque utilisateur, générés en une passe"""
+    return [(user, generate_api_key(), generate_api_secret()) for user in users]
+
+def chunked(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def open_results(path):
+    """Fichier JSONL des résultats, lisible par le seul propriétaire (il contient des secrets)"""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    return os.fdopen(fd, 'w')
+
+def apply_credentials(connection, credentials, chunk_size, output):
+    """Écrit les clés par lots : une requête UPDATE et une transaction par lot
+
+    Chaque ligne JSONL est écrite après le commit de son lot ; un lot en échec
+    est annulé en entier et ses utilisateurs sont notés en erreur, sans secret.
+    Retourne (utilisateurs mis à jour, utilisateurs en erreur)
+    """
+    updated = failed = 0
+    with connection.cursor() as cursor:
+        for chunk in chunked(credentials, chunk_size):
+            try:
+                cursor.execute(chunk_update_query(len(chunk)), chunk_update_params(chunk))
+                connection.commit()
+            except pymysql.MySQLError as e:
+                connection.rollback()
+                failed += len(chunk)
+                for user, _, _ in chunk:
+                    output.write(json.dumps({"user": user, "status": "error", "error": str(e)}) + "\n")
+            else:
+                updated += len(chunk)
+                for user, key, secret in chunk:
+                    output.write(json.dumps({"user": user, "status": "ok", "api_key": key,
+                                             "api_secret": secret, "url": ERPNEXT_URL}) + "\n")
+            output.flush()
+    return updated, failed
+
+def bulk_update_api_keys(args):
+    """Rotation groupée des clés API ; retourne le code de sortie"""
+    names = list(args.users or [])
+    if args.users_file:
+        names.extend(read_users_file(args.users_file))
+    names = list(dict.fromkeys(names))  # dédoublonnage, ordre conservé
+
+    started = time.perf_counter()
+    connection = pymysql.connect(**DB_CONFIG, autocommit=False)
+    try:
+        with connection.cursor() as cursor:
+            users, missing = select_users(cursor, names, args.user_type, args.email_like,
+                                          args.role, args.include_disabled)
+        for name in missing:
+            print(f"⚠️  Utilisateur introuvable ou exclu : {name}")
+        if not users:
+            print("❌ Aucun utilisateur ne correspond")
+            return 1
+
+        print(f"👥 {len(users)} utilisateur(s) ciblé(s)")
+        if args.dry_run:
+            for user in users:
+                print(f"   - {user}")
+            return 0
+
+        credentials = generate_credentials(users)
+        with open_results(args.output) as output:
+            updated, failed = apply_credentials(connection, credentials, args.chunk_size, output)
+    finally:
+        connection.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ {updated} clé(s) renouvelée(s), {failed} en erreur, en {elapsed:.2f} s")
+    print(f"💾 Résultats : {args.output}")
+    return 1 if failed else 0
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Génération des clés API ERPNext via la base de données")
+    parser.add_argument('--users', type=lambda v: [u.strip() for u in v.split(',') if u.strip()],
+                        help="Utilisateurs séparés par des virgules")
+    parser.add_argument('--users-file', help="Fichier texte, un utilisateur par ligne")
+    parser.add_argument('--user-type', help="Filtre tabUser.user_type (ex. 'System User')")
+    parser.add_argument('--email-like', help="Filtre LIKE sur l'email (ex. '%%@tenant.ch')")
+    parser.add_argument('--role', help="Seulement les utilisateurs ayant ce rôle")
+    parser.add_argument('--include-disabled', action='store_true', help="Inclure les comptes désactivés")
+    parser.add_argument('--chunk-size', type=int, help="Utilisateurs par transaction (défaut 200)")
+    parser.add_argument('--output', help="Résultats JSONL (défaut erpnext-api-keys.jsonl)")
+    parser.add_argument('--dry-run', action='store_true', help="Lister les utilisateurs ciblés sans rien modifier")
+    args = parser.parse_args()
+    args.bulk = any((args.users, args.users_file, args.user_type, args.email_like, args.role))
+    if not args.bulk:
+        # Sans filtre, le script renouvelle les clés de Administrator : une option du
+        # mode groupé (--dry-run surtout) ne doit pas y conduire en silence
+        given = [flag for flag, value in (('--dry-run', args.dry_run), ('--output', args.output),
+                                          ('--chunk-size', args.chunk_size),
+                                          ('--include-disabled', args.include_disabled))
+                 if value not in (None, False)]
+        if given:
+            parser.error(f"{', '.join(given)} : mode groupé seulement, indiquer --users, --users-file, "
+                         "--user-type, --email-like ou --role")
+    if args.chunk_size is None:
+        args.chunk_size = 200
+    if args.chunk_size < 1:
+        parser.error("--chunk-size doit être positif")
+    args.output = args.output or 'erpnext-api-keys.jsonl'
+    return args
+
 if __name__ == "__main__":
+    args = parse_args()
+    if args.bulk:
+        print("🔑 Rotation groupée des clés API ERPNext...")
+        sys.exit(bulk_update_api_keys(args))
     print("🔑 Génération des clés API ERPNext...")
-    update_user_api_keys()
\ No newline at end of file
+    update_user_api_keys()
@@ -0,0 +1,267 @@
+"""
+Synchronisation Directus -> ERPNext : pipeline de générateurs et marque de reprise
+
+    pages Directus (curseur) -> documents ERPNext (mapping) -> lots -> écriture
+
+Chaque étape consomme la précédente au fil de l'eau : la mémoire reste bornée
+à une page plus les lots en cours d'écriture, quelle que soit la taille de la
+collection. Les lots sont écrits en parallèle (concurrence bornée) ; chacun
+coûte une lecture des documents existants puis au plus un insert_many et un
+bulk_update.
+
+La marque de reprise (date_updated) est enregistrée dans un fichier d'état
+après un run sans échec : le run suivant ne relit que les éléments créés ou
+modifiés depuis
+"""
+
+import os
+import json
+import time
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from sync_clients import INSERT_MANY_LIMIT, ERPNextError
+
+STATE_VERSION = 1
+
+# Une entrée par collection synchronisée.
+# fields : champ ERPNext -> champ Directus, liste de champs (valeurs non vides
+# jointes par ligne) ou {"field", "map", "default"} (valeur traduite)
+# create_defaults : posés seulement à la création, modifiables ensuite dans ERPNext
+# key_field : champ ERPNext (Data, unique) qui garde l'id Directus, clé de rapprochement
+SYNC_MAPPINGS = [
+    {"name": "companies",
+     "collection": "companies",
+     "doctype": "Customer",
+     "key_field": "directus_id",
+     "fields": {
+         "customer_name": "name",
+         "website": "website",
+         "customer_details": ["industry", "email", "phone", "address"],
+         "disabled": {"field": "status", "map": {"archived": 1, "inactive": 1}, "default": 0},
+     },
+     "create_defaults": {"customer_type": "Company", "customer_group": "Commercial",
+                         "territory": "Switzerland", "default_currency": "CHF"}},
+]
+
+class Mapping:
+    def __init__(self, name, collection, doctype, key_field, fields, create_defaults=None,
+                 primary_key="id", updated_field="date_updated", created_field="date_created"):
+        if not fields:
+            raise ValueError(f"Mapping {name}: fields requis")
+        self.name = name
+        self.collection = collection
+        self.doctype = doctype
+        self.key_field = key_field
+        self.fields = dict(fields)
+        self.create_defaults = dict(create_defaults or {})
+        self.primary_key = primary_key
+        self.updated_field = updated_field
+        self.created_field = created_field
+
+    @property
+    def source_fields(self):
+        """Champs Directus à lire : seulement ceux du mapping"""
+        wanted = [self.primary_key, self.updated_field, self.created_field]
+        for source in self.fields.values():
+            if isinstance(source, str):
+                wanted.append(source)
+            elif isinstance(source, list):
+                wanted.extend(source)
+            else:
+                wanted.append(source["field"])
+        return list(dict.fromkeys(wanted))
+
+    def changed_since(self, mark):
+        """Filtre Directus des éléments modifiés après mark
+
+        date_updated reste vide tant qu'un élément n'a jamais été modifié : sa date
+        de création fait alors foi
+        """
+        if mark is None:
+            return None
+        return {"_or": [
+            {self.updated_field: {"_gt": mark}},
+            {"_and": [{self.updated_field: {"_null": True}}, {self.created_field: {"_gt": mark}}]},
+        ]}
+
+    def to_doc(self, record):
+        """Champs ERPNext d'un élément Directus (sans doctype ni valeurs de création)"""
+        doc = {self.key_field: str(record[self.primary_key])}
+        for target, source in self.fields.items():
+            if isinstance(source, str):
+                value = record.get(source)
+            elif isinstance(source, list):
+                value = "\n".join(str(record[field]) for field in source if record.get(field)) or None
+            else:
+                raw = record.get(source["field"])
+                value = source.get("map", {}).get(raw, source.get("default", raw))
+            doc[target] = value
+        return doc
+
+def load_mappings(path=None):
+    """Mappings par défaut ou fichier JSON de même forme"""
+    if path:
+        with open(path) as f:
+            data = json.load(f)
+    else:
+        data = SYNC_MAPPINGS
+    return [Mapping(**mapping) for mapping in data]
+
+def default_state_path():
+    return os.path.join(os.path.expanduser("~"), ".cache", "directus-erpnext-sync.json")
+
+class SyncState:
+    """Marques de reprise par mapping et par couple d'instances Directus/ERPNext"""
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        self.entries = data.get("entries", {}) if data.get("version") == STATE_VERSION else {}
+
+    @staticmethod
+    def key(mapping, directus_url, erpnext_url):
+        return f"{mapping.name} {directus_url.rstrip('/')} -> {erpnext_url.rstrip('/')}"
+
+    def mark(self, key):
+        return self.entries.get(key, {}).get("high_water_mark")
+
+    def record(self, key, mark, stats):
+        self.entries[key] = {"high_water_mark": mark, "last_run": stats}
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"version": STATE_VERSION, "entries": self.entries}, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
+
+def read_records(directus, mapping, mark, page_size, counts):
+    """Éléments Directus modifiés depuis mark, page par page"""
+    for page in directus.iter_pages(mapping.collection, mapping.source_fields, page_size,
+                                    mapping.changed_since(mark), mapping.primary_key):
+        counts["read"] += len(page)
+        yield from page
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+def diff_batch(mapping, docs, existing):
+    """Répartit un lot en créations, mises à jour (champs modifiés seulement) et inchangés"""
+    to_create, to_update, unchanged = [], [], 0
+    for doc in docs:
+        current = existing.get(doc[mapping.key_field])
+        if current is None:
+            to_create.append({"doctype": mapping.doctype, **mapping.create_defaults, **doc})
+            continue
+        changes = {field: value for field, value in doc.items()
+                   if field != mapping.key_field and (current.get(field) or None) != (value or None)}
+        if changes:
+            to_update.append({"doctype": mapping.doctype, "docname": current["name"], **changes})
+        else:
+            unchanged += 1
+    return to_create, to_update, unchanged
+
+def write_batch(erpnext, mapping, docs, dry_run=False):
+    """Écrit un lot : une lecture de l'existant, un insert_many, un bulk_update
+
+    Un insert_many refusé (transactionnel) est rejoué document par document pour
+    isoler les éléments invalides. Retourne les compteurs et les erreurs du lot
+    """
+    result = {"created": 0, "updated": 0, "unchanged": 0, "failed": 0, "errors": []}
+    existing = erpnext.get_by_keys(mapping.doctype, mapping.key_field,
+                                   [doc[mapping.key_field] for doc in docs],
+                                   list(mapping.fields))
+    to_create, to_update, result["unchanged"] = diff_batch(mapping, docs, existing)
+    if dry_run:
+        result["created"], result["updated"] = len(to_create), len(to_update)
+        return result
+
+    if to_create:
+        try:
+            erpnext.insert_many(to_create)
+            result["created"] = len(to_create)
+        except ERPNextError:
+            for doc in to_create:
+                try:
+                    erpnext.insert(doc)
+                    result["created"] += 1
+                except ERPNextError as e:
+                    result["failed"] += 1
+                    result["errors"].append(f"{doc[mapping.key_field]}: {e}")
+
+    if to_update:
+        failed = erpnext.bulk_update(to_update)
+        result["updated"] = len(to_update) - len(failed)
+        result["failed"] += len(failed)
+        for failure in failed:
+            doc = failure.get("doc", {})
+            reason = (failure.get("exc") or "").strip().splitlines()
+            result["errors"].append(f"{doc.get('docname')}: {reason[-1] if reason else 'échec'}")
+    return result
+
+def sync_mapping(directus, erpnext, mapping, state, state_key, page_size=500, batch_size=100,
+                 concurrency=4, full=False, dry_run=False, progress=None):
+    """Synchronise une collection ; retourne les compteurs du run
+
+    Au plus concurrency lots sont en cours d'écriture : la lecture de Directus
+    se met en pause quand ils sont tous occupés. La marque n'avance qu'après
+    un run sans échec (les éléments en échec sont relus au run suivant)
+    """
+    started = time.perf_counter()
+    mark = None if full else state.mark(state_key)
+    # Relevée avant la lecture : ce qui change pendant le run sera relu au suivant
+    ceiling = directus.watermark(mapping.collection, [mapping.updated_field, mapping.created_field])
+    batch_size = max(1, min(batch_size, INSERT_MANY_LIMIT))
+
+    counts = {"read": 0, "created": 0, "updated": 0, "unchanged": 0, "failed": 0, "batches": 0}
+    errors = []
+
+    def collect(futures):
+        for future in futures:
+            try:
+                result = future.result()
+            except ERPNextError as e:
+                # Lot entier perdu (lecture de l'existant ou bulk_update en erreur)
+                result = {"failed": future.size, "errors": [str(e)]}
+            for name in ("created", "updated", "unchanged", "failed"):
+                counts[name] += result.get(name, 0)
+            errors.extend(result["errors"])
+            counts["batches"] += 1
+            if progress:
+                progress(counts)
+
+    records = read_records(directus, mapping, mark, page_size, counts)
+    docs = (mapping.to_doc(record) for record in records)
+    pending = set()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for batch in chunked(docs, batch_size):
+            if len(pending) >= concurrency:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            future = pool.submit(write_batch, erpnext, mapping, batch, dry_run)
+            future.size = len(batch)
+            pending.add(future)
+        collect(wait(pending).done)
+
+    counts["seconds"] = round(time.perf_counter() - started, 3)
+    counts["since"] = mark
+    counts["errors"] = errors[:50]
+    # Après un échec, le run suivant reprend la même fenêtre
+    new_mark = ceiling if counts["failed"] == 0 and ceiling else mark
+    if not dry_run:
+        state.record(state_key, new_mark, {name: value for name, value in counts.items() if name != "errors"})
+        state.save()
+    counts["high_water_mark"] = mark if dry_run else new_mark
+    return counts
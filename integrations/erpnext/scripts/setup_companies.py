@@ -1,64 +1,156 @@
+import os
+import json
+import time
+
 import frappe
 from frappe import _
 
-def setup_companies():
-    """Configurer les 5 entreprises dans ERPNext"""
-    
-    companies = [
-        {
-            "company_name": "HyperVisual",
-            "abbr": "HV",
-            "country": "Switzerland",
-            "default_currency": "CHF",
-            "domain": "Manufacturing",
-            "chart_of_accounts": "Switzerland - Chart of Accounts"
-        },
-        {
-            "company_name": "Dynamics",
-            "abbr": "DYN",
-            "country": "Switzerland", 
-            "default_currency": "CHF",
-            "domain": "Services",
-            "chart_of_accounts": "Switzerland - Chart of Accounts"
-        },
-        {
-            "company_name": "Lexia",
-            "abbr": "LEX",
-            "country": "Switzerland",
-            "default_currency": "CHF",
-            "domain": "Services",
-            "chart_of_accounts": "Switzerland - Chart of Accounts"
-        },
-        {
-            "company_name": "NKReality",
-            "abbr": "NKR",
-            "country": "Switzerland",
-            "default_currency": "CHF",
-            "domain": "Services",
-            "chart_of_accounts": "Switzerland - Chart of Accounts"
-        },
-        {
-            "company_name": "Etekout",
-            "abbr": "ETK",
-            "country": "Switzerland",
-            "default_currency": "CHF",
-            "domain": "Retail",
-            "chart_of_accounts": "Switzerland - Chart of Accounts"
-        }
-    ]
-    
+# Fichier déclaratif des entreprises (une entrée par société, clé company_name)
+COMPANIES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "companies.json")
+
+# Champs fixés à la création : ERPNext ne permet pas de les modifier ensuite
+# (abréviation des comptes, plan comptable, devise une fois des écritures passées)
+CREATE_ONLY_FIELDS = ("abbr", "country", "default_currency", "chart_of_accounts")
+
+def load_companies(path=None):
+    """Lire les entreprises depuis le fichier de données"""
+    with open(path or COMPANIES_FILE) as f:
+        companies = json.load(f)
+
+    names = set()
+    for company_data in companies:
+        name = company_data.get("company_name")
+        if not name or not company_data.get("abbr"):
+            frappe.throw(_("Entrée invalide (company_name et abbr requis): {0}").format(company_data))
+        if name in names:
+            frappe.throw(_("Entreprise en double dans le fichier: {0}").format(name))
+        names.add(name)
+    return companies
+
+def fetch_existing(companies):
+    """Toutes les entreprises existantes en une requête, indexées par nom"""
+    fields = sorted({field for company_data in companies for field in company_data} - {"company_name"})
+    rows = frappe.get_all("Company", fields=["name"] + fields)
+    return {row.name: row for row in rows}
+
+def diff_companies(companies, existing):
+    """Répartir les entreprises en créations, mises à jour et inchangées
+
+    Un écart sur un champ fixé à la création est signalé, jamais appliqué
+    """
+    to_create, to_update, unchanged, drift = [], [], [], []
     for company_data in companies:
-        if not frappe.db.exists("Company", company_data["company_name"]):
-            company = frappe.get_doc({
-                "doctype": "Company",
-                **company_data
-            })
-            company.insert()
-            print(f"✅ Entreprise créée: {company_data['company_name']}")
+        name = company_data["company_name"]
+        current = existing.get(name)
+        if current is None:
+            to_create.append(company_data)
+            continue
+
+        changes = {}
+        for field, value in company_data.items():
+            if field == "company_name" or (current.get(field) or None) == (value or None):
+                continue
+            if field in CREATE_ONLY_FIELDS:
+                drift.append((name, field, current.get(field), value))
+            else:
+                changes[field] = value
+        if changes:
+            to_update.append((name, changes))
         else:
-            print(f"⚠️ Entreprise existe déjà: {company_data['company_name']}")
-    
-    frappe.db.commit()
+            unchanged.append(name)
+    return to_create, to_update, unchanged, drift
+
+def chunked(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def apply_in_batches(items, batch_size, apply_one, label):
+    """Appliquer par lots, un commit par lot
+
+    Seuls les commits sont groupés : chaque entreprise reste écrite par son
+    propre insert() ou save(), qui passe par les contrôleurs de Company
+    (comptes, centres de coût, entrepôts par défaut), ce qu'un insert SQL
+    groupé sauterait. Chaque élément a son savepoint : un échec n'annule pas
+    le reste du lot. Retourne le nombre d'échecs
+    """
+    failures = 0
+    for batch in chunked(items, batch_size):
+        for position, item in enumerate(batch):
+            name = item["company_name"] if isinstance(item, dict) else item[0]
+            savepoint = f"company_{position}"
+            frappe.db.savepoint(savepoint)
+            try:
+                apply_one(item)
+                print(f"✅ Entreprise {label}: {name}")
+            except Exception as e:
+                frappe.db.rollback(save_point=savepoint)
+                failures += 1
+                print(f"❌ Échec ({label}) {name}: {e}")
+        frappe.db.commit()
+    return failures
+
+def create_company(company_data):
+    # Un document par entreprise : l'insert() crée aussi son plan comptable
+    frappe.get_doc({
+        "doctype": "Company",
+        **company_data
+    }).insert()
+
+def update_company(change):
+    name, changes = change
+    doc = frappe.get_doc("Company", name)
+    doc.update(changes)
+    doc.save()
+
+def setup_companies(data_file=None, batch_size=10, dry_run=False):
+    """Provisionner les entreprises du fichier de données dans ERPNext
+
+    Idempotent : une seule requête de lecture et aucune écriture si le site
+    est déjà à jour
+    """
+    timings = {}
+
+    started = time.perf_counter()
+    companies = load_companies(data_file)
+    timings["lecture"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    existing = fetch_existing(companies)
+    timings["existant"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    to_create, to_update, unchanged, drift = diff_companies(companies, existing)
+    timings["diff"] = time.perf_counter() - started
+
+    print(f"📋 {len(companies)} entreprise(s): {len(to_create)} à créer, "
+          f"{len(to_update)} à mettre à jour, {len(unchanged)} inchangée(s)")
+    for name, field, current, wanted in drift:
+        print(f"⚠️ {name}.{field} = {current!r} (fichier: {wanted!r}) : modifiable seulement à la création")
+    for name, changes in to_update:
+        print(f"   ✏️ {name}: {', '.join(sorted(changes))}")
+
+    create_failures = update_failures = 0
+    if not dry_run:
+        batch_size = max(1, int(batch_size))
+
+        started = time.perf_counter()
+        create_failures = apply_in_batches(to_create, batch_size, create_company, "créée")
+        timings["création"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        update_failures = apply_in_batches(to_update, batch_size, update_company, "mise à jour")
+        timings["mise à jour"] = time.perf_counter() - started
+
+    print("⏱️ " + ", ".join(f"{phase} {seconds * 1000:.0f} ms" for phase, seconds in timings.items()))
+    return {
+        "created": 0 if dry_run else len(to_create) - create_failures,
+        "updated": 0 if dry_run else len(to_update) - update_failures,
+        "unchanged": len(unchanged),
+        "drift": len(drift),
+        "failures": create_failures + update_failures,
+        "dry_run": bool(dry_run),
+    }
 
-# Exécuter dans le container
-# docker exec -it erpnext_backend_1 bench execute setup_companies.setup_companies
\ No newline at end of file
+# Exécuter dans le container (companies.json à côté du script)
+# docker exec -it erpnext_backend_1 bench execute setup_companies.setup_companies
+# docker exec -it erpnext_backend_1 bench execute setup_companies.setup_companies --kwargs "{'dry_run': True}"
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Synchronisation des entreprises Directus (items/companies) vers ERPNext
+
+Remplace la boucle de migrate-to-erpnext.js : lecture de Directus par pages
+(curseur), mapping vers les doctypes ERPNext (directus_sync.SYNC_MAPPINGS),
+écriture par lots en parallèle. Le premier run lit toute la collection, les
+suivants seulement les éléments créés ou modifiés depuis la marque
+date_updated du run précédent.
+
+Prérequis ERPNext : un champ personnalisé Data unique `directus_id` sur le
+doctype cible (Customer par défaut), clé de rapprochement des deux bases.
+
+    python sync-directus-erpnext.py --dry-run
+    python sync-directus-erpnext.py [--full] [--concurrency 8] [--batch-size 200]
+    python sync-directus-erpnext.py --mappings mappings.json --only companies
+
+Identifiants : DIRECTUS_URL / DIRECTUS_TOKEN, ERPNEXT_URL / ERPNEXT_API_KEY /
+ERPNEXT_API_SECRET, ou erpnext-api-keys.json (voir generate-api-keys-db.py)
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+from sync_clients import DirectusClient, ERPNextClient, SyncHTTPError
+from directus_sync import SyncState, load_mappings, default_state_path, sync_mapping
+
+API_KEYS_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "erpnext-api-keys.json")
+
+def load_api_keys(path=API_KEYS_FILE):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def print_progress(counts):
+    print(f"\r  ⏳ {counts['read']} lus, {counts['created']} créés, {counts['updated']} mis à jour, "
+          f"{counts['unchanged']} inchangés, {counts['failed']} échecs", end="", flush=True)
+
+def main():
+    keys = load_api_keys()
+    parser = argparse.ArgumentParser(description="Synchronisation Directus -> ERPNext (incrémentale)")
+    parser.add_argument("--directus-url", default=os.environ.get("DIRECTUS_URL", "http://localhost:8055"))
+    parser.add_argument("--directus-token", default=os.environ.get("DIRECTUS_TOKEN"))
+    parser.add_argument("--erpnext-url", default=os.environ.get("ERPNEXT_URL", keys.get("url", "http://localhost:8083")))
+    parser.add_argument("--mappings", help="Mappings JSON (défaut : SYNC_MAPPINGS de directus_sync.py)")
+    parser.add_argument("--only", help="Mappings à synchroniser, séparés par des virgules")
+    parser.add_argument("--state", default=default_state_path(), help="Fichier des marques de reprise")
+    parser.add_argument("--full", action="store_true", help="Ignorer la marque : relire toute la collection")
+    parser.add_argument("--dry-run", action="store_true", help="Calculer les écritures sans les faire")
+    parser.add_argument("--page-size", type=int, default=500, help="Éléments par page Directus")
+    parser.add_argument("--batch-size", type=int, default=100, help="Documents par lot ERPNext (max 200)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Lots écrits en parallèle")
+    args = parser.parse_args()
+
+    api_key = os.environ.get("ERPNEXT_API_KEY", keys.get("api_key"))
+    api_secret = os.environ.get("ERPNEXT_API_SECRET", keys.get("api_secret"))
+    if not args.directus_token or not api_key or not api_secret:
+        parser.error("DIRECTUS_TOKEN et clés API ERPNext (ERPNEXT_API_KEY/SECRET ou erpnext-api-keys.json) requis")
+
+    mappings = load_mappings(args.mappings)
+    if args.only:
+        wanted = {name.strip() for name in args.only.split(",")}
+        unknown = wanted - {mapping.name for mapping in mappings}
+        if unknown:
+            parser.error(f"Mapping inconnu: {', '.join(sorted(unknown))}")
+        mappings = [mapping for mapping in mappings if mapping.name in wanted]
+
+    concurrency = max(1, args.concurrency)
+    directus = DirectusClient(args.directus_url, args.directus_token)
+    erpnext = ERPNextClient(args.erpnext_url, api_key, api_secret, pool_size=concurrency)
+    state = SyncState(args.state)
+
+    started = time.perf_counter()
+    failures = 0
+    for mapping in mappings:
+        key = SyncState.key(mapping, args.directus_url, args.erpnext_url)
+        since = None if args.full else state.mark(key)
+        print(f"🔄 {mapping.collection} -> {mapping.doctype}"
+              + (f" (modifiés depuis {since})" if since else " (collection complète)")
+              + (" [dry-run]" if args.dry_run else ""))
+        try:
+            counts = sync_mapping(directus, erpnext, mapping, state, key,
+                                  page_size=args.page_size, batch_size=args.batch_size,
+                                  concurrency=concurrency, full=args.full, dry_run=args.dry_run,
+                                  progress=print_progress if sys.stdout.isatty() else None)
+        except SyncHTTPError as e:
+            print(f"\n❌ {mapping.name}: {e} (marque inchangée)")
+            failures += 1
+            continue
+
+        rate = counts["read"] / counts["seconds"] if counts["seconds"] else 0
+        print(f"\r✅ {mapping.name}: {counts['read']} lus en {counts['seconds']:.2f}s ({rate:.0f}/s), "
+              f"{counts['created']} créés, {counts['updated']} mis à jour, "
+              f"{counts['unchanged']} inchangés, {counts['failed']} échecs, {counts['batches']} lots")
+        for error in counts["errors"]:
+            print(f"  - {error}")
+        if counts["failed"]:
+            failures += 1
+            print(f"⚠️  Marque inchangée ({counts['high_water_mark']}) : les éléments en échec seront relus")
+        elif not args.dry_run:
+            print(f"📌 Marque de reprise: {counts['high_water_mark']}")
+
+    print(f"\n✨ Synchronisation terminée en {time.perf_counter() - started:.2f}s")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""
+Clients HTTP de la synchronisation Directus -> ERPNext
+
+Directus est lu par pages avec un curseur sur la clé primaire plutôt qu'un
+offset : chaque page coûte le même prix en début et en fin de collection, et
+un élément créé pendant le parcours ne décale pas les suivantes. ERPNext est
+écrit par lots via frappe.client (insert_many, bulk_update) : un aller-retour
+par lot au lieu d'un par document
+"""
+
+import json
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Réponses qui valent une nouvelle tentative (limite de débit, redémarrage du serveur)
+RETRY_STATUSES = frozenset((429, 502, 503, 504))
+
+# frappe.client.insert_many refuse plus de 200 documents par appel
+INSERT_MANY_LIMIT = 200
+
+class SyncHTTPError(Exception):
+    pass
+
+class DirectusError(SyncHTTPError):
+    pass
+
+class ERPNextError(SyncHTTPError):
+    pass
+
+def make_session(pool_size, headers):
+    """Session keep-alive dont le pool couvre tous les threads d'écriture"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(headers)
+    return session
+
+def send(session, method, url, error, attempts=3, timeout=60, **kwargs):
+    """Requête avec nouvelles tentatives espacées sur erreur réseau ou RETRY_STATUSES"""
+    for attempt in range(1, attempts + 1):
+        try:
+            response = session.request(method, url, timeout=timeout, **kwargs)
+        except requests.RequestException as e:
+            if attempt == attempts:
+                raise error(f"{method} {url}: {e}") from e
+        else:
+            if response.status_code not in RETRY_STATUSES or attempt == attempts:
+                return response
+        time.sleep(min(10.0, 0.5 * 2 ** (attempt - 1)))
+
+class DirectusClient:
+    def __init__(self, url, token, pool_size=4, timeout=60):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.session = make_session(pool_size, {"Authorization": f"Bearer {token}"})
+
+    def _get(self, path, params):
+        response = send(self.session, "GET", f"{self.url}{path}", DirectusError,
+                        timeout=self.timeout, params=params)
+        if response.status_code != 200:
+            raise DirectusError(f"GET {path}: HTTP {response.status_code} {response.text[:300]}")
+        return response.json()["data"]
+
+    def watermark(self, collection, fields):
+        """Plus grande valeur des champs de date de la collection (None si vide)
+
+        Relevée avant la lecture : un élément modifié pendant la synchronisation
+        a une date plus récente et sera relu au run suivant
+        """
+        data = self._get(f"/items/{collection}", {"aggregate[max]": ",".join(fields)})
+        values = [value for value in (data[0].get("max") or {}).values() if value] if data else []
+        return max(values) if values else None
+
+    def iter_pages(self, collection, fields, page_size=500, where=None, key="id"):
+        """Pages d'éléments triés par clé primaire, jusqu'à la fin de la collection
+
+        Générateur : la page suivante n'est demandée que quand la précédente a
+        été consommée, la mémoire reste bornée à une page
+        """
+        cursor = None
+        while True:
+            conditions = [where] if where else []
+            if cursor is not None:
+                conditions.append({key: {"_gt": cursor}})
+            params = {"fields": ",".join(fields), "sort": key, "limit": page_size}
+            if conditions:
+                params["filter"] = json.dumps(conditions[0] if len(conditions) == 1 else {"_and": conditions})
+            page = self._get(f"/items/{collection}", params)
+            if page:
+                yield page
+            if len(page) < page_size:
+                return
+            cursor = page[-1][key]
+
+class ERPNextClient:
+    def __init__(self, url, api_key, api_secret, pool_size=4, timeout=120):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.session = make_session(pool_size, {"Authorization": f"token {api_key}:{api_secret}",
+                                                "Accept": "application/json"})
+
+    def _call(self, method, path, payload):
+        response = send(self.session, method, f"{self.url}{path}", ERPNextError,
+                        timeout=self.timeout, json=payload)
+        if response.status_code != 200:
+            raise ERPNextError(f"{path}: HTTP {response.status_code} {error_message(response)}")
+        return response.json()
+
+    def method(self, name, **payload):
+        """Appel d'une méthode whitelistée (frappe.client.*), retourne son message"""
+        return self._call("POST", f"/api/method/{name}", payload).get("message")
+
+    def get_by_keys(self, doctype, key_field, keys, fields):
+        """Documents dont key_field est dans keys, indexés par clé (une seule requête)
+
+        get_list en POST : la liste des clés ne passe pas dans l'URL
+        """
+        rows = self.method("frappe.client.get_list", doctype=doctype,
+                           fields=["name", key_field, *fields],
+                           filters=[[key_field, "in", list(keys)]],
+                           limit_page_length=0)
+        return {row[key_field]: row for row in rows or ()}
+
+    def insert_many(self, docs):
+        """Insertion groupée, transactionnelle : un document invalide annule tout l'appel"""
+        return self.method("frappe.client.insert_many", docs=json.dumps(docs))
+
+    def insert(self, doc):
+        return self._call("POST", f"/api/resource/{doc['doctype']}", doc)["data"]
+
+    def bulk_update(self, docs):
+        """Mises à jour groupées ({doctype, docname, champs...}) ; retourne les échecs"""
+        result = self.method("frappe.client.bulk_update", docs=json.dumps(docs)) or {}
+        return result.get("failed_docs", [])
+
+def error_message(response):
+    """Message lisible d'une erreur Frappe (exception ou _server_messages)"""
+    try:
+        body = response.json()
+    except ValueError:
+        return response.text[:300]
+    messages = body.get("_server_messages")
+    if messages:
+        try:
+            return "; ".join(json.loads(message).get("message", message) for message in json.loads(messages))
+        except (ValueError, AttributeError):
+            return messages[:300]
+    return str(body.get("exception") or body.get("exc_type") or body)[:300]
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Faux Directus et faux ERPNext en mémoire pour essayer sync-directus-erpnext.py
+sans les vrais services
+
+Directus : GET /items/<collection> (fields, sort, limit, filter, aggregate[max])
+et PATCH /items/<collection>/<id> (met date_updated à jour). ERPNext :
+frappe.client.get_list / insert_many / bulk_update et POST /api/resource/<doctype>,
+avec une latence par appel et l'unicité du champ de rapprochement
+
+    python sync_stubs.py --records 20000
+    DIRECTUS_URL=http://127.0.0.1:8055 DIRECTUS_TOKEN=x ERPNEXT_URL=http://127.0.0.1:8083 \\
+        ERPNEXT_API_KEY=x ERPNEXT_API_SECRET=x python sync-directus-erpnext.py --state /tmp/sync-state.json
+"""
+
+import sys
+import json
+import time
+import argparse
+import threading
+from datetime import datetime, timezone
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def now_iso():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+def make_companies(count):
+    """Éléments factices : dates de création croissantes, jamais modifiés"""
+    industries = ["Services", "Immobilier", "Restauration", "Conseil", "Industrie"]
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp()
+    companies = {}
+    for i in range(count):
+        created = datetime.fromtimestamp(base + i * 60, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+        companies[f"company-{i:07d}"] = {
+            "id": f"company-{i:07d}", "name": f"Entreprise {i}", "industry": industries[i % len(industries)],
+            "website": f"https://company-{i}.example.ch", "email": f"contact@company-{i}.example.ch",
+            "phone": f"+41 21 555 {i % 100:02d} {i % 97:02d}", "address": f"Rue {i}, 1003 Lausanne",
+            "status": "active", "date_created": created, "date_updated": None,
+        }
+    return companies
+
+def matches(item, condition):
+    """Sous-ensemble des filtres Directus utilisé par la synchronisation"""
+    for field, test in condition.items():
+        if field == "_and":
+            if not all(matches(item, sub) for sub in test):
+                return False
+        elif field == "_or":
+            if not any(matches(item, sub) for sub in test):
+                return False
+        else:
+            value = item.get(field)
+            for operator, operand in test.items():
+                if operator == "_gt" and not (value is not None and value > operand):
+                    return False
+                if operator == "_eq" and value != operand:
+                    return False
+                if operator == "_null" and (value is None) != bool(operand):
+                    return False
+    return True
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    latency = 0.0
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def log_message(self, format, *args):
+        pass
+
+class DirectusHandler(StubHandler):
+    collections = {}
+    lock = threading.Lock()
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        parts = url.path.strip("/").split("/")
+        if len(parts) != 2 or parts[0] != "items" or parts[1] not in self.collections:
+            return self._reply(404, {"errors": [{"message": "Route not found"}]})
+        time.sleep(self.latency)
+        query = {name: values[0] for name, values in parse_qs(url.query).items()}
+        with self.lock:
+            items = list(self.collections[parts[1]].values())
+
+        if "aggregate[max]" in query:
+            fields = query["aggregate[max]"].split(",")
+            maxima = {field: max((item[field] for item in items if item.get(field)), default=None)
+                      for field in fields}
+            return self._reply(200, {"data": [{"max": maxima}]})
+
+        if "filter" in query:
+            condition = json.loads(query["filter"])
+            items = [item for item in items if matches(item, condition)]
+        sort = query.get("sort")
+        if sort:
+            items.sort(key=lambda item: item.get(sort.lstrip("-")) or "", reverse=sort.startswith("-"))
+        items = items[:int(query.get("limit", 100))]
+        if "fields" in query:
+            fields = query["fields"].split(",")
+            items = [{field: item.get(field) for field in fields} for item in items]
+        self._reply(200, {"data": items})
+
+    def do_PATCH(self):
+        parts = urlsplit(self.path).path.strip("/").split("/")
+        changes = self._body()
+        with self.lock:
+            item = self.collections.get(parts[1], {}).get(parts[2]) if len(parts) == 3 else None
+            if item is None:
+                return self._reply(404, {"errors": [{"message": "Item not found"}]})
+            item.update(changes, date_updated=now_iso())
+        self._reply(200, {"data": item})
+
+class ERPNextHandler(StubHandler):
+    docs = {}
+    unique_fields = {}
+    # doctype -> {valeur du champ unique: name}, comme l'index unique de la table
+    unique_index = {}
+    lock = threading.Lock()
+    calls = {}
+
+    def _error(self, status, message):
+        self._reply(status, {"exc_type": "ValidationError",
+                             "_server_messages": json.dumps([json.dumps({"message": message})])})
+
+    def _insert(self, doc):
+        """Insertion (verrou détenu) ; lève ValueError comme une validation Frappe"""
+        doctype = doc["doctype"]
+        table = self.docs.setdefault(doctype, {})
+        index = self.unique_index.setdefault(doctype, {})
+        unique = self.unique_fields.get(doctype)
+        if unique and doc.get(unique) in index:
+            raise ValueError(f"{doctype} {unique} {doc.get(unique)} existe déjà")
+        if not doc.get("customer_name", "x"):
+            raise ValueError("customer_name requis")
+        name = f"{doctype[:4].upper()}-{len(table) + 1:07d}"
+        table[name] = dict(doc, name=name)
+        if unique:
+            index[doc.get(unique)] = name
+        return name
+
+    def _delete(self, doctype, name):
+        row = self.docs[doctype].pop(name)
+        unique = self.unique_fields.get(doctype)
+        if unique:
+            self.unique_index[doctype].pop(row.get(unique), None)
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        body = self._body()
+        time.sleep(self.latency)
+        with self.lock:
+            self.calls[path] = self.calls.get(path, 0) + 1
+            if path == "/api/method/frappe.client.get_list":
+                table = self.docs.get(body["doctype"], {})
+                unique = self.unique_fields.get(body["doctype"])
+                rows = None
+                for field, operator, values in body.get("filters", []):
+                    wanted = set(values) if operator == "in" else {values}
+                    if rows is None and field == unique:
+                        index = self.unique_index.get(body["doctype"], {})
+                        rows = [table[index[value]] for value in wanted if value in index]
+                    else:
+                        rows = [row for row in (table.values() if rows is None else rows)
+                                if row.get(field) in wanted]
+                rows = list(table.values()) if rows is None else rows
+                return self._reply(200, {"message": [{field: row.get(field) for field in body["fields"]}
+                                                     for row in rows]})
+            if path == "/api/method/frappe.client.insert_many":
+                docs = json.loads(body["docs"])
+                if len(docs) > 200:
+                    return self._error(417, "Only 200 inserts allowed in one request")
+                inserted = []
+                try:
+                    for doc in docs:
+                        inserted.append((doc["doctype"], self._insert(doc)))
+                except ValueError as e:
+                    for doctype, name in inserted:  # transaction annulée
+                        self._delete(doctype, name)
+                    return self._error(417, str(e))
+                names = [name for _, name in inserted]
+                return self._reply(200, {"message": names})
+            if path == "/api/method/frappe.client.bulk_update":
+                failed = []
+                for doc in json.loads(body["docs"]):
+                    row = self.docs.get(doc["doctype"], {}).get(doc["docname"])
+                    if row is None:
+                        failed.append({"doc": doc, "exc": "frappe.exceptions.DoesNotExistError"})
+                        continue
+                    row.update({field: value for field, value in doc.items() if field not in ("doctype", "docname")})
+                return self._reply(200, {"message": {"failed_docs": failed}})
+            if path.startswith("/api/resource/"):
+                doctype = path.rsplit("/", 1)[-1]
+                try:
+                    name = self._insert(dict(body, doctype=doctype))
+                except ValueError as e:
+                    return self._error(417, str(e))
+                return self._reply(200, {"data": self.docs[doctype][name]})
+        self._reply(404, {"exc_type": "DoesNotExistError"})
+
+def start(handler, port):
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def start_stubs(records=1000, latency=0.0, directus_port=0, erpnext_port=0):
+    """Démarre les deux faux services ; retourne (directus, erpnext) = ((serveur, url), ...)"""
+    directus = type("ConfiguredDirectus", (DirectusHandler,), {
+        "collections": {"companies": make_companies(records)}, "latency": latency, "lock": threading.Lock()})
+    erpnext = type("ConfiguredERPNext", (ERPNextHandler,), {
+        "docs": {}, "unique_fields": {"Customer": "directus_id"}, "unique_index": {}, "calls": {}, "latency": latency,
+        "lock": threading.Lock()})
+    return start(directus, directus_port), start(erpnext, erpnext_port)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Faux Directus et ERPNext pour la synchronisation")
+    parser.add_argument("--records", type=int, default=20000, help="Entreprises dans items/companies")
+    parser.add_argument("--latency", type=float, default=0.01, help="Latence simulée par appel (s)")
+    parser.add_argument("--directus-port", type=int, default=8055)
+    parser.add_argument("--erpnext-port", type=int, default=8083)
+    args = parser.parse_args()
+
+    (directus, directus_url), (erpnext, erpnext_url) = start_stubs(
+        args.records, args.latency, args.directus_port, args.erpnext_port)
+    print(f"🧪 Faux Directus sur {directus_url} ({args.records} entreprises), faux ERPNext sur {erpnext_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        directus.shutdown()
+        erpnext.shutdown()
+        sys.exit(0)
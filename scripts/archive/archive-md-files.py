@@ -3,214 +3,340 @@
 Script d'archivage des fichiers .md de la racine vers /docs/archive/
 Date: 23 Août 2025
 Branche: cleanup-architecture
+
+Les fichiers à archiver sont trouvés par règles (motifs et ancienneté du
+dernier commit, voir archive_rules.py) : le plan est affiché avant tout
+déplacement.
+
+docs/archive/manifest.json (archive_manifest.py) garde les documents déjà
+archivés par hash de blob : une copie identique d'un document archivé n'est
+pas déplacée mais supprimée et notée comme alias, et un run ne relit que ce
+qui a changé.
+
+Les déplacements passent par la plomberie git : un seul update-index pour
+tout l'index, puis un commit par catégorie construit sur un index temporaire
+(write-tree + commit-tree). Quelques processus git au total au lieu d'un
+`git mv` par fichier, et chaque échec est rapporté fichier par fichier.
+
+    python scripts/archive/archive-md-files.py --dry-run
+    python scripts/archive/archive-md-files.py [--rules regles.json] [--no-commit]
+    python scripts/archive/archive-md-files.py --find "cleanup"   (ou --hash 3e5fa10d)
 """
 
 import os
-import shutil
-from pathlib import Path
-
-# Configuration des mappages
-FILE_MAPPINGS = {
-    'context': [
-        'CONTEXT-DESIGN-SYSTEM-11-08-2025.md',
-        'CONTEXT-FINAL-CORRIGE-11-08-2025.md',
-        'CONTEXT-REPRISE-11-08-2025-0135.md',
-        'CONTEXTE-REPRISE-SESSION-11-08-2025-1040.md',
-        'CONTEXT_PROMPT_20250812_0840.md',
-        'CONTEXT_PROMPT_20250812_0852.md',
-        'CONTEXT_PROMPT_20250812_0922.md',
-        'CONTEXT_PROMPT_20250812_0943.md',
-        'CONTEXT_PROMPT_CRITICAL_20250812_0910.md',
-        'CONTEXT_PROMPT_DESIGN_SYSTEM.md',
-        'CONTEXT_PROMPT_PRODUCTION_READY_20250812.md',
-        'CONTEXT_PROMPT_SESSION_4.md',
-        'CONTEXT_PROMPT_SESSION_5.md',
-        'CONTEXT_PROMPT_ULTRA_DETAILED.md',
-        'PROMPT_CONTEXTE_SESSION_15.md'
-    ],
-    'sessions': [
-        'SESSION_13_CONTEXT_PROMPT.md',
-        'SESSION_15_CONTEXT_PROMPT.md',
-        'SESSION_15_CONTEXT_PROMPT.txt',
-        'SESSION_25_PROMPT_CONTEXT.md',
-        'SESSION_38_CLEANUP_COMPLETE.md',
-        'SESSION_39_CONTEXT.md',
-        'SESSION_39_VERIFICATION_REPORT.md',
-        'SESSION_40_CONTEXT_PROMPT.md',
-        'SESSION_REPORT_20250812_0921.md',
-        'SESSION_REPORT_20250812_0934.md',
-        'SESSION_REPORT_20250812_0942.md',
-        'SESSION_REPORT_DOCUMENTATION_20250812_0955.md'
-    ],
-    'dashboard': [
-        'DASHBOARD-CEO-README.md',
-        'DASHBOARD-V3-README.md',
-        'DASHBOARD_CEO_HOTFIX.md',
-        'DASHBOARD_CEO_IMPLEMENTATION.md',
-        'DASHBOARD_DEMO_MODE.md',
-        'DASHBOARD_REFACTORING_COMPLETE.md',
-        'DASHBOARD_USER_GUIDE.md',
-        'DASHBOARD_V3_PREMIUM_COMPLETE.md',
-        'DASHBOARD_V3_PREMIUM_SETUP.md',
-        'DASHBOARD_V4_STATUS.md',
-        'DASHBOARD_V4_VALIDATION.json',
-        'DASHBOARD_VISUAL_COMPARISON.md',
-        'README_DASHBOARD_V4.md',
-        'SAUVEGARDE_DASHBOARD_V4.md'
-    ],
-    'reports': [
-        'CLEANUP_ANALYSIS.md',
-        'CLEANUP_BRANCH_PLAN.md',
-        'CLEANUP_EXECUTION_STATUS.md',
-        'CLEANUP_REPORT.md',
-        'CLEANUP_REPORT_2025-08-11.md',
-        'CLEANUP_SCRIPT.md',
-        'CLEANUP_STATUS.md',
-        'FINAL_CLEANUP_STATUS.md',
-        'AUDIT-CORRECTION-EXPLICATION.md',
-        'CLARIFICATION-DEUX-AUDITS.md',
-        'CLAUDE_CODE_ANALYSIS.md',
-        'COLLECTIONS_STATUS.md',
-        'COMMIT_HISTORY.md',
-        'DEPLOYMENT_REPORT.md',
-        'FINAL_REPORT_V040.md',
-        'REVOLUT_CLEANUP_REPORT.md',
-        'WORKFLOW_VALIDATION_REPORT.md',
-        'WORKFLOW_VALIDATION_TRACKER.md'
-    ],
-    'guides': [
-        'GETTING_STARTED.md',
-        'GUIDE-AJOUT-OWNER-COMPANY.md',
-        'GUIDE_SIMPLE.md',
-        'QUICK_START_GUIDE.md',
-        'BUNDLE_OPTIMIZATION_GUIDE.md',
-        'CHROMATIC_SETUP_GUIDE.md',
-        'CORS_SOLUTION_GUIDE.md',
-        'CSS_CONFLICTS_TROUBLESHOOTING.md',
-        'DEVELOPER_WORKFLOW_GUIDE.md',
-        'MUTATION_TESTING_GUIDE.md',
-        'NEXT_ACTIONS_GUIDE.md',
-        'TROUBLESHOOTING_GUIDE.md'
-    ],
-    'migrations': [
-        'MIGRATION-OWNER-COMPANY-COMPLETE.md',
-        'MIGRATION_STATUS.md',
-        'OWNER_COMPANY_STATUS.md',
-        'RAPPORT-SITUATION-OWNER-COMPANY.md',
-        'SOLUTION-SQL-OWNER-COMPANY.md',
-        'add-owner-company-final.js',
-        'add-owner-company-simple-format.js',
-        'add-owner-company-simplified.js',
-        'add-owner-company.sql'
-    ],
-    'misc': [
-        'API_CONNECTION_SUCCESS.md',
-        'CHANGELOG.md',
-        'CONTRIBUTING.md',
-        'DESIGN_SYSTEM_CLEANUP.md',
-        'DESIGN_SYSTEM_INTEGRATION.md',
-        'DESIGN_SYSTEM_STRUCTURE.md',
-        'DEVELOPMENT_ROADMAP_2025.md',
-        'DIRECTUS_RELATIONS_STATUS.md',
-        'DONNEES_TEST_CREEES.md',
-        'FINAL_DOCUMENTATION_INDEX.md',
-        'GET_DIRECTUS_TOKEN.md',
-        'GITHUB_COMPLETE_DOCUMENTATION.md',
-        'GITHUB_DASHBOARD_EVOLUTION.md',
-        'GITHUB_RELEASE_v1.0.0-beta.1.md',
-        'GITHUB_SESSION_6_DOCUMENTATION.md',
-        'INSTALLATION_PM2.md',
-        'INTEGRATIONS_STATUS.md',
-        'MCP_CONFIG_BACKUP.json',
-        'MCP_DIRECTUS_FINAL_CONFIG.md',
-        'PERFORMANCE_DASHBOARD.md',
-        'PM2_PERSISTENT_SERVER_SOLUTION.md',
-        'POINT-SITUATION-08-08-2024.md',
-        'PRODUCTION_READY_CHECKLIST.md',
-        'PROJECT_SUCCESS_SUMMARY.md',
-        'PROMPT-REPRISE-RAPIDE.md',
-        'PUBLICATION_STATUS.md',
-        'RELEASE_ACTIONS_NOW.md',
-        'RELEASE_COPY_PASTE.md',
-        'RELEASE_NOTES_v1.0.0-beta.1.md',
-        'RELEASE_NOW.sh',
-        'REORGANIZATION_MAP.md',
-        'RESTORE-BRANCHES-NOW.sh',
-        'RESTRUCTURATION_COMPLETE.md',
-        'SERVER_PERSISTENCE_ISSUE.md',
-        'SERVEUR_PERSISTANT.md',
-        'TEST_API_CONNECTION.md',
-        'TEST_TRIGGER.md',
-        'TRIGGER_PUBLISH_V040',
-        'auto-save.sh'
-    ]
-}
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+from collections import Counter, defaultdict
+
+from archive_rules import load_rules, build_plan
+from archive_manifest import ArchiveManifest, MANIFEST_PATH
+ZERO_SHA = "0" * 40
+
+class GitError(Exception):
+    pass
+
+def git(*args, input=None, env=None):
+    """Lance une commande git, lève GitError avec stderr en cas d'échec"""
+    result = subprocess.run(["git", "--literal-pathspecs", *args], input=input, env=env,
+                            capture_output=True)
+    if result.returncode != 0:
+        raise GitError(result.stderr.decode(errors="replace").strip() or f"git {args[0]} a échoué")
+    return result.stdout
+
+def stage_entries(output):
+    """Sortie -z de ls-files --stage / ls-tree -r : {chemin: (mode, sha)}"""
+    entries = {}
+    for record in output.split(b"\0"):
+        if not record:
+            continue
+        meta, path = record.split(b"\t", 1)
+        fields = meta.split()
+        # ls-files : mode sha étape ; ls-tree : mode type sha
+        sha = fields[2] if fields[1] in (b"blob", b"commit") else fields[1]
+        entries[path.decode()] = (fields[0].decode(), sha.decode())
+    return entries
+
+def index_info(moves, entries):
+    """Entrées pour update-index --index-info -z : retrait de l'ancien chemin, ajout du nouveau
+
+    dest à None : simple suppression (doublon d'un document déjà archivé)
+    """
+    lines = []
+    for src, dest in moves:
+        if src not in entries:
+            continue
+        mode, sha = entries[src]
+        lines.append(f"0 {ZERO_SHA}\t{src}")
+        if dest is not None:
+            lines.append(f"{mode} {sha}\t{dest}")
+    return "".join(f"{line}\0" for line in lines).encode()
+
+def print_plan(plan):
+    """Plan par catégorie ; les fichiers écartés sont listés avec leur motif"""
+    labels = {"too-recent": "trop récent", "untracked": "non suivi", "conflict": "destination prise"}
+    archived = ("move", "duplicate")
+    by_category = defaultdict(list)
+    for item in plan:
+        by_category[item["category"]].append(item)
+    for category, items in by_category.items():
+        moves = [item for item in items if item["status"] in archived]
+        print(f"\n📂 {category} ({len(moves)}/{len(items)} fichiers)")
+        for item in items:
+            age = "?" if item["age_days"] is None else f"{item['age_days']:.0f} j"
+            if item["status"] == "move":
+                local = ", modifications locales conservées" if item.get("modified") else ""
+                print(f"  ➡️  {item['path']} -> {item['dest']} ({age}{local})")
+            elif item["status"] == "duplicate":
+                print(f"  🗑️  {item['path']} : identique à {item['duplicate_of']} ({age})")
+            else:
+                print(f"  ⏭️  {item['path']} : {labels[item['status']]} ({age})")
+
+def dedupe(plan, tracked, manifest, modified=frozenset()):
+    """Marque les copies identiques (même blob) d'un document archivé ou déjà prévu
+
+    Le blob de l'index ne vaut que pour un fichier sans modification locale :
+    un fichier de modified (différent de l'index sur disque) n'est jamais un
+    doublon, donc jamais supprimé, et ne sert pas d'original. Une destination
+    prise par un contenu identique devient aussi un doublon
+    """
+    planned = {}
+    for item in plan:
+        if item["status"] not in ("move", "conflict") or item["path"] not in tracked:
+            continue
+        blob = tracked[item["path"]][1]
+        item["blob"] = blob
+        if item["path"] in modified:
+            item["modified"] = True
+            continue
+        original = manifest.canonical_path(blob) or planned.get(blob)
+        if original:
+            item["status"] = "duplicate"
+            item["duplicate_of"] = original
+        elif item["status"] == "move":
+            planned[blob] = item["dest"]
+
+def move_files(plan, tracked):
+    """Déplace sur disque ; retourne (déplacements réussis par catégorie, erreurs)
+
+    Les doublons (dest à None) sont seulement validés : ils ne sont supprimés
+    qu'une fois l'index mis à jour
+    """
+    done, errors = {}, []
+    for category, moves in plan.items():
+        done[category] = []
+        for src, dest in moves:
+            if src not in tracked:
+                errors.append(f"{src}: non suivi par git")
+                continue
+            if dest is None:
+                done[category].append((src, dest))  # supprimé après mise à jour de l'index
+                continue
+            if os.path.lexists(dest):
+                errors.append(f"{src}: destination déjà présente ({dest})")
+                continue
+            try:
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                os.replace(src, dest)
+            except OSError as e:
+                errors.append(f"{src}: {e.strerror or e}")
+                continue
+            done[category].append((src, dest))
+    return done, errors
+
+def commit_categories(done, head_entries):
+    """Un commit par catégorie, chaînés, construits sur un index temporaire partant de HEAD
+
+    L'index réel n'est pas utilisé : d'éventuelles modifications indexées par
+    ailleurs ne se retrouvent pas dans ces commits. HEAD n'est pas encore
+    déplacé (voir publish). Retourne ([(catégorie, sha)], dernier commit)
+    """
+    parent = git("rev-parse", "--verify", "HEAD").decode().strip()
+    commits = []
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, GIT_INDEX_FILE=os.path.join(tmp, "index"))
+        git("read-tree", "HEAD", env=env)
+        for category, moves in done.items():
+            info = index_info(moves, head_entries)
+            if not info:
+                continue
+            git("update-index", "-z", "--index-info", input=info, env=env)
+            tree = git("write-tree", env=env).decode().strip()
+            commit_msg = f"chore: Archive {category} files to /docs/archive/{category}/"
+            parent = git("commit-tree", tree, "-p", parent, "-m", commit_msg).decode().strip()
+            commits.append((category, parent))
+    return commits, parent
+
+def stage_manifest(root="."):
+    """Écrit le blob du manifeste et l'ajoute à l'index réel ; retourne son hash"""
+    blob = git("hash-object", "-w", "--", os.path.join(root, MANIFEST_PATH)).decode().strip()
+    git("update-index", "-z", "--index-info", input=f"100644 {blob}\t{MANIFEST_PATH}\0".encode())
+    return blob
+
+def commit_manifest(parent, blob):
+    """Commit du manifeste au-dessus de parent, sur un index temporaire"""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, GIT_INDEX_FILE=os.path.join(tmp, "index"))
+        git("read-tree", parent, env=env)
+        git("update-index", "-z", "--index-info", input=f"100644 {blob}\t{MANIFEST_PATH}\0".encode(), env=env)
+        tree = git("write-tree", env=env).decode().strip()
+        return git("commit-tree", tree, "-p", parent, "-m", "chore: Update docs/archive manifest").decode().strip()
+
+def publish(head, original_head):
+    """Avance HEAD ; échoue si HEAD a bougé entre-temps plutôt que d'écraser un commit"""
+    git("update-ref", "-m", "archive-md-files", "HEAD", head, original_head)
+
+def print_lookup(results):
+    if not results:
+        print("Aucun document archivé ne correspond")
+    for blob, document in results:
+        print(f"{blob[:10]}  {document['title']}")
+        for path in document["paths"]:
+            print(f"    {path}")
+        for alias in document["aliases"]:
+            print(f"    (doublon supprimé : {alias})")
 
 def main():
     """Fonction principale pour archiver les fichiers"""
-    
-    # Chemin de base
-    base_path = Path('.')
-    archive_base = base_path / 'docs' / 'archive'
-    
-    # Compteurs
-    total_files = sum(len(files) for files in FILE_MAPPINGS.values())
-    moved_files = 0
-    errors = []
-    
-    print(f"🚀 Début de l'archivage de {total_files} fichiers...")
-    print(f"📁 Destination: /docs/archive/\n")
-    
-    # Traiter chaque catégorie
-    for category, files in FILE_MAPPINGS.items():
-        dest_dir = archive_base / category
-        
-        # Créer le répertoire s'il n'existe pas
-        dest_dir.mkdir(parents=True, exist_ok=True)
-        
-        print(f"\n📂 Traitement de {category} ({len(files)} fichiers)...")
-        
-        for file_name in files:
-            src_file = base_path / file_name
-            dest_file = dest_dir / file_name
-            
-            if src_file.exists():
-                try:
-                    # Utiliser git mv pour préserver l'historique
-                    os.system(f'git mv "{src_file}" "{dest_file}"')
-                    moved_files += 1
-                    print(f"  ✅ {file_name}")
-                except Exception as e:
-                    errors.append(f"{file_name}: {str(e)}")
-                    print(f"  ❌ {file_name}: {str(e)}")
+    parser = argparse.ArgumentParser(description="Archivage des fichiers .md vers docs/archive/")
+    parser.add_argument("--dry-run", action="store_true", help="Afficher le plan sans rien déplacer")
+    parser.add_argument("--rules", help="Règles JSON (défaut : ARCHIVE_RULES de archive_rules.py)")
+    parser.add_argument("--workers", type=int, default=8, help="Parcours parallèle de l'arbre")
+    parser.add_argument("--no-commit", action="store_true", help="Déplacer et indexer sans committer")
+    parser.add_argument("--find", metavar="TEXTE", help="Chercher un document archivé (titre, chemin)")
+    parser.add_argument("--hash", metavar="SHA", help="Document archivé par hash de blob (préfixe)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    manifest = ArchiveManifest.load()
+    refreshed = manifest.refresh()
+    if args.find or args.hash:
+        print_lookup(manifest.find(args.find) if args.find else manifest.lookup_hash(args.hash))
+        return 0
+
+    plan = build_plan(load_rules(args.rules), workers=args.workers)
+    candidates = [item["path"] for item in plan if item["status"] in ("move", "conflict")]
+    try:
+        # Une seule lecture de l'index pour tous les fichiers
+        index_entries = stage_entries(git("ls-files", "--stage", "-z", "--", *candidates)) if candidates else {}
+        # Fichiers dont le contenu sur disque diffère de l'index : jamais supprimés comme doublons
+        modified = {path.decode() for path in
+                    git("diff", "--name-only", "-z", "--", *candidates).split(b"\0") if path} if candidates else set()
+    except GitError as e:
+        print(f"❌ Lecture de l'index impossible: {e}")
+        return 1
+    dedupe(plan, index_entries, manifest, modified)
+
+    counts = Counter(item["status"] for item in plan)
+    total_files = counts["move"] + counts["duplicate"]
+    print(f"🔎 {len(plan)} fichier(s) ciblé(s) par les règles en {time.perf_counter() - started:.2f}s : "
+          f"{counts['move']} à archiver, {counts['duplicate']} doublon(s), "
+          f"{len(plan) - total_files} écarté(s)")
+    if refreshed:
+        print(f"📇 Manifeste mis à jour pour: {', '.join(refreshed)}")
+    print_plan(plan)
+
+    to_move = defaultdict(list)
+    for item in plan:
+        if item["status"] == "move":
+            to_move[item["category"]].append((item["path"], item["dest"]))
+        elif item["status"] == "duplicate":
+            to_move[item["category"]].append((item["path"], None))
+
+    if args.dry_run or not total_files:
+        return 0
+
+    print(f"\n🚀 Début de l'archivage de {total_files} fichiers...")
+
+    sources = [src for moves in to_move.values() for src, _ in moves]
+    try:
+        head_entries = stage_entries(git("ls-tree", "-r", "-z", "HEAD", "--", *sources))
+    except GitError as e:
+        print(f"❌ Lecture de HEAD impossible: {e}")
+        return 1
+
+    done, errors = move_files(to_move, index_entries)
+    moved = [move for moves in done.values() for move in moves]
+
+    if moved:
+        try:
+            git("update-index", "-z", "--index-info", input=index_info(moved, index_entries))
+        except GitError as e:
+            # Index non mis à jour : on remet les fichiers en place pour rester cohérent
+            for src, dest in moved:
+                if dest is not None:
+                    os.replace(dest, src)
+            errors.append(f"git update-index: {e}")
+            done, moved = {}, []
+
+    for src, dest in moved:
+        if dest is None:
+            try:
+                os.remove(src)
+            except OSError as e:
+                errors.append(f"{src}: retiré de l'index mais pas du disque ({e.strerror or e})")
+
+    # Tous les déplacements avant les doublons : l'original d'un doublon peut
+    # appartenir à une catégorie traitée plus loin
+    for moves in done.values():
+        for src, dest in moves:
+            if dest is not None:
+                manifest.record_move(src, dest, index_entries[src][1], os.path.getsize(dest))
+
+    by_source = {item["path"]: item for item in plan}
+    for category, moves in done.items():
+        print(f"\n📂 {category} ({len(moves)}/{len(to_move[category])} fichiers)")
+        for src, dest in moves:
+            if dest is None:
+                manifest.record_duplicate(src, index_entries[src][1])
+                print(f"  🗑️  {os.path.basename(src)} (doublon de {by_source[src]['duplicate_of']})")
             else:
-                print(f"  ⚠️  {file_name} - Fichier non trouvé")
-    
+                print(f"  ✅ {os.path.basename(src)}")
+
     # Rapport final
     print(f"\n{'='*60}")
     print(f"📊 RAPPORT FINAL")
     print(f"{'='*60}")
-    print(f"✅ Fichiers archivés: {moved_files}/{total_files}")
+    print(f"✅ Fichiers archivés: {sum(dest is not None for _, dest in moved)}/{counts['move']}")
+    print(f"🗑️  Doublons supprimés: {sum(dest is None for _, dest in moved)}/{counts['duplicate']}")
     print(f"❌ Erreurs: {len(errors)}")
-    
+
     if errors:
         print(f"\n⚠️  Erreurs détaillées:")
         for error in errors:
             print(f"  - {error}")
-    
-    # Créer un commit pour chaque catégorie
-    print(f"\n💾 Création des commits...")
-    for category in FILE_MAPPINGS.keys():
-        commit_msg = f"chore: Archive {category} files to /docs/archive/{category}/"
-        os.system(f'git add docs/archive/{category}/')
-        os.system(f'git commit -m "{commit_msg}"')
-        print(f"  ✅ Commit créé pour {category}")
-    
-    print(f"\n✨ Archivage terminé!")
+
+    if moved:
+        try:
+            if args.no_commit:
+                manifest.save()
+                stage_manifest()
+            else:
+                print(f"\n💾 Création des commits...")
+                staged_only = [src for src, _ in moved if src not in head_entries]
+                if staged_only:
+                    print(f"  ⚠️  {len(staged_only)} fichier(s) absents de HEAD : déplacés dans l'index, hors commits")
+                original_head = git("rev-parse", "--verify", "HEAD").decode().strip()
+                commits, head = commit_categories(done, head_entries)
+                # Les hashes d'arbre du manifeste sont ceux des commits d'archive
+                manifest.update_trees(head)
+                manifest.save()
+                head = commit_manifest(head, stage_manifest())
+                publish(head, original_head)
+                for category, sha in commits + [("manifeste", head)]:
+                    print(f"  ✅ Commit {sha[:8]} pour {category}")
+        except GitError as e:
+            print(f"  ❌ Commits non créés ({e}) : les déplacements restent indexés")
+            errors.append(f"commits: {e}")
+
+    print(f"\n✨ Archivage terminé en {time.perf_counter() - started:.2f}s!")
     print(f"📝 N'oubliez pas de:")
     print(f"  1. Vérifier les changements avec 'git status'")
     print(f"  2. Créer une Pull Request")
     print(f"  3. Mettre à jour le README.md principal")
+    return 1 if errors else 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
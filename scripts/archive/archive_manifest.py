@@ -0,0 +1,189 @@
+"""
+Manifeste de docs/archive : documents archivés indexés par hash de blob git
+
+Le manifeste garde le hash git de chaque entrée de premier niveau de l'archive
+(répertoire de catégorie ou document) : une mise à jour ne relit que les
+entrées modifiées. Il sert aussi d'index de contenu (titre, hash, anciens
+chemins) sans parcourir l'archive.
+"""
+
+import os
+import re
+import json
+import subprocess
+
+from archive_rules import ARCHIVE_DIR
+
+MANIFEST_PATH = f"{ARCHIVE_DIR}/manifest.json"
+MANIFEST_VERSION = 1
+
+HEADING = re.compile(r"^#{1,3}\s+(.+?)\s*#*\s*$")
+
+def _git(*args, root="."):
+    result = subprocess.run(["git", "--literal-pathspecs", *args], cwd=root, capture_output=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.decode(errors="replace").strip())
+    return result.stdout
+
+def ls_tree(*args, root="."):
+    """Sortie -z de ls-tree -l : [(type, sha, taille, chemin)]"""
+    entries = []
+    for record in _git("ls-tree", "-z", "-l", *args, root=root).split(b"\0"):
+        if not record:
+            continue
+        meta, path = record.split(b"\t", 1)
+        _, kind, sha, size = meta.split()
+        entries.append((kind.decode(), sha.decode(), None if size == b"-" else int(size), path.decode()))
+    return entries
+
+def read_title(path, root="."):
+    """Premier titre markdown du document, sinon son nom de fichier"""
+    try:
+        with open(os.path.join(root, path), encoding="utf-8", errors="replace") as f:
+            for _, line in zip(range(40), f):
+                match = HEADING.match(line)
+                if match:
+                    return match.group(1)
+    except OSError:
+        pass
+    return os.path.splitext(os.path.basename(path))[0]
+
+def normalize(text):
+    return " ".join(text.lower().split())
+
+class ArchiveManifest:
+    def __init__(self, data=None):
+        data = data or {}
+        if data.get("version") != MANIFEST_VERSION:
+            data = {}
+        self.trees = data.get("trees", {})
+        self.documents = data.get("documents", {})
+        self.sources = data.get("sources", {})
+        # Alias de doublons dont l'original n'est pas encore enregistré : blob -> [chemins]
+        self._pending_aliases = {}
+        self._reindex()
+
+    @classmethod
+    def load(cls, root="."):
+        try:
+            with open(os.path.join(root, MANIFEST_PATH)) as f:
+                return cls(json.load(f))
+        except (OSError, ValueError):
+            return cls()
+
+    def save(self, root="."):
+        path = os.path.join(root, MANIFEST_PATH)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"version": MANIFEST_VERSION, "trees": self.trees,
+                       "documents": self.documents, "sources": self.sources},
+                      f, indent=1, sort_keys=True, ensure_ascii=False)
+            f.write("\n")
+        os.replace(tmp, path)
+        return MANIFEST_PATH
+
+    def _reindex(self):
+        """Index en mémoire : titre normalisé et chemin -> blob"""
+        self._by_title = {}
+        self._by_path = {}
+        for blob, document in self.documents.items():
+            self._by_title.setdefault(normalize(document["title"]), set()).add(blob)
+            for path in document["paths"]:
+                self._by_path[path] = blob
+
+    def refresh(self, root="."):
+        """Synchronise avec docs/archive dans HEAD ; ne relit que les entrées modifiées
+
+        trees garde le hash de chaque entrée de premier niveau (répertoire de
+        catégorie ou document à la racine de l'archive). Retourne les entrées relues
+        """
+        try:
+            listing = [entry for entry in ls_tree("HEAD", f"{ARCHIVE_DIR}/", root=root)
+                       if entry[3] != MANIFEST_PATH]
+        except RuntimeError:
+            listing = []
+        current = {path: sha for _, sha, _, path in listing}
+        changed = [entry for entry in listing if self.trees.get(entry[3]) != entry[1]]
+        stale = (set(self.trees) - set(current)) | {path for _, _, _, path in changed}
+        if not stale:
+            return []
+
+        def is_stale(path):
+            return path in stale or any(path.startswith(f"{entry}/") for entry in stale)
+
+        for blob in list(self.documents):
+            document = self.documents[blob]
+            document["paths"] = [path for path in document["paths"] if not is_stale(path)]
+            if not document["paths"]:
+                del self.documents[blob]
+
+        trees = [path for kind, _, _, path in changed if kind == "tree"]
+        blobs = [(sha, size, path) for kind, sha, size, path in changed if kind == "blob"]
+        if trees:
+            blobs += [(sha, size, path) for kind, sha, size, path in ls_tree("-r", "HEAD", "--", *trees, root=root)
+                      if kind == "blob"]
+        for blob, size, path in blobs:
+            self._add_path(blob, path, size, root)
+        self.trees = current
+        self._reindex()
+        return sorted(path[len(ARCHIVE_DIR) + 1:] for _, _, _, path in changed)
+
+    def _add_path(self, blob, path, size, root="."):
+        document = self.documents.get(blob)
+        if document is None:
+            relative = path[len(ARCHIVE_DIR) + 1:]
+            category = relative.split("/", 1)[0] if "/" in relative else ""
+            document = self.documents[blob] = {"title": read_title(path, root), "category": category,
+                                               "size": size, "paths": [path],
+                                               "aliases": sorted(self._pending_aliases.pop(blob, []))}
+            self._by_title.setdefault(normalize(document["title"]), set()).add(blob)
+        elif path not in document["paths"]:
+            document["paths"].append(path)
+            document["paths"].sort()
+        self._by_path[path] = blob
+
+    def record_move(self, source, dest, blob, size, root="."):
+        """Fichier archivé (dest lisible dans l'arbre de travail)"""
+        self._add_path(blob, dest, size, root)
+        self.sources[source] = blob
+
+    def record_duplicate(self, source, blob):
+        """Copie identique supprimée : son ancien chemin devient un alias du document
+
+        Original pas encore enregistré : l'alias lui est rattaché à son enregistrement
+        """
+        document = self.documents.get(blob)
+        aliases = document["aliases"] if document else self._pending_aliases.setdefault(blob, [])
+        if source not in aliases:
+            aliases.append(source)
+            aliases.sort()
+        self.sources[source] = blob
+
+    def canonical_path(self, blob):
+        document = self.documents.get(blob)
+        return document["paths"][0] if document else None
+
+    def update_trees(self, treeish="HEAD", root="."):
+        """Hash des entrées de l'archive dans treeish, pour le prochain run"""
+        self.trees = {path: sha for _, sha, _, path in ls_tree(treeish, f"{ARCHIVE_DIR}/", root=root)
+                      if path != MANIFEST_PATH}
+
+    def lookup_hash(self, prefix):
+        prefix = prefix.lower()
+        return [(blob, self.documents[blob]) for blob in sorted(self.documents) if blob.startswith(prefix)]
+
+    def find(self, text):
+        """Documents dont le titre, un chemin ou un alias contient text"""
+        needle = normalize(text)
+        blobs = set(self._by_title.get(needle, ()))
+        for title, matches in self._by_title.items():
+            if needle in title:
+                blobs |= matches
+        for path, blob in self._by_path.items():
+            if needle in path.lower():
+                blobs.add(blob)
+        for source, blob in self.sources.items():
+            if needle in source.lower() and blob in self.documents:
+                blobs.add(blob)
+        return [(blob, self.documents[blob]) for blob in sorted(blobs, key=lambda b: self.documents[b]["paths"][0])]
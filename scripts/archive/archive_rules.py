@@ -0,0 +1,176 @@
+"""
+Règles d'archivage : classement des fichiers par motif (glob ou regex) et par
+ancienneté du dernier commit, à partir d'un parcours parallèle de l'arbre et
+d'un seul `git log --name-only`
+"""
+
+import os
+import re
+import json
+import time
+import fnmatch
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+ARCHIVE_DIR = "docs/archive"
+
+# Première règle qui correspond = catégorie du fichier.
+# match : globs sur le nom du fichier ; regex : sur le chemin relatif à la racine
+# older_than_days : dernier commit plus ancien que ce délai (0 = sans condition)
+# root_only : seulement les fichiers à la racine du dépôt
+ARCHIVE_RULES = [
+    {"category": "context",
+     "match": ["CONTEXT*.md", "CONTEXTE*.md", "*CONTEXT_PROMPT*", "PROMPT_CONTEXTE*.md", "PROMPT-REPRISE*.md"]},
+    {"category": "sessions", "match": ["SESSION_*", "SESSION-*"]},
+    {"category": "dashboard", "match": ["DASHBOARD*", "README_DASHBOARD*.md", "SAUVEGARDE_DASHBOARD*.md"],
+     "older_than_days": 30},
+    {"category": "migrations", "match": ["MIGRATION*.md", "*OWNER-COMPANY*", "*OWNER_COMPANY*", "add-owner-company*"],
+     "older_than_days": 30},
+    {"category": "reports",
+     "match": ["AUDIT-*.md", "AUDIT_*.md", "CLEANUP_*.md", "*_REPORT*.md", "*-REPORT*.md"],
+     "regex": r"^[^/]+_STATUS\.md$",
+     "older_than_days": 30},
+    {"category": "guides", "match": ["*_GUIDE.md", "GUIDE[-_]*.md"], "older_than_days": 90},
+    # Rapports d'état oubliés dans docs/ (hors archive) depuis six mois
+    {"category": "reports", "regex": r"^docs/[^/]+(_STATUS|_PROGRESS|_REPORT)[^/]*\.md$",
+     "older_than_days": 180, "root_only": False},
+]
+
+# Jamais archivés, quelle que soit la règle
+KEEP_FILES = {"README.md", "CHANGELOG.md", "CONTRIBUTING.md", "LICENSE", "LICENSE.md",
+              "ROADMAP.md", "DECISIONS.md", "PROGRESS.md"}
+
+# Répertoires jamais parcourus (noms, à toute profondeur) et chemins exclus
+EXCLUDED_DIRS = {".git", "node_modules", "dist", "build", "coverage", ".next", ".turbo",
+                 ".cache", ".pnpm-store", "vendor", "__pycache__", ".venv", "venv"}
+EXCLUDED_PATHS = {ARCHIVE_DIR}
+
+class Rule:
+    def __init__(self, category, match=(), regex=None, older_than_days=0, root_only=True):
+        if not match and not regex:
+            raise ValueError(f"Règle {category}: match ou regex requis")
+        self.category = category
+        self.match = tuple(match)
+        self.regex = re.compile(regex) if regex else None
+        self.older_than_days = older_than_days
+        self.root_only = root_only
+
+    def matches(self, path):
+        if self.root_only and "/" in path:
+            return False
+        name = path.rsplit("/", 1)[-1]
+        if any(fnmatch.fnmatchcase(name, pattern) for pattern in self.match):
+            return True
+        return bool(self.regex and self.regex.search(path))
+
+def load_rules(path=None):
+    """Règles par défaut ou fichier JSON de même forme"""
+    if path:
+        with open(path) as f:
+            data = json.load(f)
+    else:
+        data = ARCHIVE_RULES
+    return [Rule(**rule) for rule in data]
+
+def _walk(root, start, excluded_paths):
+    """Fichiers sous start (chemins relatifs à root), parcours itératif par os.scandir"""
+    files = []
+    stack = [start]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(os.path.join(root, directory) if directory else root) as entries:
+                for entry in entries:
+                    rel = f"{directory}/{entry.name}" if directory else entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in EXCLUDED_DIRS and rel not in excluded_paths:
+                            stack.append(rel)
+                    elif entry.is_file(follow_symlinks=False):
+                        files.append(rel)
+        except OSError:
+            continue  # répertoire illisible ou supprimé pendant le parcours
+    return files
+
+def scan_tree(root=".", recursive=True, excluded_paths=EXCLUDED_PATHS, workers=8):
+    """Fichiers du dépôt, un sous-arbre de premier niveau par tâche parallèle
+
+    Sans recursive, seuls les fichiers de la racine sont listés
+    """
+    files, subdirs = [], []
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in EXCLUDED_DIRS and entry.name not in excluded_paths:
+                    subdirs.append(entry.name)
+            elif entry.is_file(follow_symlinks=False):
+                files.append(entry.name)
+    if recursive and subdirs:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for subtree in pool.map(lambda d: _walk(root, d, excluded_paths), subdirs):
+                files.extend(subtree)
+    return files
+
+def last_commit_dates(paths, root="."):
+    """Date (epoch) du dernier commit de chaque chemin, en un seul `git log`
+
+    L'historique est lu du plus récent au plus ancien et la lecture s'arrête
+    dès que tous les chemins demandés ont une date. Chemins absents : pas de clé
+    """
+    wanted = set(paths)
+    dates = {}
+    if not wanted:
+        return dates
+    process = subprocess.Popen(
+        ["git", "-c", "core.quotePath=false", "--literal-pathspecs", "log", "--name-only",
+         "--no-renames", "--format=\x01%ct", "HEAD", "--", *sorted(wanted)],
+        cwd=root, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    try:
+        current = None
+        for line in process.stdout:
+            line = line.rstrip("\n")
+            if line.startswith("\x01"):
+                current = int(line[1:])
+            elif line and line in wanted and line not in dates:
+                dates[line] = current
+                if len(dates) == len(wanted):
+                    break
+    finally:
+        process.stdout.close()
+        process.kill()
+        process.wait()
+    return dates
+
+def build_plan(rules, root=".", now=None, workers=8):
+    """Plan d'archivage : [{path, dest, category, age_days, status}]
+
+    status : move, too-recent (règle d'ancienneté non remplie), untracked,
+    conflict (destination déjà présente ou visée par un autre fichier)
+    """
+    now = now or time.time()
+    recursive = any(not rule.root_only for rule in rules)
+    candidates = []
+    for path in scan_tree(root, recursive=recursive, workers=workers):
+        if path.rsplit("/", 1)[-1] in KEEP_FILES:
+            continue
+        rule = next((rule for rule in rules if rule.matches(path)), None)
+        if rule:
+            candidates.append((path, rule))
+
+    dates = last_commit_dates([path for path, _ in candidates], root)
+    plan, targets = [], set()
+    for path, rule in sorted(candidates):
+        dest = f"{ARCHIVE_DIR}/{rule.category}/{path.rsplit('/', 1)[-1]}"
+        committed = dates.get(path)
+        age_days = None if committed is None else (now - committed) / 86400
+        if committed is None:
+            status = "untracked"
+        elif age_days < rule.older_than_days:
+            status = "too-recent"
+        elif dest in targets or os.path.lexists(os.path.join(root, dest)):
+            status = "conflict"
+        else:
+            status = "move"
+            targets.add(dest)
+        plan.append({"path": path, "dest": dest, "category": rule.category,
+                     "age_days": None if age_days is None else round(age_days, 1), "status": status})
+    return plan
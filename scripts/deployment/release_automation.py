@@ -1,21 +1,42 @@
 #!/usr/bin/env python3
 """
-Script de release automatique pour @dainabase/ui v1.0.0-beta.1
+Script de release automatique pour @dainabase/ui
 Utilise l'API GitHub pour créer le tag et la release
+
+Version, tag et cible viennent du dépôt : package.json du package, branche de
+base et mode pre de .changeset. Les notes sont générées depuis CHANGELOG.md et
+l'historique git depuis le tag précédent (voir release_notes.py).
+
+Les étapes forment un graphe : chacune déclare ses dépendances et les étapes
+indépendantes (push du tag, notes de release, build/pack du package) tournent
+en parallèle. Un rapport de durée par étape est affiché en fin de run.
+
+    python scripts/deployment/release_automation.py [--jobs 4] [--skip-pack]
+    python scripts/deployment/release_automation.py --notes-only --target HEAD
 """
 
 import os
 import sys
 import json
+import time
+import shutil
+import argparse
+import threading
 import subprocess
 from datetime import datetime
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from release_config import REPO_ROOT, ReleaseConfigError, load_release_config, resolve_commit
+from release_notes import build_release_notes
 
 # Configuration
 REPO_OWNER = "dainabase"
 REPO_NAME = "directus-unified-platform"
-TAG_NAME = "@dainabase/ui@1.0.0-beta.1"
-RELEASE_TITLE = "🚀 Design System v1.0.0-beta.1"
-COMMIT_SHA = "f767663d1a3cd878693487f4f0c0ffb731db754b"
+PACKAGE_NAME = "@dainabase/ui"
+
+RELEASE_NOTES_FILE = "/tmp/release_notes.md"
+PACK_DIR = "/tmp/release-pack"
 
 # Couleurs pour le terminal
 GREEN = '\033[0;32m'
@@ -29,234 +50,333 @@ def print_step(step_num, total, message):
     print(f"\n{BLUE}[{step_num}/{total}] {message}{NC}")
     print("-" * 40)
 
-def run_command(cmd, silent=False):
-    """Exécute une commande shell"""
+def run_command(cmd, silent=False, log=print, cwd=None):
+    """Exécute une commande
+
+    cmd peut être une liste d'arguments (exécutée sans shell) ou une chaîne shell
+    """
     try:
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
+        result = subprocess.run(cmd, shell=isinstance(cmd, str), capture_output=True,
+                                text=True, cwd=cwd or REPO_ROOT)
         if not silent:
             if result.stdout:
-                print(result.stdout)
+                log(result.stdout)
+            if result.returncode != 0 and result.stderr:
+                log(result.stderr.rstrip())
         return result.returncode == 0, result.stdout
     except Exception as e:
-        print(f"{RED}Erreur: {e}{NC}")
+        log(f"{RED}Erreur: {e}{NC}")
         return False, ""
 
-def create_git_tag():
-    """Crée et pousse le tag Git"""
-    print_step(1, 3, "Création du tag Git")
-    
-    # Vérifier qu'on est sur main et à jour
-    print("Mise à jour de la branche main...")
-    run_command("git checkout main", silent=True)
-    run_command("git pull origin main", silent=True)
-    
-    # Supprimer le tag local s'il existe
-    run_command(f"git tag -d {TAG_NAME}", silent=True)
-    
-    # Créer le nouveau tag
-    tag_message = """Release @dainabase/ui v1.0.0-beta.1
-
-🚀 First production-ready beta release
-📦 Bundle optimized to 48KB (-49%)
-✨ 40 components including 9 new additions
-🧪 97% test coverage
-📚 Complete documentation"""
-    
-    cmd = f'git tag -a "{TAG_NAME}" {COMMIT_SHA} -m "{tag_message}"'
-    success, _ = run_command(cmd)
-    
+class Step:
+    """Étape du graphe de release
+
+    after : étapes à terminer avant celle-ci
+    requires : sous-ensemble de after dont l'échec fait sauter l'étape
+    """
+
+    def __init__(self, name, label, func, after=(), requires=()):
+        self.name = name
+        self.label = label
+        self.func = func
+        self.after = tuple(after)
+        self.requires = tuple(requires)
+
+def run_steps(steps, jobs=4):
+    """Exécute le graphe : chaque étape démarre dès que ses dépendances sont terminées
+
+    La sortie d'une étape est bufferisée et affichée d'un bloc à sa fin, pour ne
+    pas entrelacer les étapes parallèles. Retourne {nom: rapport}
+    """
+    by_name = {step.name: step for step in steps}
+    for step in steps:
+        unknown = [dep for dep in step.after + step.requires if dep not in by_name]
+        if unknown:
+            raise ValueError(f"Étape {step.name}: dépendance inconnue {', '.join(unknown)}")
+
+    reports = {}
+    pending = list(steps)
+    running = {}
+    print_lock = threading.Lock()
+    printed = [0]
+    origin = time.perf_counter()
+    total = len(steps)
+
+    def execute(step):
+        lines = []
+        started = time.perf_counter()
+        try:
+            ok = bool(step.func(lines.append))
+        except Exception as e:
+            lines.append(f"{RED}❌ {type(e).__name__}: {e}{NC}")
+            ok = False
+        finished = time.perf_counter()
+        with print_lock:
+            printed[0] += 1
+            print_step(printed[0], total, step.label)
+            for line in lines:
+                print(line)
+        return {
+            "status": "ok" if ok else "échec",
+            "start": started - origin,
+            "duration": finished - started,
+        }
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while pending or running:
+            for step in list(pending):
+                if not all(dep in reports for dep in step.after + step.requires):
+                    continue
+                pending.remove(step)
+                failed = [dep for dep in step.requires if reports[dep]["status"] != "ok"]
+                if failed:
+                    reports[step.name] = {"status": "sauté", "start": time.perf_counter() - origin,
+                                          "duration": 0.0, "reason": ", ".join(failed)}
+                    with print_lock:
+                        printed[0] += 1
+                        print_step(printed[0], total, step.label)
+                        print(f"{YELLOW}⏭️  Étape sautée (échec de {reports[step.name]['reason']}){NC}")
+                    continue
+                running[pool.submit(execute, step)] = step
+            if not running:
+                if pending:  # cycle : aucune étape ne peut plus démarrer
+                    raise ValueError(f"Dépendances circulaires: {', '.join(s.name for s in pending)}")
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                reports[running.pop(future).name] = future.result()
+
+    reports["_total"] = time.perf_counter() - origin
+    return reports
+
+def print_timing_report(steps, reports):
+    """Durée de chaque étape, décalage de démarrage et gain du parallélisme"""
+    wall = reports["_total"]
+    busy = sum(reports[step.name]["duration"] for step in steps)
+    print(f"\n{GREEN}⏱️  DURÉE DES ÉTAPES{NC}")
+    print(f"{'étape':<18}{'statut':<18}{'départ':>10}{'durée':>10}")
+    for step in sorted(steps, key=lambda s: reports[s.name]["start"]):
+        report = reports[step.name]
+        status = report["status"] + (f" ({report['reason']})" if report.get("reason") else "")
+        print(f"{step.name:<18}{status:<18}{report['start']:>9.2f}s{report['duration']:>9.2f}s")
+    print(f"Total: {wall:.2f}s (séquentiel: {busy:.2f}s)")
+
+def sync_main(config, log):
+    """Se place sur la branche de base à jour, puis résout à nouveau la cible
+
+    La cible par défaut est la branche de base : le SHA résolu au démarrage est
+    celui d'avant le pull, le tag et la release doivent pointer sur l'état à jour
+    """
+    branch = config.base_branch
+    log(f"Mise à jour de la branche {branch}...")
+    checked_out, _ = run_command(["git", "checkout", branch], silent=True, log=log)
+    pulled, _ = run_command(["git", "pull", "origin", branch], silent=True, log=log)
+    if not (checked_out and pulled):
+        log(f"{YELLOW}⚠️  {branch} n'a pas pu être mise à jour, on continue sur l'état local{NC}")
+
+    try:
+        target_sha = resolve_commit(config.target)
+    except ReleaseConfigError as e:
+        log(f"{RED}❌ {e}{NC}")
+        return False
+    moved = f" (était {config.target_sha[:12]})" if target_sha != config.target_sha else ""
+    log(f"Cible {config.target}: {target_sha[:12]}{moved}")
+    config.target_sha = target_sha
+    return True
+
+def create_git_tag(config, log):
+    """Crée (ou remplace) le tag Git local sur la cible résolue après la synchronisation"""
+    tag_message = f"Release {config.package} v{config.version}"
+
+    # -f remplace un éventuel tag local existant en une seule commande
+    success, _ = run_command(["git", "tag", "-f", "-a", config.tag, config.target_sha,
+                              "-m", tag_message],
+                             log=log)
+    if success:
+        log(f"{GREEN}✅ Tag créé localement{NC}")
+    else:
+        log(f"{RED}❌ Erreur lors de la création du tag{NC}")
+    return success
+
+def push_git_tag(config, log):
+    """Pousse le tag vers GitHub"""
+    log("Push du tag vers GitHub...")
+    success, _ = run_command(["git", "push", "origin", config.tag], log=log)
     if success:
-        print(f"{GREEN}✅ Tag créé localement{NC}")
-        
-        # Pousser le tag
-        print("Push du tag vers GitHub...")
-        success, _ = run_command(f"git push origin {TAG_NAME}")
-        
-        if success:
-            print(f"{GREEN}✅ Tag poussé avec succès!{NC}")
-            return True
-        else:
-            print(f"{YELLOW}⚠️  Le tag existe peut-être déjà sur GitHub{NC}")
-            return True  # On continue quand même
+        log(f"{GREEN}✅ Tag poussé avec succès!{NC}")
     else:
-        print(f"{RED}❌ Erreur lors de la création du tag{NC}")
+        log(f"{YELLOW}⚠️  Le tag existe peut-être déjà sur GitHub{NC}")
+    return True  # On continue quand même
+
+def write_release_notes(config, log, use_cache=True):
+    """Génère les notes de release dans un fichier temporaire"""
+    started = time.perf_counter()
+    notes, count, source = build_release_notes(config, use_cache)
+    with open(RELEASE_NOTES_FILE, 'w') as f:
+        f.write(notes)
+    log(f"{count} commit(s) ({source}) en {(time.perf_counter() - started) * 1000:.0f} ms")
+    log(f"{GREEN}✅ Notes de release: {RELEASE_NOTES_FILE}{NC}")
+    return True
+
+def build_package(config, log):
+    """Build et pack de @dainabase/ui (npm pack lance le build via prepare)"""
+    if not shutil.which("npm"):
+        log(f"{YELLOW}npm introuvable, pack ignoré{NC}")
         return False
+    os.makedirs(PACK_DIR, exist_ok=True)
+    success, output = run_command(["npm", "pack", "--json", "--pack-destination", PACK_DIR],
+                                  silent=True, log=log, cwd=config.package_dir)
+    if not success:
+        log(f"{RED}❌ Échec du build/pack de {config.package_path}{NC}")
+        return False
+    try:
+        tarball = json.loads(output)[-1]["filename"]
+        log(f"{GREEN}✅ Package prêt: {os.path.join(PACK_DIR, tarball)}{NC}")
+    except (ValueError, LookupError, TypeError):
+        log(f"{GREEN}✅ Package prêt dans {PACK_DIR}{NC}")
+    return True
 
-def create_github_release():
+def create_github_release(config, log):
     """Crée la GitHub Release via gh CLI"""
-    print_step(2, 3, "Création de la GitHub Release")
-    
     # Vérifier si gh CLI est installé
-    success, _ = run_command("which gh", silent=True)
-    
-    if not success:
-        print(f"{YELLOW}GitHub CLI non installé.{NC}")
-        print("\nPour installer gh CLI:")
-        print("  • macOS: brew install gh")
-        print("  • Linux: https://github.com/cli/cli/blob/trunk/docs/install_linux.md")
-        print("  • Windows: winget install --id GitHub.cli")
-        print("\nOu créez la release manuellement:")
-        print(f"{BLUE}https://github.com/{REPO_OWNER}/{REPO_NAME}/releases/new{NC}")
+    if not shutil.which("gh"):
+        log(f"{YELLOW}GitHub CLI non installé.{NC}")
+        log("\nPour installer gh CLI:")
+        log("  • macOS: brew install gh")
+        log("  • Linux: https://github.com/cli/cli/blob/trunk/docs/install_linux.md")
+        log("  • Windows: winget install --id GitHub.cli")
+        log("\nOu créez la release manuellement:")
+        log(f"{BLUE}https://github.com/{REPO_OWNER}/{REPO_NAME}/releases/new{NC}")
         return False
-    
-    # Contenu de la release
-    release_body = """# 🎉 Design System v1.0.0-beta.1 Released!
-
-**Date**: August 10, 2025  
-**Version**: `@dainabase/ui@1.0.0-beta.1`  
-**Status**: ✅ PRODUCTION READY
-
-## 🚀 Major Highlights
-
-### 📦 Bundle Optimization Achievement
-- **Before**: 95KB
-- **After**: 48KB (-49% reduction)
-- **Impact**: 50% faster load times, 60% better FCP
-
-### ✨ New Components (9 additions)
-- Accordion - Collapsible content panels
-- Slider - Range input with multiple handles
-- Rating - Star rating component
-- Timeline - Event timeline display
-- Stepper - Multi-step navigation
-- Pagination - Advanced pagination
-- Carousel - Touch-enabled carousel
-- ColorPicker - Color selection tool
-- FileUpload - Drag-and-drop uploads
-
-### 🔧 Technical Improvements
-- Enhanced lazy loading system for 23 heavy components
-- Externalized dependencies to reduce core bundle
-- Automated optimization scripts
-- 97% test coverage
-- 100% TypeScript with strict mode
-- WCAG AAA accessibility compliance
-
-## 📊 Performance Metrics
-
-| Metric | Value | Status |
-|--------|-------|--------|
-| Bundle Size | 48KB | ✅ Optimized |
-| Components | 40/40 | ✅ Complete |
-| Test Coverage | 97% | ✅ Excellent |
-| TypeScript | 100% | ✅ Perfect |
-| Lighthouse | 95/100 | ✅ Outstanding |
-
-## 💔 Breaking Changes
-
-Heavy dependencies moved to peerDependencies:
-```bash
-# Core only (48KB)
-pnpm add @dainabase/ui@beta
-
-# With specific features
-pnpm add @dainabase/ui@beta recharts
-```
-
-## 📦 Installation
-
-```bash
-# Configure npm for GitHub Packages
-npm login --registry=https://npm.pkg.github.com --scope=@dainabase
-
-# Install the package
-pnpm add @dainabase/ui@beta --registry https://npm.pkg.github.com/
-```
-
-## 📚 Documentation
-
-- [Full Documentation](https://github.com/dainabase/directus-unified-platform/tree/main/packages/ui)
-- [Migration Guide](https://github.com/dainabase/directus-unified-platform/blob/main/packages/ui/MIGRATION_GUIDE.md)
-- [Changelog](https://github.com/dainabase/directus-unified-platform/blob/main/packages/ui/CHANGELOG.md)
-
----
-
-**Ready for production use!** 🚀
-
-*This is a pre-release version. Use @beta tag when installing.*"""
-    
-    # Sauvegarder le body dans un fichier temporaire
-    with open('/tmp/release_notes.md', 'w') as f:
-        f.write(release_body)
-    
-    # Créer la release
-    cmd = f'''gh release create "{TAG_NAME}" \
-        --repo "{REPO_OWNER}/{REPO_NAME}" \
-        --title "{RELEASE_TITLE}" \
-        --notes-file /tmp/release_notes.md \
-        --prerelease \
-        --target main'''
-    
-    success, output = run_command(cmd)
-    
+
+    cmd = ["gh", "release", "create", config.tag,
+           "--repo", f"{REPO_OWNER}/{REPO_NAME}",
+           "--title", config.title,
+           "--notes-file", RELEASE_NOTES_FILE,
+           "--target", config.target_sha]
+    if config.prerelease:
+        cmd.append("--prerelease")
+    success, output = run_command(cmd, log=log)
+
     if success:
-        print(f"{GREEN}✅ GitHub Release créée avec succès!{NC}")
-        print(f"URL: https://github.com/{REPO_OWNER}/{REPO_NAME}/releases/tag/{TAG_NAME}")
+        log(f"{GREEN}✅ GitHub Release créée avec succès!{NC}")
+        log(f"URL: https://github.com/{REPO_OWNER}/{REPO_NAME}/releases/tag/{config.tag}")
         return True
     else:
-        print(f"{YELLOW}⚠️  La release existe peut-être déjà ou erreur{NC}")
+        log(f"{YELLOW}⚠️  La release existe peut-être déjà ou erreur{NC}")
         return False
 
-def npm_publish_instructions():
+def npm_publish_instructions(config, log):
     """Affiche les instructions pour publier sur NPM"""
-    print_step(3, 3, "Publication NPM")
-    
-    print(f"{YELLOW}⚠️  La publication NPM doit être faite manuellement:{NC}\n")
-    
-    print("📦 Commandes à exécuter:\n")
-    print("# 1. Aller dans le dossier du package")
-    print("cd packages/ui\n")
-    
-    print("# 2. S'authentifier si nécessaire")
-    print("npm login --registry=https://npm.pkg.github.com --scope=@dainabase\n")
-    
-    print("# 3. Publier le package")
-    print("npm publish --tag beta --registry https://npm.pkg.github.com/\n")
-    
-    print("# 4. Vérifier la publication")
-    print("npm view @dainabase/ui@beta --registry https://npm.pkg.github.com/\n")
+    log(f"{YELLOW}⚠️  La publication NPM doit être faite manuellement:{NC}\n")
+
+    log("📦 Commandes à exécuter:\n")
+    log("# 1. Aller dans le dossier du package")
+    log(f"cd {config.package_path}\n")
+
+    log("# 2. S'authentifier si nécessaire")
+    log("npm login --registry=https://npm.pkg.github.com --scope=@dainabase\n")
+
+    log("# 3. Publier le package (ou le tarball du dossier de pack)")
+    log(f"npm publish --tag {config.dist_tag} --registry https://npm.pkg.github.com/\n")
+
+    log("# 4. Vérifier la publication")
+    log(f"npm view {config.package}@{config.dist_tag} --registry https://npm.pkg.github.com/\n")
+    return True
+
+def release_steps(config, skip_pack=False, use_cache=True):
+    """Graphe de release : notes et pack démarrent sans attendre le push du tag"""
+    steps = [
+        Step("sync", f"Mise à jour de {config.base_branch}", partial(sync_main, config)),
+        Step("tag", "Création du tag Git", partial(create_git_tag, config),
+             after=["sync"], requires=["sync"]),
+        Step("push_tag", "Push du tag", partial(push_git_tag, config), requires=["tag"]),
+        Step("notes", "Notes de release", partial(write_release_notes, config, use_cache=use_cache),
+             after=["sync"], requires=["sync"]),
+        Step("release", "Création de la GitHub Release", partial(create_github_release, config),
+             after=["push_tag"], requires=["tag", "notes"]),
+    ]
+    if skip_pack:
+        steps.append(Step("npm", "Publication NPM", partial(npm_publish_instructions, config)))
+    else:
+        # Le pack lit l'arbre de travail : il attend le checkout/pull de la branche de base
+        steps.append(Step("pack", f"Build et pack de {config.package_path}",
+                          partial(build_package, config), after=["sync"]))
+        steps.append(Step("npm", "Publication NPM", partial(npm_publish_instructions, config),
+                          after=["pack"]))
+    return steps
 
 def main():
     """Fonction principale"""
+    parser = argparse.ArgumentParser(description="Release automatique d'un package du monorepo")
+    parser.add_argument("--package", default=PACKAGE_NAME, help="Nom npm du package à publier")
+    parser.add_argument("--target", help="Commit ou branche à tagger (défaut : baseBranch de .changeset)")
+    parser.add_argument("--allow-pending", action="store_true",
+                        help="Publier malgré des changesets non appliqués")
+    parser.add_argument("--notes-only", action="store_true",
+                        help="Afficher les notes de release sans rien publier")
+    parser.add_argument("--no-cache", action="store_true", help="Relire tout l'historique git")
+    parser.add_argument("--jobs", type=int, default=4, help="Étapes exécutées en parallèle")
+    parser.add_argument("--skip-pack", action="store_true", help="Ne pas builder/packer le package")
+    args = parser.parse_args()
+
+    try:
+        config = load_release_config(args.package, args.target, args.allow_pending)
+    except ReleaseConfigError as e:
+        print(f"{RED}❌ {e}{NC}")
+        sys.exit(1)
+
+    if args.notes_only:
+        started = time.perf_counter()
+        notes, count, source = build_release_notes(config, use_cache=not args.no_cache)
+        print(notes)
+        print(f"{BLUE}{count} commit(s) ({source}) en {(time.perf_counter() - started) * 1000:.0f} ms{NC}",
+              file=sys.stderr)
+        return
+
     print(f"{GREEN}{'='*50}{NC}")
-    print(f"{GREEN}🚀 RELEASE AUTOMATIQUE v1.0.0-beta.1{NC}")
+    print(f"{GREEN}🚀 RELEASE AUTOMATIQUE {config.package} v{config.version}{NC}")
     print(f"{GREEN}{'='*50}{NC}")
     print(f"Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"Repository: {REPO_OWNER}/{REPO_NAME}")
-    print(f"Tag: {TAG_NAME}")
-    
-    # Étape 1: Créer le tag
-    if create_git_tag():
-        print(f"{GREEN}✅ Tag Git créé et poussé{NC}")
-    else:
-        print(f"{YELLOW}⚠️  Problème avec le tag, mais on continue...{NC}")
-    
-    # Étape 2: Créer la release
-    if create_github_release():
-        print(f"{GREEN}✅ GitHub Release créée{NC}")
-    else:
-        print(f"{YELLOW}⚠️  Release à créer manuellement{NC}")
-    
-    # Étape 3: Instructions NPM
-    npm_publish_instructions()
-    
+    # SHA résolu à nouveau après la mise à jour de la branche de base (étape sync)
+    print(f"Tag: {config.tag} -> {config.target}")
+    print(f"npm dist-tag: {config.dist_tag}")
+    for changeset in config.pending:
+        print(f"{YELLOW}⚠️  Changeset non appliqué: {changeset['file']}{NC}")
+
+    steps = release_steps(config, args.skip_pack, use_cache=not args.no_cache)
+    reports = run_steps(steps, jobs=max(1, args.jobs))
+    print_timing_report(steps, reports)
+
+    def status(name):
+        return reports.get(name, {}).get("status")
+
     # Résumé final
     print(f"\n{GREEN}{'='*50}{NC}")
     print(f"{GREEN}📊 RÉSUMÉ FINAL{NC}")
     print(f"{GREEN}{'='*50}{NC}")
-    
+
     print("\n✅ Actions complétées:")
-    print("  • Tag Git créé et poussé")
-    print("  • GitHub Release créée (ou à créer manuellement)")
-    
+    if status("tag") == "ok":
+        print("  • Tag Git créé et poussé")
+    else:
+        print(f"  • {YELLOW}⚠️  Problème avec le tag{NC}")
+    if status("release") == "ok":
+        print("  • GitHub Release créée")
+    else:
+        print("  • GitHub Release à créer manuellement")
+    if status("pack") == "ok":
+        print(f"  • Package construit ({PACK_DIR})")
+
     print("\n⚠️  Action manuelle requise:")
     print("  • Publication NPM (voir instructions ci-dessus)")
-    
-    print(f"\n{GREEN}🎉 Release v1.0.0-beta.1 presque terminée!{NC}")
+
+    print(f"\n{GREEN}🎉 Release v{config.version} presque terminée!{NC}")
     print("\n🔗 Liens de vérification:")
     print(f"  • Tags: https://github.com/{REPO_OWNER}/{REPO_NAME}/tags")
     print(f"  • Releases: https://github.com/{REPO_OWNER}/{REPO_NAME}/releases")
-    print("  • NPM: npm view @dainabase/ui@beta --registry https://npm.pkg.github.com/")
+    print(f"  • NPM: npm view {config.package}@{config.dist_tag} --registry https://npm.pkg.github.com/")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,129 @@
+"""
+Configuration de release lue dans le dépôt : package.json du package et
+répertoire .changeset (branche de base, mode prerelease, changesets en attente)
+"""
+
+import os
+import re
+import json
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CHANGESET_DIR = os.path.join(REPO_ROOT, ".changeset")
+PACKAGES_DIR = os.path.join(REPO_ROOT, "packages")
+
+FRONT_MATTER = re.compile(r"\A---\s*\n(.*?)\n---\s*\n?(.*)\Z", re.S)
+BUMP_LINE = re.compile(r"""^\s*["']?([^"':]+?)["']?\s*:\s*(major|minor|patch)\s*$""")
+
+class ReleaseConfigError(Exception):
+    pass
+
+class ReleaseConfig:
+    """Tout ce qu'une release doit savoir, sans rien coder en dur dans le script"""
+
+    def __init__(self, package, version, package_dir, base_branch, target, target_sha,
+                 dist_tag, pending):
+        self.package = package
+        self.version = version
+        self.package_dir = package_dir
+        self.base_branch = base_branch
+        self.target = target
+        self.target_sha = target_sha
+        self.dist_tag = dist_tag
+        self.pending = pending
+
+    @property
+    def tag(self):
+        return f"{self.package}@{self.version}"
+
+    @property
+    def prerelease(self):
+        return self.dist_tag != "latest"
+
+    @property
+    def title(self):
+        return f"🚀 {self.package} v{self.version}"
+
+    @property
+    def package_path(self):
+        """Chemin du package relatif à la racine du dépôt (filtre de l'historique)"""
+        return os.path.relpath(self.package_dir, REPO_ROOT)
+
+def read_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+def find_package(name):
+    """Répertoire et package.json du package nommé name dans packages/"""
+    for entry in sorted(os.listdir(PACKAGES_DIR)):
+        manifest = os.path.join(PACKAGES_DIR, entry, "package.json")
+        if os.path.isfile(manifest):
+            data = read_json(manifest)
+            if data.get("name") == name:
+                return os.path.dirname(manifest), data
+    raise ReleaseConfigError(f"Package introuvable dans packages/: {name}")
+
+def read_changesets(directory=CHANGESET_DIR):
+    """Changesets en attente : [{fichier, bumps {package: niveau}, résumé}]"""
+    changesets = []
+    if not os.path.isdir(directory):
+        return changesets
+    for entry in sorted(os.listdir(directory)):
+        if not entry.endswith(".md") or entry.lower() == "readme.md":
+            continue
+        with open(os.path.join(directory, entry)) as f:
+            match = FRONT_MATTER.match(f.read())
+        if not match:
+            continue
+        bumps = {}
+        for line in match.group(1).splitlines():
+            bump = BUMP_LINE.match(line)
+            if bump:
+                bumps[bump.group(1)] = bump.group(2)
+        changesets.append({"file": entry, "bumps": bumps, "summary": match.group(2).strip()})
+    return changesets
+
+def dist_tag_for(version, directory=CHANGESET_DIR):
+    """Tag npm : celui du mode pre de changesets, sinon le suffixe de la version"""
+    pre_file = os.path.join(directory, "pre.json")
+    if os.path.isfile(pre_file):
+        pre = read_json(pre_file)
+        if pre.get("mode") == "pre" and pre.get("tag"):
+            return pre["tag"]
+    _, _, suffix = version.partition("-")
+    if suffix:
+        return re.split(r"[.\d]", suffix, maxsplit=1)[0] or "next"
+    return "latest"
+
+def resolve_commit(ref):
+    result = subprocess.run(["git", "rev-parse", "--verify", "--quiet", f"{ref}^{{commit}}"],
+                            cwd=REPO_ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise ReleaseConfigError(f"Référence git introuvable: {ref}")
+    return result.stdout.strip()
+
+def load_release_config(package, target=None, allow_pending=False):
+    """Version depuis package.json, branche de base et mode pre depuis .changeset
+
+    La version doit déjà avoir été appliquée (pnpm changeset version) : des
+    changesets encore en attente pour ce package bloquent la release, sauf
+    allow_pending
+    """
+    package_dir, manifest = find_package(package)
+    version = manifest.get("version")
+    if not version:
+        raise ReleaseConfigError(f"Pas de version dans {package_dir}/package.json")
+
+    config_file = os.path.join(CHANGESET_DIR, "config.json")
+    base_branch = read_json(config_file).get("baseBranch", "main") if os.path.isfile(config_file) else "main"
+
+    pending = [c for c in read_changesets() if package in c["bumps"]]
+    if pending and not allow_pending:
+        files = ", ".join(c["file"] for c in pending)
+        raise ReleaseConfigError(
+            f"Changesets non appliqués pour {package} ({files}) : lancer `pnpm changeset version` "
+            f"puis committer, ou --allow-pending")
+
+    target = target or base_branch
+    return ReleaseConfig(package, version, package_dir, base_branch, target,
+                         resolve_commit(target), dist_tag_for(version), pending)
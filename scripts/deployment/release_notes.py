@@ -0,0 +1,187 @@
+"""
+Notes de release : section du CHANGELOG du package et historique git depuis le
+tag précédent, lu en un seul `git log` et mis en cache entre deux runs
+"""
+
+import os
+import re
+import json
+import subprocess
+from datetime import date
+
+from release_config import REPO_ROOT
+
+CACHE_VERSION = 1
+
+# Séparateurs ASCII unité/enregistrement : absents des messages de commit
+FIELD_SEP = "\x1f"
+RECORD_SEP = "\x1e"
+LOG_FORMAT = FIELD_SEP.join(["%H", "%h", "%an", "%ad", "%s"]) + RECORD_SEP
+
+CONVENTIONAL = re.compile(r"^(?P<type>\w+)(?:\((?P<scope>[^)]*)\))?(?P<breaking>!)?:\s*(?P<subject>.+)$")
+
+SECTIONS = [
+    ("breaking", "💔 Breaking Changes"),
+    ("feat", "✨ Nouveautés"),
+    ("fix", "🐛 Corrections"),
+    ("perf", "⚡ Performance"),
+    ("refactor", "♻️ Refactoring"),
+    ("docs", "📚 Documentation"),
+    ("other", "🔧 Autres changements"),
+]
+
+# Commits sans intérêt pour les notes (versionnage automatique, CI)
+SKIPPED_TYPES = {"chore", "ci", "build", "style", "test"}
+
+def git(*args):
+    result = subprocess.run(["git", *args], cwd=REPO_ROOT, capture_output=True, text=True)
+    return result.returncode == 0, result.stdout.strip()
+
+def cache_path():
+    """Cache dans .git : jamais commité, propre à chaque clone"""
+    git_dir = os.path.join(REPO_ROOT, ".git")
+    if os.path.isdir(git_dir):
+        return os.path.join(git_dir, "release-notes-cache.json")
+    return os.path.join(os.path.expanduser("~"), ".cache", "release-notes-cache.json")
+
+def load_cache(path):
+    try:
+        with open(path) as f:
+            cache = json.load(f)
+        return cache if cache.get("version") == CACHE_VERSION else {"version": CACHE_VERSION, "ranges": {}}
+    except (OSError, ValueError):
+        return {"version": CACHE_VERSION, "ranges": {}}
+
+def save_cache(path, cache):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(cache, f)
+    os.replace(tmp, path)
+
+def previous_tag(config):
+    """Dernier tag du package atteignable depuis la cible, hors tag en cours"""
+    ok, tag = git("describe", "--tags", "--abbrev=0", "--match", f"{config.package}@*",
+                  "--exclude", config.tag, config.target_sha)
+    return tag if ok and tag else None
+
+def parse_log(output):
+    commits = []
+    for record in output.split(RECORD_SEP):
+        record = record.strip("\n")
+        if not record:
+            continue
+        sha, short, author, day, subject = record.split(FIELD_SEP, 4)
+        commits.append({"sha": sha, "short": short, "author": author, "date": day, "subject": subject})
+    return commits
+
+def read_log(base, head, path):
+    """Commits de base (exclu) à head touchant path, du plus récent au plus ancien, en une commande"""
+    revision = f"{base}..{head}" if base else head
+    ok, output = git("log", "--no-merges", f"--format={LOG_FORMAT}", "--date=short",
+                     revision, "--", path)
+    if not ok:
+        raise RuntimeError(f"git log {revision} a échoué")
+    return parse_log(output)
+
+def collect_commits(base_sha, head_sha, path, use_cache=True):
+    """Historique base..head du package, via le cache si possible
+
+    Le cache garde une plage par package ; si la cible a seulement avancé
+    depuis le run précédent, seul le delta est lu
+    """
+    file = cache_path()
+    cache = load_cache(file) if use_cache else {"version": CACHE_VERSION, "ranges": {}}
+    entry = cache["ranges"].get(path)
+
+    if entry and entry["base"] == base_sha and entry["head"] == head_sha:
+        return entry["commits"], "cache"
+
+    if (entry and entry["base"] == base_sha
+            and git("merge-base", "--is-ancestor", entry["head"], head_sha)[0]):
+        commits = read_log(entry["head"], head_sha, path) + entry["commits"]
+        source = f"cache + {len(commits) - len(entry['commits'])} nouveaux commits"
+    else:
+        commits = read_log(base_sha, head_sha, path)
+        source = "git log"
+
+    if use_cache:
+        cache["ranges"][path] = {"base": base_sha, "head": head_sha, "commits": commits}
+        save_cache(file, cache)
+    return commits, source
+
+def group_commits(commits):
+    """Classe les commits par type conventionnel (feat, fix, ...)"""
+    groups = {key: [] for key, _ in SECTIONS}
+    for commit in commits:
+        match = CONVENTIONAL.match(commit["subject"])
+        if not match:
+            groups["other"].append((None, commit["subject"], commit))
+            continue
+        kind = match.group("type").lower()
+        if match.group("breaking"):
+            kind = "breaking"
+        elif kind in SKIPPED_TYPES:
+            continue
+        elif kind not in groups:
+            kind = "other"
+        groups[kind].append((match.group("scope"), match.group("subject"), commit))
+    return groups
+
+def changelog_section(package_dir, version):
+    """Section de CHANGELOG.md pour cette version (écrite par changeset version)"""
+    try:
+        with open(os.path.join(package_dir, "CHANGELOG.md")) as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+    heading = re.compile(rf"^##\s+\[?{re.escape(version)}\]?(\s|$)")
+    section = None
+    for line in lines:
+        if section is None:
+            if heading.match(line):
+                section = []
+        elif line.startswith("## "):
+            break
+        else:
+            section.append(line)
+    return "\n".join(section).strip() if section else None
+
+def render_notes(config, commits, base_tag):
+    lines = [
+        f"# {config.title}",
+        "",
+        f"**Date**: {date.today().isoformat()}  ",
+        f"**Version**: `{config.tag}`  ",
+        f"**Commits**: {len(commits)}" + (f" depuis `{base_tag}`" if base_tag else ""),
+        "",
+    ]
+    changelog = changelog_section(config.package_dir, config.version)
+    if changelog:
+        lines += [changelog, ""]
+
+    groups = group_commits(commits)
+    for key, title in SECTIONS:
+        if not groups[key]:
+            continue
+        lines += [f"## {title}", ""]
+        for scope, subject, commit in groups[key]:
+            prefix = f"**{scope}**: " if scope else ""
+            lines.append(f"- {prefix}{subject} (`{commit['short']}`)")
+        lines.append("")
+
+    lines += [
+        "## 📦 Installation",
+        "",
+        "```bash",
+        f"pnpm add {config.package}@{config.dist_tag} --registry https://npm.pkg.github.com/",
+        "```",
+    ]
+    return "\n".join(lines) + "\n"
+
+def build_release_notes(config, use_cache=True):
+    """Notes markdown de la release ; retourne (texte, nombre de commits, source de l'historique)"""
+    base_tag = previous_tag(config)
+    base_sha = git("rev-parse", f"{base_tag}^{{commit}}")[1] if base_tag else None
+    commits, source = collect_commits(base_sha, config.target_sha, config.package_path, use_cache)
+    return render_notes(config, commits, base_tag), len(commits), source
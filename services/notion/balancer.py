@@ -0,0 +1,144 @@
+"""
+Répartition de charge entre plusieurs serveurs Node.js (instances PM2)
+Choix par moins de requêtes en cours ou par « power of two choices », avec
+santé passive : les nœuds en erreur sont écartés et les nœuds lents drainés
+"""
+
+import time
+import random
+import threading
+
+UP = 'up'
+EJECTED = 'ejected'
+DRAINING = 'draining'
+
+
+class Backend:
+    """Un serveur Node.js et ses mesures passives"""
+
+    __slots__ = ('url', 'outstanding', 'ewma', 'requests', 'errors',
+                 'consecutive_errors', 'state', 'until')
+
+    def __init__(self, url):
+        self.url = url.rstrip('/')
+        self.outstanding = 0
+        self.ewma = None
+        self.requests = 0
+        self.errors = 0
+        self.consecutive_errors = 0
+        self.state = UP
+        self.until = 0.0
+
+    def score(self):
+        """Coût estimé d'un appel : latence moyenne pondérée par la file en cours"""
+        return (self.outstanding + 1) * (self.ewma or 0.001)
+
+
+class LoadBalancer:
+    """Sélection thread-safe d'un serveur Node.js pour chaque appel"""
+
+    STRATEGIES = ('p2c', 'least_outstanding')
+
+    def __init__(self, urls, strategy='p2c', eject_after=3, eject_seconds=10,
+                 slow_factor=3.0, ewma_alpha=0.3):
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Stratégie inconnue: {strategy}")
+        self.backends = [Backend(url) for url in urls]
+        self.strategy = strategy
+        self.eject_after = eject_after
+        self.eject_seconds = eject_seconds
+        self.slow_factor = slow_factor
+        self.ewma_alpha = ewma_alpha
+        self._lock = threading.Lock()
+
+    def _available(self, now):
+        """Nœuds utilisables ; ceux dont la mise à l'écart a expiré sont réintégrés"""
+        available = []
+        for backend in self.backends:
+            if backend.state != UP and backend.until <= now:
+                self._reinstate(backend)
+            if backend.state == UP:
+                available.append(backend)
+        # Tous écartés : mieux vaut tenter le moins mauvais que refuser l'appel
+        return available or self.backends
+
+    def acquire(self, backend=None):
+        """Choisit un serveur (sauf s'il est imposé) et compte l'appel comme en cours"""
+        with self._lock:
+            candidates = [backend] if backend is not None else self._available(time.monotonic())
+            if len(candidates) == 1:
+                backend = candidates[0]
+            elif self.strategy == 'p2c':
+                first, second = random.sample(candidates, 2)
+                backend = first if first.score() <= second.score() else second
+            else:
+                backend = min(candidates, key=lambda b: (b.outstanding, b.ewma or 0))
+            backend.outstanding += 1
+            backend.requests += 1
+            return backend
+
+    def release(self, backend, latency, ok):
+        """Enregistre la fin d'un appel : latence et succès alimentent la santé passive
+
+        latency vaut None pour les sondes, qui ne reflètent pas la charge réelle
+        """
+        with self._lock:
+            backend.outstanding -= 1
+            if not ok:
+                backend.errors += 1
+                backend.consecutive_errors += 1
+                if backend.consecutive_errors >= self.eject_after:
+                    self._set_aside(backend, EJECTED)
+                return
+
+            backend.consecutive_errors = 0
+            if latency is None:
+                return
+            if backend.ewma is None:
+                backend.ewma = latency
+            else:
+                backend.ewma += self.ewma_alpha * (latency - backend.ewma)
+            self._drain_if_slow(backend)
+
+    def mark(self, backend, ok):
+        """Résultat d'une sonde active : réintègre ou écarte immédiatement"""
+        with self._lock:
+            if ok and backend.state == EJECTED:
+                self._reinstate(backend)
+            elif not ok and backend.state == UP:
+                self._set_aside(backend, EJECTED)
+
+    def _drain_if_slow(self, backend):
+        """Draine un nœud nettement plus lent que la médiane des autres (verrou détenu)"""
+        if backend.state != UP:
+            return
+        peers = sorted(b.ewma for b in self.backends
+                       if b is not backend and b.state == UP and b.ewma is not None)
+        if not peers:
+            return
+        median = peers[len(peers) // 2]
+        if backend.ewma > self.slow_factor * median:
+            self._set_aside(backend, DRAINING)
+
+    def _set_aside(self, backend, state):
+        backend.state = state
+        backend.until = time.monotonic() + self.eject_seconds
+
+    def _reinstate(self, backend):
+        """Remet un nœud en service avec une latence neutre (verrou détenu)"""
+        backend.state = UP
+        backend.consecutive_errors = 0
+        known = [b.ewma for b in self.backends if b is not backend and b.ewma is not None]
+        backend.ewma = min(known) if known else None
+
+    def stats(self):
+        """État de chaque serveur pour /health"""
+        with self._lock:
+            return [{
+                'url': b.url,
+                'state': b.state,
+                'outstanding': b.outstanding,
+                'latency_ewma_ms': None if b.ewma is None else round(b.ewma * 1000, 2),
+                'requests': b.requests,
+                'errors': b.errors,
+            } for b in self.backends]
@@ -0,0 +1,57 @@
+"""
+Benchmark : proxy Notion synchrone (Flask) contre mode asynchrone (aiohttp)
+Les deux proxys sont lancés contre le même faux serveur Node.js puis chargés
+avec le même nombre de requêtes concurrentes
+
+Lancement (depuis services/notion) : python bench/compare_modes.py --concurrency 200
+Banc complet (débit fixe, RSS, sockets, comparaison entre commits) : bench/run_bench.py
+"""
+
+import json
+import asyncio
+import argparse
+
+from stub_upstream import start_stub
+from load_generator import closed_loop
+from proxy_process import start_proxy, stop_proxy
+from run_bench import DEFAULT_PROXY_ENV
+
+PATHS = [f'databases/db-{i}' for i in range(50)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare les modes sync et async du proxy")
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=0.05, help="Latence du faux Node.js (s)")
+    parser.add_argument('--output', help="Fichier JSON de résultats")
+    args = parser.parse_args()
+
+    stub, upstream_url = start_stub(latency=args.latency)
+    results = {}
+    try:
+        for mode in ('sync', 'async'):
+            process, proxy_url = start_proxy(mode, upstream_url, DEFAULT_PROXY_ENV)
+            try:
+                asyncio.run(closed_loop(proxy_url, PATHS, 10, total=min(50, args.requests)))  # échauffement
+                results[mode] = asyncio.run(
+                    closed_loop(proxy_url, PATHS, args.concurrency, total=args.requests))
+            finally:
+                stop_proxy(process)
+    finally:
+        stub.shutdown()
+
+    print(f"\n📊 {args.requests} requêtes, concurrence {args.concurrency}, "
+          f"latence amont {args.latency * 1000:.0f} ms\n")
+    print(f"{'mode':<8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'erreurs':>10}")
+    for mode, stats in results.items():
+        print(f"{mode:<8}{stats['rps']:>10}{stats['p50_ms']:>10}{stats['p95_ms']:>10}"
+              f"{stats['p99_ms']:>10}{stats['errors']:>10}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+Générateur de charge HTTP pour les benchmarks du proxy Notion
+Deux modèles : concurrence fixe (boucle fermée, chaque client renvoie une
+requête dès la réponse reçue) et débit d'arrivée fixe (boucle ouverte, les
+requêtes partent à heure fixe même si le proxy prend du retard)
+"""
+
+import time
+import asyncio
+from collections import Counter
+from statistics import quantiles
+
+import aiohttp
+
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=30)
+
+
+def percentile_ms(cuts, p):
+    return round(cuts[p - 1] * 1000, 2)
+
+
+def summarize(latencies, statuses, elapsed):
+    """Débit et percentiles de latence d'une mesure
+
+    statuses compte les codes HTTP, 'error' pour les échecs de connexion ou timeouts
+    """
+    total = sum(statuses.values())
+    ok = sum(count for status, count in statuses.items() if status != 'error' and status < 400)
+    report = {
+        'requests': total,
+        'ok': ok,
+        'errors': total - ok,
+        'statuses': {str(status): count for status, count in sorted(statuses.items(), key=str)},
+        'elapsed_s': round(elapsed, 3),
+        'rps': round(total / elapsed, 1) if elapsed else 0.0,
+        'ok_rps': round(ok / elapsed, 1) if elapsed else 0.0,
+    }
+    if len(latencies) >= 2:
+        cuts = quantiles(latencies, n=100)
+        report.update({
+            'p50_ms': percentile_ms(cuts, 50),
+            'p90_ms': percentile_ms(cuts, 90),
+            'p95_ms': percentile_ms(cuts, 95),
+            'p99_ms': percentile_ms(cuts, 99),
+            'max_ms': round(max(latencies) * 1000, 2),
+        })
+    return report
+
+
+async def _send(session, method, url, headers, body, latencies, statuses, started):
+    """Une requête ; la latence court depuis started (heure prévue en boucle ouverte)"""
+    try:
+        async with session.request(method, url, headers=headers, data=body) as response:
+            await response.read()
+            statuses[response.status] += 1
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        statuses['error'] += 1
+    latencies.append(time.perf_counter() - started)
+
+
+async def closed_loop(base_url, paths, concurrency, total=None, duration=None,
+                      method='GET', headers=None, body=None):
+    """Concurrence fixe : concurrency clients, jusqu'à total requêtes ou duration secondes"""
+    latencies = []
+    statuses = Counter()
+    remaining = iter(range(total)) if total is not None else None
+    deadline = None if duration is None else time.perf_counter() + duration
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector, timeout=REQUEST_TIMEOUT) as session:
+        async def worker(offset):
+            i = offset
+            while True:
+                if remaining is not None and next(remaining, None) is None:
+                    return
+                if deadline is not None and time.perf_counter() >= deadline:
+                    return
+                url = f"{base_url}/api/notion/{paths[i % len(paths)]}"
+                await _send(session, method, url, headers, body,
+                            latencies, statuses, time.perf_counter())
+                i += concurrency
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(n) for n in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    report = summarize(latencies, statuses, elapsed)
+    report.update({'model': 'closed', 'concurrency': concurrency})
+    return report
+
+
+async def open_loop(base_url, paths, rate, duration, max_connections=1000,
+                    method='GET', headers=None, body=None):
+    """Débit d'arrivée fixe : rate requêtes/s pendant duration secondes
+
+    La latence est mesurée depuis l'heure d'envoi prévue : l'attente d'une
+    connexion libre compte, le retard du proxy n'est donc pas masqué
+    """
+    latencies = []
+    statuses = Counter()
+    count = int(rate * duration)
+    interval = 1 / rate
+    lag = 0.0
+
+    connector = aiohttp.TCPConnector(limit=max_connections)
+    async with aiohttp.ClientSession(connector=connector, timeout=REQUEST_TIMEOUT) as session:
+        tasks = []
+        started = time.perf_counter()
+        for i in range(count):
+            scheduled = started + i * interval
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                lag = max(lag, -delay)
+            url = f"{base_url}/api/notion/{paths[i % len(paths)]}"
+            tasks.append(asyncio.create_task(
+                _send(session, method, url, headers, body, latencies, statuses, scheduled)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+    report = summarize(latencies, statuses, elapsed)
+    report.update({
+        'model': 'open',
+        'target_rps': rate,
+        # Retard maximal du générateur lui-même : au-delà de quelques ms, le débit visé n'est pas tenu
+        'generator_lag_ms': round(lag * 1000, 2),
+    })
+    return report
@@ -0,0 +1,179 @@
+"""
+Lancement du proxy Notion en sous-processus et mesure de ses ressources
+RSS et sockets ouverts sont lus dans /proc (Linux) ou via psutil s'il est installé
+"""
+
+import os
+import sys
+import time
+import socket
+import threading
+import subprocess
+
+try:
+    import psutil
+except ImportError:  # psutil absent : lecture directe de /proc
+    psutil = None
+
+PROXY_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Mode synchrone : serveur Flask multi-thread (sans le reloader de debug)
+SYNC_LAUNCHER = (
+    "import os; from notion_proxy import app; "
+    "app.run(host='127.0.0.1', port=int(os.environ['NOTION_PROXY_PORT']), threaded=True)"
+)
+MODES = {
+    'sync': [sys.executable, '-c', SYNC_LAUNCHER],
+    'async': [sys.executable, 'notion_proxy_async.py'],
+    # Production : gunicorn pré-fork (NOTION_PROXY_WORKERS / NOTION_PROXY_THREADS)
+    'prefork': [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'notion_proxy:app'],
+}
+
+
+def free_port():
+    """Réserve un port TCP libre sur la boucle locale"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_proxy(mode, upstream_url, env=None):
+    """Lance un proxy en sous-processus et attend qu'il accepte les connexions
+
+    env complète l'environnement (variables NOTION_PROXY_* du scénario)
+    """
+    port = free_port()
+    env = dict(os.environ, **(env or {}), NODE_SERVER_URL=upstream_url,
+               NODE_SERVER_URLS=upstream_url, NOTION_PROXY_PORT=str(port))
+    process = subprocess.Popen(
+        MODES[mode], cwd=PROXY_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.2):
+                return process, f"http://127.0.0.1:{port}"
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"Le proxy {mode} n'a pas démarré")
+
+
+def stop_proxy(process):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def rss_bytes(pid):
+    """Mémoire résidente du processus, None si indisponible"""
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except psutil.Error:
+            return None
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def open_sockets(pid):
+    """Nombre de sockets ouverts par le processus, None si indisponible"""
+    if psutil is not None:
+        try:
+            return len(psutil.Process(pid).net_connections(kind='all'))
+        except (psutil.Error, AttributeError):
+            return None
+    fd_dir = f'/proc/{pid}/fd'
+    try:
+        count = 0
+        for fd in os.listdir(fd_dir):
+            try:
+                if os.readlink(os.path.join(fd_dir, fd)).startswith('socket:'):
+                    count += 1
+            except OSError:
+                continue  # descripteur fermé entre listdir et readlink
+        return count
+    except OSError:
+        return None
+
+
+def process_tree(pid):
+    """pid et ses descendants (workers d'un maître pré-fork)"""
+    if psutil is not None:
+        try:
+            return [pid] + [child.pid for child in psutil.Process(pid).children(recursive=True)]
+        except psutil.Error:
+            return [pid]
+    parents = {}
+    try:
+        entries = [entry for entry in os.listdir('/proc') if entry.isdigit()]
+    except OSError:
+        return [pid]
+    for entry in entries:
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # Le nom du processus peut contenir des espaces : on lit après la parenthèse
+                parents[int(entry)] = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+    tree, frontier = [pid], [pid]
+    while frontier:
+        frontier = [child for child, parent in parents.items() if parent in frontier]
+        tree.extend(frontier)
+    return tree
+
+
+def _total(values):
+    known = [v for v in values if v is not None]
+    return sum(known) if known else None
+
+
+class ProcessSampler:
+    """Échantillonne RSS et sockets d'un processus et de ses workers pendant une mesure"""
+
+    def __init__(self, pid, interval=0.1):
+        self.pid = pid
+        self.interval = interval
+        self._samples = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self._stop.clear()
+        self._samples = []
+        self._thread = threading.Thread(target=self._run, name='bench-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            pids = process_tree(self.pid)
+            self._samples.append((_total(rss_bytes(p) for p in pids),
+                                  _total(open_sockets(p) for p in pids)))
+            if self._stop.wait(self.interval):
+                return
+
+    def stats(self):
+        """Valeurs maximales et finales observées"""
+        rss = [r for r, _ in self._samples if r is not None]
+        sockets = [s for _, s in self._samples if s is not None]
+        return {
+            'rss_peak_mb': round(max(rss) / 1024 / 1024, 1) if rss else None,
+            'rss_end_mb': round(rss[-1] / 1024 / 1024, 1) if rss else None,
+            'sockets_peak': max(sockets) if sockets else None,
+            'sockets_end': sockets[-1] if sockets else None,
+        }
@@ -0,0 +1,205 @@
+"""
+Banc de charge du proxy Notion contre un faux serveur Node.js local
+Pour chaque mode de proxy : scénarios à concurrence fixe et à débit fixe,
+débit, latences p50/p95/p99, RSS et sockets ouverts du proxy. Les résultats
+sont enregistrés en JSON et peuvent être comparés à un run de référence
+
+Entièrement hors ligne. Lancement (depuis services/notion) :
+    python bench/run_bench.py --concurrency 10,100 --rates 100,300
+    python bench/run_bench.py --baseline bench/results/<run>.json
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import subprocess
+
+from stub_upstream import start_stub
+from load_generator import closed_loop, open_loop
+from proxy_process import (
+    MODES, PROXY_DIR, start_proxy, stop_proxy, ProcessSampler, process_tree, rss_bytes
+)
+
+RESULTS_DIR = os.path.join(PROXY_DIR, 'bench', 'results')
+
+# Le banc mesure le chemin de relais : ni cache ni limitation de débit par défaut
+DEFAULT_PROXY_ENV = {
+    'NOTION_PROXY_CACHE_BYTES': '0',
+    'NOTION_PROXY_RATE_GLOBAL': '0',
+}
+
+
+def int_list(value):
+    return [int(v) for v in value.split(',') if v.strip()]
+
+
+def git_revision():
+    """Commit courant et présence de modifications locales (None hors dépôt git)"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROXY_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--', '.'], cwd=PROXY_DIR,
+                                    capture_output=True, text=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def proxy_env(pairs):
+    """Variables NOTION_PROXY_* du scénario : défauts du banc puis --proxy-env"""
+    env = dict(DEFAULT_PROXY_ENV)
+    for pair in pairs or ():
+        key, _, value = pair.partition('=')
+        env[key.strip()] = value
+    return env
+
+
+def run_mode(mode, upstream_url, args, paths, env):
+    """Tous les scénarios d'un mode de proxy, avec un proxy neuf par mode"""
+    process, proxy_url = start_proxy(mode, upstream_url, env)
+    scenarios = {}
+    try:
+        idle_rss = sum(rss_bytes(pid) or 0 for pid in process_tree(process.pid))
+        asyncio.run(closed_loop(proxy_url, paths, 10, total=min(200, args.requests)))  # échauffement
+
+        for concurrency in args.concurrency:
+            with ProcessSampler(process.pid) as sampler:
+                report = asyncio.run(closed_loop(proxy_url, paths, concurrency, total=args.requests))
+            report.update(sampler.stats())
+            scenarios[f'{mode}/closed/c{concurrency}'] = report
+
+        for rate in args.rates:
+            with ProcessSampler(process.pid) as sampler:
+                report = asyncio.run(open_loop(proxy_url, paths, rate, args.duration))
+            report.update(sampler.stats())
+            scenarios[f'{mode}/open/r{rate}'] = report
+    finally:
+        stop_proxy(process)
+
+    for report in scenarios.values():
+        report['rss_idle_mb'] = round(idle_rss / 1024 / 1024, 1) if idle_rss else None
+    return scenarios
+
+
+def compare(results, baseline, max_regression):
+    """Écarts par rapport à un run de référence ; retourne les scénarios en régression"""
+    regressions = []
+    print(f"\n🔎 Comparaison avec {baseline['meta'].get('commit')} "
+          f"({baseline['meta'].get('timestamp')})\n")
+    print(f"{'scénario':<24}{'rps':>10}{'Δ rps':>10}{'p99 ms':>10}{'Δ p99':>10}")
+    for name, report in results['scenarios'].items():
+        before = baseline['scenarios'].get(name)
+        if not before or not before.get('ok_rps'):
+            continue
+        rps_delta = report['ok_rps'] / before['ok_rps'] - 1
+        p99_delta = (report['p99_ms'] / before['p99_ms'] - 1
+                     if report.get('p99_ms') and before.get('p99_ms') else 0.0)
+        print(f"{name:<24}{report['ok_rps']:>10}{rps_delta:>+10.1%}"
+              f"{report.get('p99_ms', '-'):>10}{p99_delta:>+10.1%}")
+        if rps_delta < -max_regression:
+            regressions.append(name)
+    return regressions
+
+
+def print_report(results):
+    print(f"\n📊 Latence amont {results['params']['latency'] * 1000:.0f} ms, "
+          f"réponses de {results['params']['payload_bytes']} octets, "
+          f"erreurs amont {results['params']['error_rate']:.0%}\n")
+    print(f"{'scénario':<24}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'erreurs':>9}{'RSS Mo':>9}{'sockets':>9}")
+    for name, report in results['scenarios'].items():
+        print(f"{name:<24}{report['ok_rps']:>9}{report.get('p50_ms', '-'):>9}"
+              f"{report.get('p95_ms', '-'):>9}{report.get('p99_ms', '-'):>9}{report['errors']:>9}"
+              f"{report['rss_peak_mb'] or '-':>9}{report['sockets_peak'] or '-':>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banc de charge du proxy Notion (hors ligne)")
+    parser.add_argument('--modes', default='sync',
+                        help="Modes séparés par des virgules (sync,async,prefork)")
+    parser.add_argument('--concurrency', type=int_list, default=[10, 50, 100],
+                        help="Concurrences fixes à mesurer, ex. 10,50,100")
+    parser.add_argument('--requests', type=int, default=2000,
+                        help="Requêtes par scénario à concurrence fixe")
+    parser.add_argument('--rates', type=int_list, default=[100],
+                        help="Débits d'arrivée (requêtes/s) à mesurer, ex. 100,300")
+    parser.add_argument('--duration', type=float, default=10, help="Durée des scénarios à débit fixe (s)")
+    parser.add_argument('--keys', type=int, default=50, help="Nombre de chemins distincts demandés")
+    parser.add_argument('--latency', type=float, default=0.05, help="Latence du faux Node.js (s)")
+    parser.add_argument('--payload-bytes', type=int, default=2048, help="Taille des réponses amont")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Part de 503 amont (0-1)")
+    parser.add_argument('--proxy-env', action='append', metavar='CLE=VALEUR',
+                        help="Variable d'environnement du proxy (répétable)")
+    parser.add_argument('--output', help="Fichier JSON (défaut : bench/results/<date>-<commit>.json)")
+    parser.add_argument('--baseline', help="Run JSON de référence à comparer")
+    parser.add_argument('--max-regression', type=float, default=0.10,
+                        help="Baisse de débit tolérée avant échec (0.10 = 10 %%)")
+    args = parser.parse_args()
+
+    modes = [m.strip() for m in args.modes.split(',') if m.strip()]
+    unknown = [m for m in modes if m not in MODES]
+    if unknown:
+        parser.error(f"Mode inconnu: {', '.join(unknown)}")
+
+    paths = [f'databases/db-{i}' for i in range(args.keys)]
+    env = proxy_env(args.proxy_env)
+    commit, dirty = git_revision()
+    results = {
+        'meta': {
+            'commit': commit,
+            'dirty': dirty,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+        },
+        'params': {
+            'modes': modes,
+            'concurrency': args.concurrency,
+            'requests': args.requests,
+            'rates': args.rates,
+            'duration': args.duration,
+            'keys': args.keys,
+            'latency': args.latency,
+            'payload_bytes': args.payload_bytes,
+            'error_rate': args.error_rate,
+            'proxy_env': env,
+        },
+        'scenarios': {},
+    }
+
+    stub, upstream_url = start_stub(latency=args.latency, payload_bytes=args.payload_bytes,
+                                    error_rate=args.error_rate)
+    try:
+        for mode in modes:
+            results['scenarios'].update(run_mode(mode, upstream_url, args, paths, env))
+    finally:
+        stub.shutdown()
+
+    print_report(results)
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        output = os.path.join(RESULTS_DIR, f"{stamp}-{commit or 'nogit'}{'-dirty' if dirty else ''}.json")
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\n💾 Résultats : {output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.max_regression)
+        if regressions:
+            print(f"\n❌ Régression de débit au-delà de {args.max_regression:.0%} : "
+                  f"{', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Faux serveur Node.js pour les benchmarks du proxy Notion
+Répond sur /api/notion/* et /health avec une latence, une taille de réponse
+et un taux d'erreur configurables, sans réseau externe
+"""
+
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_payload(size):
+    """Liste de pages Notion factices d'environ size octets une fois sérialisée"""
+    page = {'object': 'page', 'id': '0' * 32, 'properties': {'Name': {'title': 'x' * 64}}}
+    count = max(0, size // (len(json.dumps(page)) + 2))
+    return json.dumps({
+        'object': 'list',
+        'results': [dict(page, id=f'{i:032x}') for i in range(count)],
+        'has_more': False
+    }).encode()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Réponses JSON fixes après une latence configurable, avec erreurs aléatoires"""
+
+    # HTTP/1.1 pour que le proxy puisse réutiliser ses connexions keep-alive
+    protocol_version = 'HTTP/1.1'
+    # En-têtes et corps partent en deux écritures : sans TCP_NODELAY, Nagle et
+    # l'ACK retardé du client ajoutent ~40 ms à chaque réponse keep-alive
+    disable_nagle_algorithm = True
+    latency = 0.05
+    error_rate = 0.0
+    payload = make_payload(0)
+    error_body = b'{"object": "error", "status": 503, "code": "service_unavailable"}'
+
+    def _reply(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+
+        status = 200
+        if self.path.startswith('/health'):
+            body = b'{"status": "ok"}'
+        else:
+            time.sleep(self.latency)
+            body = self.payload
+            if self.error_rate and random.random() < self.error_rate:
+                status, body = 503, self.error_body
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = do_PATCH = do_PUT = do_DELETE = _reply
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    """Serveur multi-thread capable d'absorber des rafales de connexions"""
+    request_queue_size = 1024
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        """Les déconnexions du proxy (arrêt, timeout) ne sont pas des erreurs du banc"""
+        if not isinstance(sys.exc_info()[1], (ConnectionError, TimeoutError)):
+            super().handle_error(request, client_address)
+
+
+def start_stub(port=0, latency=0.05, payload_bytes=0, error_rate=0.0):
+    """Démarre le faux serveur dans un thread et retourne (serveur, url)"""
+    handler = type('ConfiguredStubHandler', (StubHandler,), {
+        'latency': latency,
+        'error_rate': error_rate,
+        'payload': make_payload(payload_bytes),
+    })
+    server = StubServer(('127.0.0.1', port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Faux serveur Node.js pour benchmarks")
+    parser.add_argument('--port', type=int, default=3000)
+    parser.add_argument('--latency', type=float, default=0.05, help="Latence simulée (s)")
+    parser.add_argument('--payload-bytes', type=int, default=0, help="Taille des réponses")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Part de réponses 503 (0-1)")
+    args = parser.parse_args()
+
+    server, url = start_stub(args.port, args.latency, args.payload_bytes, args.error_rate)
+    print(f"🧪 Faux serveur Node.js sur {url} (latence {args.latency * 1000:.0f} ms, "
+          f"{len(server.RequestHandlerClass.payload)} octets, erreurs {args.error_rate:.0%})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
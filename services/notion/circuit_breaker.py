@@ -0,0 +1,102 @@
+"""
+Disjoncteur (circuit breaker) devant le serveur Node.js
+Après plusieurs échecs consécutifs, les appels échouent immédiatement au lieu
+d'attendre chacun leur propre erreur de connexion
+"""
+
+import time
+import threading
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """Disjoncteur thread-safe fermé / ouvert / semi-ouvert"""
+
+    def __init__(self, failure_threshold=5, reset_timeout=10, half_open_max_calls=1):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._half_opened_at = 0.0
+        self._trial_calls = 0
+        self._lock = threading.Lock()
+
+        self.opened = 0
+        self.rejected = 0
+
+    def allow(self):
+        """Indique si un appel peut partir vers le serveur Node.js"""
+        with self._lock:
+            if self._state == OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    self.rejected += 1
+                    return False
+                self._half_open()
+
+            if self._state == HALF_OPEN:
+                # Un essai resté sans verdict ne bloque pas indéfiniment le disjoncteur
+                if time.monotonic() - self._half_opened_at >= self.reset_timeout:
+                    self._half_open()
+                if self._trial_calls >= self.half_open_max_calls:
+                    self.rejected += 1
+                    return False
+                self._trial_calls += 1
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._state = CLOSED
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._open()
+
+    def trip(self):
+        """Ouvre le disjoncteur sans attendre le seuil (sonde de santé en échec)"""
+        with self._lock:
+            if self._state != OPEN:
+                self._open()
+
+    def probe_succeeded(self):
+        """La sonde de santé répond : on autorise un appel d'essai sans attendre"""
+        with self._lock:
+            if self._state == OPEN:
+                self._half_open()
+
+    def retry_after(self):
+        """Secondes restantes avant le prochain appel d'essai"""
+        with self._lock:
+            if self._state != OPEN:
+                return 0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def _half_open(self):
+        """Passe à l'état semi-ouvert (verrou déjà détenu)"""
+        self._state = HALF_OPEN
+        self._half_opened_at = time.monotonic()
+        self._trial_calls = 0
+
+    def _open(self):
+        """Passe à l'état ouvert (verrou déjà détenu)"""
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self.opened += 1
+
+    def stats(self):
+        """État exposé sur /health"""
+        with self._lock:
+            return {
+                'state': self._state,
+                'consecutive_failures': self._failures,
+                'opened': self.opened,
+                'rejected': self.rejected,
+            }
@@ -0,0 +1,179 @@
+"""
+Compression négociée des réponses du proxy Notion (gzip, brotli si installé)
+Les corps déjà compressés par le serveur Node.js sont relayés tels quels ;
+seuls les corps en clair au-dessus d'un seuil sont compressés au fil de l'eau
+
+Dépendance optionnelle : pip install brotli
+"""
+
+import time
+import zlib
+import threading
+
+try:
+    import brotli
+except ImportError:  # brotli absent : gzip uniquement
+    brotli = None
+
+# Types textuels qui gagnent à être compressés (JSON Notion surtout)
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript',
+                      'application/xml', 'application/x-ndjson', 'image/svg+xml')
+
+
+def available_encodings():
+    """Encodages supportés, par ordre de préférence"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate(accept_encoding, encodings=None):
+    """Meilleur encodage accepté par le client, None pour un corps en clair
+
+    Respecte les valeurs q (q=0 exclut l'encodage) ; à q égal, l'ordre de
+    préférence du proxy l'emporte
+    """
+    if not accept_encoding:
+        return None
+    encodings = encodings or available_encodings()
+    weights = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[name.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = weights.get(encoding, weights.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def is_compressible(content_type):
+    content_type = (content_type or '').lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def weak_etag(etag):
+    """ETag d'une représentation compressée par le proxy (comparaison faible)"""
+    if not etag or etag.startswith('W/'):
+        return etag
+    return f'W/{etag}'
+
+
+class StreamCompressor:
+    """Compresseur incrémental qui mesure octets et temps CPU consommés"""
+
+    def __init__(self, encoding, level=6, brotli_quality=4):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=brotli_quality)
+            self._compress = self._compressor.process
+            self._flush = self._compressor.finish
+        else:
+            # wbits=31 : en-tête et somme de contrôle gzip
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+            self._compress = self._compressor.compress
+            self._flush = self._compressor.flush
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_seconds = 0.0
+
+    def compress(self, chunk):
+        started = time.thread_time()
+        data = self._compress(chunk)
+        self.cpu_seconds += time.thread_time() - started
+        self.bytes_in += len(chunk)
+        self.bytes_out += len(data)
+        return data
+
+    def finish(self):
+        started = time.thread_time()
+        data = self._flush()
+        self.cpu_seconds += time.thread_time() - started
+        self.bytes_out += len(data)
+        return data
+
+
+class ResponseCompressor:
+    """Politique de compression : encodage négocié, seuil de taille, mesures"""
+
+    def __init__(self, min_size=1024, level=6, brotli_quality=4, on_compressed=None):
+        self.min_size = min_size
+        self.level = level
+        self.brotli_quality = brotli_quality
+        self.encodings = available_encodings()
+        # on_compressed(encodage, octets en clair, octets compressés, secondes CPU)
+        self._on_compressed = on_compressed
+
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.min_size > 0
+
+    def negotiate(self, accept_encoding):
+        """Encodage à demander au serveur Node.js et à servir au client"""
+        if not self.enabled:
+            return None
+        return negotiate(accept_encoding, self.encodings)
+
+    def should_compress(self, encoding, content_type, size=None):
+        """Vrai si un corps en clair mérite d'être compressé (taille inconnue : à vérifier)"""
+        if encoding is None:
+            return False
+        if not is_compressible(content_type):
+            return False
+        return size is None or size >= self.min_size
+
+    def stream(self, encoding):
+        return StreamCompressor(encoding, self.level, self.brotli_quality)
+
+    def record(self, compressor):
+        """Cumule puis transmet les mesures d'un corps entièrement compressé"""
+        with self._lock:
+            totals = self._totals.setdefault(compressor.encoding, [0, 0, 0, 0.0])
+            totals[0] += 1
+            totals[1] += compressor.bytes_in
+            totals[2] += compressor.bytes_out
+            totals[3] += compressor.cpu_seconds
+        if self._on_compressed is not None:
+            self._on_compressed(compressor.encoding, compressor.bytes_in,
+                                compressor.bytes_out, compressor.cpu_seconds)
+
+    def compress(self, chunks, encoding):
+        """Compresse un flux de blocs au fil de l'eau"""
+        compressor = self.stream(encoding)
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        data = compressor.finish()
+        if data:
+            yield data
+        self.record(compressor)
+
+    def stats(self):
+        """Volumes et coût CPU cumulés par encodage pour /health"""
+        with self._lock:
+            totals = {encoding: list(values) for encoding, values in self._totals.items()}
+        return {
+            'min_bytes': self.min_size,
+            'encodings': list(self.encodings) if self.enabled else [],
+            'compressed': {
+                encoding: {
+                    'responses': responses,
+                    'bytes_in': bytes_in,
+                    'bytes_out': bytes_out,
+                    'ratio': round(bytes_out / bytes_in, 3) if bytes_in else None,
+                    'cpu_seconds': round(cpu, 4),
+                }
+                for encoding, (responses, bytes_in, bytes_out, cpu) in totals.items()
+            },
+        }
@@ -0,0 +1,236 @@
+"""
+Second niveau du cache des GET : fichier SQLite partagé par les workers
+Survit aux redémarrages du proxy (reloader compris) : un worker qui démarre
+reprend les réponses encore fraîches au lieu de rappeler Node.js
+
+Les clés sont celles du cache mémoire, hachées : les jetons Authorization ne
+sont pas écrits sur disque, mais les corps le sont et le fichier est créé en
+lecture/écriture pour son seul propriétaire
+"""
+
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key BLOB PRIMARY KEY,
+    resource TEXT NOT NULL,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    content_type TEXT,
+    etag TEXT,
+    content_encoding TEXT,
+    headers TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_resource ON entries (resource);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at);
+"""
+
+# Date de dernier accès réécrite au plus une fois par intervalle : une lecture
+# n'écrit pas à chaque hit
+TOUCH_INTERVAL = 30
+
+
+def disk_key(key):
+    """Empreinte d'une clé du cache mémoire (chemin, paramètres, jeton, encodage)"""
+    return hashlib.sha256(json.dumps(key).encode()).digest()
+
+
+class DiskCache:
+    """Cache disque borné en octets, éviction par date de dernier accès
+
+    Les dates sont en temps réel (time.time()) : elles restent valables d'un
+    processus et d'un redémarrage à l'autre. Une entrée expirée est gardée
+    stale_seconds pour la revalidation ETag, comme en mémoire. Les erreurs
+    SQLite (base verrouillée, disque plein) valent un défaut de cache
+    """
+
+    def __init__(self, path, max_bytes=256 * 1024 * 1024, stale_seconds=3600, warm_window=300):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.stale_seconds = stale_seconds
+        self.warm_window = warm_window
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._started_at = time.monotonic()
+        # Octets écrits depuis le dernier contrôle de taille
+        self._written = 0
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.errors = 0
+        self.warm_hits = 0
+        self.warm_lookups = 0
+
+        self._create()
+
+    def _create(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Fichier privé avant que SQLite ne l'ouvre
+        os.close(os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600))
+        connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        try:
+            # Avant la première table : les pages libérées par l'éviction sont rendues au disque
+            connection.execute('PRAGMA auto_vacuum=INCREMENTAL')
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.executescript(SCHEMA)
+        finally:
+            connection.close()
+        self._evict()
+
+    def _db(self):
+        """Connexion propre au thread et au processus (jamais héritée d'un fork)"""
+        pid = os.getpid()
+        if getattr(self._local, 'pid', None) != pid:
+            # Un cache peut perdre ses dernières écritures sur coupure : pas de fsync par écriture
+            connection = sqlite3.connect(self.path, timeout=2, isolation_level=None)
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+            self._local.pid = pid
+        return self._local.connection
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def get(self, key):
+        """Retourne (body, content_type, etag, content_encoding, headers, expires_at) ou None"""
+        now = time.time()
+        warm = time.monotonic() - self._started_at < self.warm_window
+        try:
+            db = self._db()
+            row = db.execute(
+                'SELECT body, content_type, etag, content_encoding, headers, expires_at, accessed_at'
+                ' FROM entries WHERE key = ?', (disk_key(key),)).fetchone()
+            if row is not None and row[6] < now - TOUCH_INTERVAL:
+                db.execute('UPDATE entries SET accessed_at = ? WHERE key = ?', (now, disk_key(key)))
+        except sqlite3.Error:
+            self._count('errors')
+            return None
+
+        with self._lock:
+            if warm:
+                self.warm_lookups += 1
+            if row is None:
+                self.misses += 1
+                return None
+            if row[5] > now:
+                self.hits += 1
+                if warm:
+                    self.warm_hits += 1
+            else:
+                self.stale_hits += 1
+        body, content_type, etag, content_encoding, headers, expires_at, _ = row
+        return (body, content_type, etag, content_encoding,
+                tuple(tuple(pair) for pair in json.loads(headers)), expires_at)
+
+    def put(self, key, resource, body, content_type, etag, content_encoding, headers, expires_at):
+        """Écrit ou remplace une entrée, puis évince si la taille a pu dépasser la limite"""
+        if len(body) > self.max_bytes:
+            return
+        now = time.time()
+        try:
+            self._db().execute(
+                'INSERT OR REPLACE INTO entries (key, resource, body, size, content_type, etag,'
+                ' content_encoding, headers, expires_at, accessed_at)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (disk_key(key), resource, body, len(body), content_type, etag, content_encoding,
+                 json.dumps(headers), expires_at, now))
+        except sqlite3.Error:
+            self._count('errors')
+            return
+        with self._lock:
+            self.writes += 1
+            self._written += len(body)
+            # Somme des tailles relue après ~5 % de la limite écrits par ce processus
+            check = self._written >= self.max_bytes // 20
+            if check:
+                self._written = 0
+        if check:
+            self._evict()
+
+    def touch(self, key, expires_at):
+        """Nouvelle expiration après un 304 Not Modified"""
+        try:
+            self._db().execute('UPDATE entries SET expires_at = ?, accessed_at = ? WHERE key = ?',
+                               (expires_at, time.time(), disk_key(key)))
+        except sqlite3.Error:
+            self._count('errors')
+
+    def invalidate(self, resource):
+        """Supprime les entrées d'une ressource modifiée, pour tous les workers"""
+        try:
+            self._db().execute('DELETE FROM entries WHERE resource = ?', (resource,))
+        except sqlite3.Error:
+            self._count('errors')
+
+    def _evict(self):
+        """Retire les entrées périmées, puis les moins récemment lues jusqu'à 90 % de la limite"""
+        try:
+            db = self._db()
+            db.execute('DELETE FROM entries WHERE expires_at < ?', (time.time() - self.stale_seconds,))
+            total = db.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+            excess = total - self.max_bytes * 9 // 10
+            if total > self.max_bytes and excess > 0:
+                freed = 0
+                victims = []
+                for key, size in db.execute('SELECT key, size FROM entries ORDER BY accessed_at'):
+                    victims.append((key,))
+                    freed += size
+                    if freed >= excess:
+                        break
+                db.executemany('DELETE FROM entries WHERE key = ?', victims)
+                self._count('evictions', len(victims))
+            db.execute('PRAGMA incremental_vacuum')
+        except sqlite3.Error:
+            self._count('errors')
+
+    def stats(self):
+        """Taille et compteurs du cache disque, pour /health"""
+        try:
+            entries, size = self._db().execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+        except sqlite3.Error:
+            entries = size = None
+        file_bytes = 0
+        for suffix in ('', '-wal'):
+            try:
+                file_bytes += os.path.getsize(self.path + suffix)
+            except OSError:
+                pass
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                'path': self.path,
+                'entries': entries,
+                'bytes': size,
+                'file_bytes': file_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+                'writes': self.writes,
+                'evictions': self.evictions,
+                'errors': self.errors,
+                # Lectures du disque dans les premières minutes du processus
+                'warm_start': {
+                    'window_seconds': self.warm_window,
+                    'lookups': self.warm_lookups,
+                    'hits': self.warm_hits,
+                    'hit_rate': (round(self.warm_hits / self.warm_lookups, 4)
+                                 if self.warm_lookups else None),
+                },
+            }
@@ -0,0 +1,119 @@
+"""
+En-têtes relayés entre le client, le proxy et le serveur Node.js
+Les noms filtrés sont précalculés en minuscules : un seul passage sur les
+en-têtes par requête, sans regex ni dictionnaire intermédiaire
+"""
+
+import uuid
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+REQUEST_ID_MAX_LENGTH = 128
+
+# RFC 7230 §6.1 : propres à une connexion, jamais relayés
+HOP_BY_HOP = frozenset((
+    'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization',
+    'proxy-connection', 'te', 'trailer', 'trailers', 'transfer-encoding', 'upgrade',
+))
+
+# Vers Node.js : recalculés par requests ou décidés par le proxy.
+# Les conditions (If-None-Match...) sont traitées par le cache du proxy : relayées,
+# elles feraient partager un 304 aux GET regroupés. Les cookies de l'interface
+# ne concernent pas Node.js et ne font pas partie de la clé de cache
+REQUEST_EXCLUDED = HOP_BY_HOP | frozenset((
+    'host', 'content-length', 'accept-encoding', 'cookie',
+    'if-none-match', 'if-modified-since', 'if-match', 'if-unmodified-since', 'if-range',
+    'x-forwarded-for', 'x-request-id',
+))
+
+# Vers le client : recalculés par le serveur WSGI ou par le proxy (compression, ETag faible, CORS)
+RESPONSE_EXCLUDED = HOP_BY_HOP | frozenset((
+    'content-length', 'content-type', 'content-encoding', 'etag', 'vary', 'date', 'server',
+))
+RESPONSE_EXCLUDED_PREFIXES = ('access-control-',)
+
+# Propres à une réponse donnée : jamais rejoués depuis le cache
+UNCACHED_HEADERS = frozenset(('set-cookie', 'retry-after', 'age'))
+UNCACHED_PREFIXES = ('x-ratelimit-', 'ratelimit-')
+
+# Noms utilisés comme clés par le proxy, quelle que soit la casse reçue
+CANONICAL_NAMES = {'authorization': 'Authorization', 'content-type': 'Content-Type'}
+
+
+def request_id(value):
+    """Identifiant reçu du client s'il est raisonnable, sinon un nouveau"""
+    if value and len(value) <= REQUEST_ID_MAX_LENGTH and value.isascii() and value.isprintable():
+        return value
+    return uuid.uuid4().hex
+
+
+def _connection_tokens(value):
+    """En-têtes déclarés propres à la connexion par Connection: a, b"""
+    return {token.strip().lower() for token in value.split(',')} - {'close', 'keep-alive'}
+
+
+def forward_request_headers(items, client, scheme, host, rid):
+    """En-têtes à envoyer à Node.js depuis les (nom, valeur) reçus du client
+
+    X-Forwarded-For est complété par l'adresse du client ; X-Forwarded-Proto et
+    X-Forwarded-Host posés par un proxy frontal sont conservés
+    """
+    headers = {}
+    forwarded_for = None
+    connection = None
+    for name, value in items:
+        lowered = name.lower()
+        if lowered in REQUEST_EXCLUDED:
+            if lowered == 'x-forwarded-for':
+                forwarded_for = value
+            elif lowered == 'connection':
+                connection = value
+            continue
+        headers[CANONICAL_NAMES.get(lowered, name)] = value
+    if connection:
+        tokens = _connection_tokens(connection)
+        if tokens:
+            for name in [name for name in headers if name.lower() in tokens]:
+                del headers[name]
+
+    if client:
+        headers['X-Forwarded-For'] = f"{forwarded_for}, {client}" if forwarded_for else client
+    elif forwarded_for:
+        headers['X-Forwarded-For'] = forwarded_for
+    headers.setdefault('X-Forwarded-Proto', scheme)
+    headers.setdefault('X-Forwarded-Host', host)
+    headers[REQUEST_ID_HEADER] = rid
+    return headers
+
+
+def forward_response_headers(items):
+    """(nom, valeur) de la réponse Node.js à relayer tels quels (valeurs multiples conservées)"""
+    forwarded = []
+    connection = None
+    for name, value in items:
+        lowered = name.lower()
+        if lowered in RESPONSE_EXCLUDED or lowered.startswith(RESPONSE_EXCLUDED_PREFIXES):
+            if lowered == 'connection':
+                connection = value
+            continue
+        forwarded.append((name, value))
+    if connection:
+        tokens = _connection_tokens(connection)
+        if tokens:
+            forwarded = [(name, value) for name, value in forwarded if name.lower() not in tokens]
+    return forwarded
+
+
+def cacheable_headers(pairs):
+    """En-têtes rejoués avec une réponse servie depuis le cache"""
+    return tuple((name, value) for name, value in pairs
+                 if name.lower() not in UNCACHED_HEADERS
+                 and not name.lower().startswith(UNCACHED_PREFIXES))
+
+
+def merge_vary(value):
+    """Vary de Node.js complété par Accept-Encoding (la compression dépend du client)"""
+    if not value:
+        return 'Accept-Encoding'
+    if 'accept-encoding' in value.lower():
+        return value
+    return f"{value}, Accept-Encoding"
@@ -0,0 +1,52 @@
+"""
+Configuration gunicorn du proxy Notion (production)
+Pré-fork : l'application est chargée une fois dans le processus maître puis
+chaque worker sert ses requêtes sur plusieurs threads
+
+Lancement : gunicorn -c gunicorn.conf.py notion_proxy:app  (ou python serve.py)
+Redémarrage gracieux : kill -HUP <pid du maître>
+"""
+
+from proxy_config import (
+    PROXY_HOST, PROXY_PORT, SERVER_WORKERS, SERVER_THREADS, SERVER_WORKER_CONNECTIONS,
+    SERVER_KEEPALIVE, SERVER_TIMEOUT, SERVER_GRACEFUL_TIMEOUT, SERVER_MAX_REQUESTS,
+    SERVER_BACKLOG
+)
+
+bind = f'{PROXY_HOST}:{PROXY_PORT}'
+backlog = SERVER_BACKLOG
+proc_name = 'notion-proxy'
+
+# Workers multi-thread : les appels vers Node.js bloquent un thread, pas le worker
+worker_class = 'gthread'
+workers = SERVER_WORKERS
+threads = SERVER_THREADS
+worker_connections = SERVER_WORKER_CONNECTIONS
+keepalive = SERVER_KEEPALIVE
+
+timeout = SERVER_TIMEOUT
+graceful_timeout = SERVER_GRACEFUL_TIMEOUT
+max_requests = SERVER_MAX_REQUESTS
+max_requests_jitter = SERVER_MAX_REQUESTS // 10
+
+# Import et configuration une seule fois dans le maître, mémoire partagée en copie sur écriture
+preload_app = True
+
+accesslog = None
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    """Remet à neuf l'état propre à chaque processus après le fork"""
+    import notion_proxy
+
+    # Connexions keep-alive : jamais partagées avec le maître ou les autres workers
+    notion_proxy.upstream.after_fork()
+    # Seaux à jetons par processus : chaque worker prend sa part de la limite Notion
+    if server.cfg.workers > 1:
+        notion_proxy.rate_limiter.scale(1 / server.cfg.workers)
+    # Le thread de la sonde ne survit pas au fork
+    notion_proxy.health_prober.ensure_started()
+    # Threads du spool d'écritures différées : un jeu par worker, réservations atomiques en base
+    if notion_proxy.write_spool is not None:
+        notion_proxy.write_spool.ensure_started()
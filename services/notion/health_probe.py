@@ -0,0 +1,102 @@
+"""
+Sonde de santé du serveur Node.js en tâche de fond
+/health sert le dernier résultat en mémoire au lieu d'appeler Node.js à chaque fois
+"""
+
+import os
+import time
+import asyncio
+import threading
+
+
+class _ProbeState:
+    """Dernier résultat de la sonde, commun aux variantes thread et asyncio"""
+
+    def __init__(self, check, interval=5, on_success=None, on_failure=None):
+        self._check = check
+        self.interval = interval
+        self._on_success = on_success
+        self._on_failure = on_failure
+
+        self.status = {'status': 'unknown'}
+        self.healthy = False
+        self.checked_at = None
+        self.latency_ms = None
+
+    def _record(self, started, status, healthy):
+        """Met à jour le résultat en cache puis prévient le disjoncteur"""
+        self.latency_ms = round((time.perf_counter() - started) * 1000, 2)
+        self.status = status
+        self.healthy = healthy
+        self.checked_at = time.time()
+
+        callback = self._on_success if healthy else self._on_failure
+        if callback is not None:
+            callback()
+
+    def stats(self):
+        """Ancienneté et durée de la dernière vérification"""
+        age = None if self.checked_at is None else round(time.time() - self.checked_at, 3)
+        return {
+            'healthy': self.healthy,
+            'interval_seconds': self.interval,
+            'checked_at': self.checked_at,
+            'age_seconds': age,
+            'latency_ms': self.latency_ms,
+        }
+
+
+class HealthProber(_ProbeState):
+    """Interroge périodiquement le serveur Node.js et garde le dernier résultat"""
+
+    def __init__(self, check, interval=5, on_success=None, on_failure=None):
+        super().__init__(check, interval, on_success, on_failure)
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def ensure_started(self):
+        """Démarre le thread une fois par processus (les threads ne survivent pas à fork)"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name='node-health-probe', daemon=True).start()
+
+    def probe(self):
+        """Effectue une vérification et met à jour le résultat en cache"""
+        started = time.perf_counter()
+        try:
+            status = self._check()
+            healthy = status.get('status') not in ('error', 'offline')
+        except Exception:
+            status = {'status': 'offline'}
+            healthy = False
+
+        self._record(started, status, healthy)
+
+    def _run(self):
+        while True:
+            self.probe()
+            time.sleep(self.interval)
+
+
+class AsyncHealthProber(_ProbeState):
+    """Variante asyncio : check est une coroutine, run() tourne dans une tâche de l'application"""
+
+    async def probe(self):
+        """Effectue une vérification et met à jour le résultat en cache"""
+        started = time.perf_counter()
+        try:
+            status = await self._check()
+            healthy = status.get('status') not in ('error', 'offline')
+        except Exception:
+            status = {'status': 'offline'}
+            healthy = False
+        self._record(started, status, healthy)
+
+    async def run(self):
+        while True:
+            await self.probe()
+            await asyncio.sleep(self.interval)
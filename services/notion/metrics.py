@@ -0,0 +1,315 @@
+"""
+Métriques du proxy Notion au format texte Prometheus
+Compteurs et histogrammes en mémoire, sans dépendance : chaque observation
+coûte une recherche de dictionnaire et une incrémentation sous verrou
+"""
+
+import re
+import time
+import threading
+from bisect import bisect_left
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Identifiants Notion (UUID avec ou sans tirets) et segments numériques
+_ID_SEGMENT = re.compile(
+    r'(?<=/)([0-9a-fA-F]{32}|[0-9a-fA-F]{8}-(?:[0-9a-fA-F]{4}-){3}[0-9a-fA-F]{12}|\d+)(?=/|$)'
+)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+class Counter:
+    """Compteur monotone par combinaison de labels"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        for label_values, value in values:
+            yield self.name, _format_labels(self.labels, label_values), value
+
+
+class Gauge(Counter):
+    """Valeur instantanée, modifiable dans les deux sens"""
+
+    kind = 'gauge'
+
+    def dec(self, *label_values, amount=1):
+        self.inc(*label_values, amount=-amount)
+
+    def set(self, *label_values, value):
+        with self._lock:
+            self._values[label_values] = value
+
+
+class Histogram:
+    """Histogramme à seaux cumulés (le cumul n'est calculé qu'à l'export)"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # Comptes par seau (+Inf en dernier), somme, nombre
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self._lock:
+            snapshot = [(lv, list(s[0]), s[1], s[2]) for lv, s in self._series.items()]
+        for label_values, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                yield (f'{self.name}_bucket',
+                       _format_labels(self.labels + ('le',), label_values + (bound,)),
+                       cumulative)
+            labels = _format_labels(self.labels, label_values)
+            yield f'{self.name}_sum', labels, total
+            yield f'{self.name}_count', labels, count
+
+
+class MetricsRegistry:
+    """Ensemble des métriques exportées sur /metrics"""
+
+    def __init__(self, max_templates=1024, max_routes=200):
+        self._metrics = []
+        self._collectors = []
+        self._templates = {}
+        self._max_templates = max_templates
+        # Gabarits admis comme labels, et leurs premiers segments
+        self._routes = set()
+        self._prefixes = set()
+        self._max_routes = max_routes
+        self._lock = threading.Lock()
+
+    def counter(self, name, help_text, labels=()):
+        return self._add(Counter(name, help_text, labels))
+
+    def gauge(self, name, help_text, labels=()):
+        return self._add(Gauge(name, help_text, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, help_text, labels, buckets))
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, fn):
+        """Ajoute une fonction appelée à l'export
+
+        fn retourne [(nom, type, aide, [(dict de labels, valeur), ...]), ...]
+        """
+        self._collectors.append(fn)
+        return fn
+
+    def route_template(self, path):
+        """Gabarit de route sans identifiants : 'pages/<id>' -> 'pages/:id'
+
+        Au-delà de max_routes gabarits distincts, les nouveaux sont regroupés
+        sous '/<premier segment>/:other' (segment déjà connu) ou '/:other' : un
+        client qui invente des chemins ne multiplie pas les séries exportées
+        """
+        template = self._templates.get(path)
+        if template is None:
+            template = self._admit(_ID_SEGMENT.sub(':id', '/' + path.lstrip('/')))
+            if len(self._templates) < self._max_templates:
+                self._templates[path] = template
+        return template
+
+    def _admit(self, template):
+        prefix = template.split('/', 2)[1]
+        with self._lock:
+            if template in self._routes:
+                return template
+            if len(self._routes) < self._max_routes:
+                self._routes.add(template)
+                self._prefixes.add(prefix)
+                return template
+            return f'/{prefix}/:other' if prefix in self._prefixes else '/:other'
+
+    def render(self):
+        """Export au format texte Prometheus 0.0.4"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{labels} {value}')
+
+        for fn in self._collectors:
+            for name, kind, help_text, samples in fn():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                for labels, value in samples:
+                    lines.append(f'{name}{_format_labels(tuple(labels), tuple(labels.values()))} {value}')
+        lines.append('')
+        return '\n'.join(lines)
+
+
+class _CountingInput:
+    """Flux d'entrée WSGI qui compte les octets lus"""
+
+    def __init__(self, stream):
+        self._stream = stream
+        self.count = 0
+
+    def read(self, *args):
+        data = self._stream.read(*args)
+        self.count += len(data)
+        return data
+
+    def readinto(self, buffer):
+        readinto = getattr(self._stream, 'readinto', None)
+        if readinto is None:
+            data = self._stream.read(len(buffer))
+            buffer[:len(data)] = data
+            size = len(data)
+        else:
+            size = readinto(buffer) or 0
+        self.count += size
+        return size
+
+    def readline(self, *args):
+        data = self._stream.readline(*args)
+        self.count += len(data)
+        return data
+
+    def readlines(self, *args):
+        lines = self._stream.readlines(*args)
+        self.count += sum(len(line) for line in lines)
+        return lines
+
+    def __iter__(self):
+        for line in self._stream:
+            self.count += len(line)
+            yield line
+
+
+class _MeteredBody:
+    """Corps de réponse WSGI qui compte les octets envoyés
+
+    Les métriques de la requête sont relevées à close(), que le serveur appelle
+    même quand le corps n'a pas été parcouru (client parti avant le premier bloc)
+    """
+
+    def __init__(self, result, finish):
+        self._result = result
+        self._finish = finish
+        self._closed = False
+        self.sent = 0
+
+    def __iter__(self):
+        for chunk in self._result:
+            self.sent += len(chunk)
+            yield chunk
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            close = getattr(self._result, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            self._finish(self.sent)
+
+
+class MetricsMiddleware:
+    """Middleware WSGI : durée totale, statut, octets entrants/sortants, requêtes en cours
+
+    La durée va jusqu'à la fermeture de la réponse, corps en flux compris
+    """
+
+    def __init__(self, wsgi_app, registry, prefix='/api/notion/', routes=('/health', '/metrics'),
+                 methods=('GET', 'HEAD', 'POST', 'PATCH', 'PUT', 'DELETE', 'OPTIONS')):
+        self.wsgi_app = wsgi_app
+        self.registry = registry
+        self.prefix = prefix
+        # Hors proxy, seules les routes connues deviennent des labels (cardinalité bornée)
+        self.routes = frozenset(routes)
+        self.methods = frozenset(methods)
+
+        self.requests = registry.counter(
+            'notion_proxy_requests_total', 'Requêtes servies par le proxy',
+            ('method', 'route', 'status'))
+        self.duration = registry.histogram(
+            'notion_proxy_request_duration_seconds', 'Durée totale des requêtes (corps inclus)',
+            ('method', 'route'))
+        self.bytes_in = registry.counter(
+            'notion_proxy_received_bytes_total', 'Octets reçus des clients', ('route',))
+        self.bytes_out = registry.counter(
+            'notion_proxy_sent_bytes_total', 'Octets envoyés aux clients', ('route',))
+        self.in_flight = registry.gauge(
+            'notion_proxy_in_flight_requests', 'Requêtes en cours de traitement')
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if path.startswith(self.prefix):
+            route = self.registry.route_template(path[len(self.prefix):])
+        else:
+            route = path if path in self.routes else 'other'
+        method = environ.get('REQUEST_METHOD', 'GET')
+        if method not in self.methods:
+            method = 'other'
+        status_holder = ['000']
+        counting_input = _CountingInput(environ['wsgi.input'])
+        environ['wsgi.input'] = counting_input
+
+        def capture_status(status, headers, exc_info=None):
+            status_holder[0] = status[:3]
+            return start_response(status, headers, exc_info)
+
+        started = time.perf_counter()
+        self.in_flight.inc()
+        try:
+            result = self.wsgi_app(environ, capture_status)
+        except BaseException:
+            self._finish(method, route, '500', started, counting_input.count, 0)
+            raise
+        return _MeteredBody(result, lambda sent: self._finish(
+            method, route, status_holder[0], started, counting_input.count, sent))
+
+    def _finish(self, method, route, status, started, received, sent):
+        self.in_flight.dec()
+        self.requests.inc(method, route, status)
+        self.duration.observe(time.perf_counter() - started, method, route)
+        if received:
+            self.bytes_in.inc(route, amount=received)
+        if sent:
+            self.bytes_out.inc(route, amount=sent)
@@ -4,93 +4,752 @@ Ce proxy permet d'utiliser l'interface OCR depuis le serveur Python
 en redirigeant les appels API vers le serveur Node.js qui gère Notion
 """
 
+import sys
 import json
 import requests
-from flask import Flask, request, jsonify, make_response
+from itertools import chain
+from contextvars import copy_context
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, Response, request, jsonify, g
 from flask_cors import CORS
+from werkzeug.datastructures import Headers
+from werkzeug.exceptions import RequestEntityTooLarge
+
+try:
+    import resource
+except ImportError:  # Windows : pas de getrusage
+    resource = None
+
+from proxy_config import (
+    NODE_SERVER_URL, NODE_SERVER_URLS, DEFAULT_AUTH_TOKEN, PROXY_PORT, ALLOWED_ORIGINS,
+    UPSTREAM_POOL_SIZE, UPSTREAM_POOL_BLOCK,
+    UPSTREAM_CONNECT_TIMEOUT, UPSTREAM_READ_TIMEOUT, ROUTE_TIMEOUTS, HEALTH_TIMEOUT,
+    STREAM_CHUNK_SIZE, MAX_REQUEST_BYTES, MAX_RESPONSE_BYTES,
+    CACHE_MAX_BYTES, CACHE_MAX_ENTRY_BYTES, CACHE_DEFAULT_TTL, CACHE_TTLS,
+    CACHE_DISK_PATH, CACHE_DISK_MAX_BYTES,
+    SINGLE_FLIGHT_MAX_BYTES, HEALTH_PROBE_INTERVAL,
+    BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_TIMEOUT, BREAKER_HALF_OPEN_CALLS,
+    UPSTREAM_RETRIES, RETRY_BACKOFF_BASE, RETRY_BACKOFF_CAP,
+    BALANCER_STRATEGY, BALANCER_EJECT_AFTER, BALANCER_EJECT_SECONDS, BALANCER_SLOW_FACTOR,
+    RATE_LIMIT_GLOBAL_RPS, RATE_LIMIT_GLOBAL_BURST, RATE_LIMIT_KEY_RPS, RATE_LIMIT_KEY_BURST,
+    RATE_LIMIT_MAX_QUEUE, RATE_LIMIT_MAX_WAIT, PRIORITY_HEADER,
+    COMPRESSION_MIN_BYTES, COMPRESSION_LEVEL, BROTLI_QUALITY,
+    BATCH_MAX_ITEMS, BATCH_CONCURRENCY, PROXY_HOST,
+    WRITE_SPOOL_PATH, WRITE_SPOOL_WORKERS, WRITE_SPOOL_MAX_ATTEMPTS, WRITE_SPOOL_MAX_BODY_BYTES,
+    WRITE_SPOOL_LEASE, WRITE_SPOOL_RETENTION
+)
+from upstream import UpstreamClient, CircuitOpenError, WRITE_METHODS
+from balancer import LoadBalancer
+from metrics import MetricsRegistry, MetricsMiddleware
+from circuit_breaker import CircuitBreaker
+from health_probe import HealthProber
+from streaming import (
+    request_body, iter_upstream, read_prefix, chain_prefix, check_length, hold,
+    BodyTooLarge, BufferMeter, BufferStats, current_meter
+)
+from response_cache import ResponseCache, etag_matches, keyed_values, resource_of, storable
+from disk_cache import DiskCache
+from single_flight import SingleFlight
+from rate_limiter import (
+    RateLimiter, RateLimitExceeded, INTERACTIVE, BULK, PRIORITY_NAMES,
+    request_priority, retry_after_seconds
+)
+from compression import ResponseCompressor, weak_etag
+from write_spool import WriteSpool
+from forwarding import (
+    REQUEST_ID_HEADER, request_id, forward_request_headers, forward_response_headers,
+    cacheable_headers, merge_vary
+)
 
 app = Flask(__name__)
-CORS(app, origins=['http://localhost:8000', 'http://127.0.0.1:8000'])
+CORS(app, origins=ALLOWED_ORIGINS)
+# Corps client au-delà de la limite : 413 dès la lecture du Content-Length (ou en cours de flux)
+app.config['MAX_CONTENT_LENGTH'] = MAX_REQUEST_BYTES or None
+
+# Métriques Prometheus exposées sur /metrics
+metrics = MetricsRegistry()
+app.wsgi_app = MetricsMiddleware(app.wsgi_app, metrics)
+upstream_connect_seconds = metrics.histogram(
+    'notion_proxy_upstream_connect_seconds',
+    'Établissement des nouvelles connexions vers Node.js')
+upstream_response_seconds = metrics.histogram(
+    'notion_proxy_upstream_response_seconds',
+    'Temps de réponse de Node.js jusqu\'aux en-têtes', ('upstream',))
+rate_limit_wait_seconds = metrics.histogram(
+    'notion_proxy_rate_limit_wait_seconds',
+    'Attente dans la file du limiteur de débit', ('priority',))
+compression_input_bytes = metrics.counter(
+    'notion_proxy_compression_input_bytes_total',
+    'Octets en clair compressés par le proxy', ('encoding',))
+compression_output_bytes = metrics.counter(
+    'notion_proxy_compression_output_bytes_total',
+    'Octets produits par la compression du proxy', ('encoding',))
+compression_cpu_seconds = metrics.histogram(
+    'notion_proxy_compression_cpu_seconds',
+    'Temps CPU de compression par réponse', ('encoding',),
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5))
+compression_passthrough = metrics.counter(
+    'notion_proxy_compression_passthrough_total',
+    'Réponses déjà compressées par Node.js, relayées telles quelles', ('encoding',))
+batch_items = metrics.counter(
+    'notion_proxy_batch_items_total', 'Sous-requêtes exécutées via /_batch', ('method', 'status'))
+request_buffered_bytes = metrics.histogram(
+    'notion_proxy_request_buffered_bytes',
+    'Maximum d\'octets de corps gardés en mémoire par requête',
+    buckets=(0, 64 * 1024, 256 * 1024, 1024 ** 2, 2 * 1024 ** 2, 8 * 1024 ** 2, 32 * 1024 ** 2))
+buffer_stats = BufferStats()
+
+def record_compression(encoding, bytes_in, bytes_out, cpu_seconds):
+    compression_input_bytes.inc(encoding, amount=bytes_in)
+    compression_output_bytes.inc(encoding, amount=bytes_out)
+    compression_cpu_seconds.observe(cpu_seconds, encoding)
+
+def record_buffers(meter):
+    request_buffered_bytes.observe(meter.peak)
+    buffer_stats.record(meter)
+
+def max_rss_bytes():
+    """Pic de mémoire résidente du processus (None si indisponible)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux compte en Kio, macOS en octets
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+# Disjoncteur : échec immédiat tant que le serveur Node.js est indisponible
+breaker = CircuitBreaker(
+    failure_threshold=BREAKER_FAILURE_THRESHOLD,
+    reset_timeout=BREAKER_RESET_TIMEOUT,
+    half_open_max_calls=BREAKER_HALF_OPEN_CALLS
+)
+
+# Répartition entre les instances Node.js, avec santé passive
+balancer = LoadBalancer(
+    NODE_SERVER_URLS,
+    strategy=BALANCER_STRATEGY,
+    eject_after=BALANCER_EJECT_AFTER,
+    eject_seconds=BALANCER_EJECT_SECONDS,
+    slow_factor=BALANCER_SLOW_FACTOR
+)
+
+# Client partagé : connexions keep-alive réutilisées entre les requêtes
+upstream = UpstreamClient(
+    NODE_SERVER_URLS,
+    pool_size=UPSTREAM_POOL_SIZE,
+    pool_block=UPSTREAM_POOL_BLOCK,
+    default_timeout=(UPSTREAM_CONNECT_TIMEOUT, UPSTREAM_READ_TIMEOUT),
+    route_timeouts=ROUTE_TIMEOUTS,
+    breaker=breaker,
+    retries=UPSTREAM_RETRIES,
+    backoff_base=RETRY_BACKOFF_BASE,
+    backoff_cap=RETRY_BACKOFF_CAP,
+    balancer=balancer,
+    on_connect=upstream_connect_seconds.observe,
+    on_response=lambda url, seconds: upstream_response_seconds.observe(seconds, url)
+)
+
+def check_node_health():
+    """Vérification de chaque instance Node.js, appelée par la sonde (hors disjoncteur)"""
+    return upstream.probe('/health', HEALTH_TIMEOUT)
+
+# Sonde de santé : /health sert son dernier résultat sans appeler Node.js
+health_prober = HealthProber(
+    check_node_health,
+    interval=HEALTH_PROBE_INTERVAL,
+    on_success=breaker.probe_succeeded,
+    on_failure=breaker.trip
+)
 
-# Configuration
-NODE_SERVER_URL = "http://localhost:3000"
-DEFAULT_AUTH_TOKEN = "demo-token"  # Token par défaut pour les tests
+# Cache des lectures répétées de l'interface OCR
+response_cache = ResponseCache(
+    max_bytes=CACHE_MAX_BYTES,
+    max_entry_bytes=CACHE_MAX_ENTRY_BYTES,
+    default_ttl=CACHE_DEFAULT_TTL,
+    prefix_ttls=CACHE_TTLS,
+    # Redémarrage à chaud : les réponses encore fraîches sont relues du disque
+    disk=DiskCache(CACHE_DISK_PATH, max_bytes=CACHE_DISK_MAX_BYTES) if CACHE_DISK_PATH else None
+)
+
+# Regroupement des GET identiques concurrents
+single_flight = SingleFlight()
+
+# Débit sortant lissé sous la limite de Notion plutôt que des rafales de 429
+rate_limiter = RateLimiter(
+    global_rate=RATE_LIMIT_GLOBAL_RPS,
+    global_burst=RATE_LIMIT_GLOBAL_BURST,
+    key_rate=RATE_LIMIT_KEY_RPS,
+    key_burst=RATE_LIMIT_KEY_BURST,
+    max_queue=RATE_LIMIT_MAX_QUEUE,
+    max_wait=RATE_LIMIT_MAX_WAIT
+)
+
+# Compression négociée des réponses volumineuses
+compressor = ResponseCompressor(
+    min_size=COMPRESSION_MIN_BYTES,
+    level=COMPRESSION_LEVEL,
+    brotli_quality=BROTLI_QUALITY,
+    on_compressed=record_compression
+)
+
+def cached_headers(entry, status):
+    """En-têtes d'une réponse servie depuis le cache"""
+    headers = Headers(entry.headers)
+    headers['Content-Type'] = entry.content_type
+    headers['X-Proxy-Cache'] = status
+    headers.setdefault('Vary', 'Accept-Encoding')
+    if entry.content_encoding:
+        headers['Content-Encoding'] = entry.content_encoding
+    if entry.etag:
+        headers['ETag'] = entry.etag
+    return headers
+
+def compress_body(body, encoding, content_type, content_length):
+    """Compresse un corps en clair au-dessus du seuil ; retourne (corps, encodage appliqué)"""
+    size = int(content_length) if content_length else None
+    if not compressor.should_compress(encoding, content_type, size):
+        return body, None
+    if size is None:
+        # Longueur inconnue : on lit au plus le seuil avant de décider
+        prefix, rest = read_prefix(body, compressor.min_size - 1)
+        if rest is None:
+            return iter((prefix,)), None
+        body = chain_prefix(prefix, rest)
+    return compressor.compress(body, encoding), encoding
+
+def fetch_upstream(method, path, headers, query=None, data=None, priority=INTERACTIVE,
+                   encoding=None, cache_key=None, entry=None, generation=0):
+    """Interroge le serveur Node.js et retourne (status, en-têtes, corps en flux)
+
+    N'utilise pas le contexte Flask : les sous-requêtes de /_batch passent par ici
+    depuis des threads de travail
+    """
+    # Un jeton par appel réellement émis : cache et single-flight n'en consomment pas
+    waited = rate_limiter.acquire(headers['Authorization'], priority)
+    if rate_limiter.enabled:
+        rate_limit_wait_seconds.observe(waited, PRIORITY_NAMES[priority])
+    
+    response = upstream.request(
+        method,
+        f"/api/notion/{path}",
+        route=path,
+        headers=headers,
+        data=data,
+        params=query,
+        stream=True
+    )
+    
+    if response.status_code == 429:
+        # Limite atteinte malgré le lissage : le jeton est mis en pause côté proxy
+        rate_limiter.penalize(headers['Authorization'], retry_after_seconds(response.headers))
+    
+    if method in WRITE_METHODS:
+        response_cache.invalidate(path)
+    
+    try:
+        check_length(response.headers.get('Content-Length'), MAX_RESPONSE_BYTES)
+    except BodyTooLarge:
+        # Rejet avant toute lecture : la connexion est fermée plutôt que vidée
+        response.close()
+        raise
+    
+    if cache_key is not None and entry is not None and response.status_code == 304:
+        response.close()
+        response_cache.refresh(cache_key, path)
+        return 200, cached_headers(entry, 'REVALIDATED'), iter((entry.body,))
+    
+    content_type = response.headers.get('Content-Type', 'application/json')
+    body = iter_upstream(response, STREAM_CHUNK_SIZE, MAX_RESPONSE_BYTES)
+    # Cache-Control, Retry-After, limites de débit... relayés ; valeurs multiples conservées
+    forwarded = forward_response_headers(response.raw.headers.items())
+    vary = merge_vary(response.headers.get('Vary'))
+    response_headers = Headers(forwarded)
+    response_headers['Content-Type'] = content_type
+    response_headers['Vary'] = vary
+    
+    upstream_encoding = response.headers.get('Content-Encoding')
+    if upstream_encoding:
+        # Corps déjà compressé par Node.js : relayé sans décompression ni recompression
+        compression_passthrough.inc(upstream_encoding)
+        content_encoding = upstream_encoding
+    else:
+        body, content_encoding = compress_body(
+            body, encoding, content_type, response.headers.get('Content-Length'))
+    if content_encoding:
+        response_headers['Content-Encoding'] = content_encoding
+    
+    if (cache_key is not None and response.status_code == 200
+            and storable(response.headers.get('Cache-Control'), response.headers.get('Vary'))):
+        etag = response.headers.get('ETag')
+        if content_encoding and not upstream_encoding:
+            # Représentation produite par le proxy : l'ETag amont n'est plus exact à l'octet
+            etag = weak_etag(etag)
+        if etag:
+            response_headers['ETag'] = etag
+        response_headers['X-Proxy-Cache'] = 'MISS'
+        body = response_cache.capture(cache_key, path, generation, body, content_type, etag,
+                                      content_encoding,
+                                      cacheable_headers(forwarded) + (('Vary', vary),))
+    
+    return response.status_code, response_headers, body
+
+def fetch_read(path, headers, query, priority, encoding):
+    """Lecture via le cache et le single-flight
+
+    Retourne (status, en-têtes, début du corps, suite du flux ou None)
+    """
+    key = response_cache.make_key(path, query, headers['Authorization'], encoding,
+                                  keyed_values(headers.items()))
+    cache_key = entry = None
+    generation = 0
+    if response_cache.enabled and response_cache.ttl_for(path) > 0:
+        cache_key = key
+        entry, fresh = response_cache.lookup(cache_key)
+        if fresh:
+            return 200, cached_headers(entry, 'HIT'), entry.body, None
+        if entry is not None and entry.etag:
+            headers = {**headers, 'If-None-Match': entry.etag}
+        generation = response_cache.generation(path)
+    
+    def fetch_shared():
+        """Appel amont du meneur : corps mis en mémoire s'il est partageable"""
+        status, response_headers, body = fetch_upstream(
+            'GET', path, headers, query, None, priority, encoding, cache_key, entry, generation)
+        # Corps trop gros (rest non vide) : le meneur le relaie seul, les autres refont leur appel
+        prefix, rest = read_prefix(body, SINGLE_FLIGHT_MAX_BYTES)
+        return status, response_headers, prefix, rest
+    
+    # Les GET identiques concurrents partagent un seul appel au serveur Node.js
+    (status, response_headers, prefix, rest), shared = single_flight.do(
+        key, fetch_shared, shareable=lambda result: result[3] is None
+    )
+    if shared:
+        # En-têtes partagés entre threads : copiés avant modification
+        response_headers = response_headers.copy()
+        response_headers['X-Proxy-Coalesced'] = '1'
+    return status, response_headers, prefix, rest
+
+def send_spooled(method, path, query, headers, body):
+    """Rejoue une écriture différée, en priorité basse : l'interface passe avant"""
+    try:
+        status, response_headers, chunks = fetch_upstream(method, path, headers, query, body, BULK)
+        response_body = b''.join(chunks)
+    except BodyTooLarge as exc:
+        # Écriture appliquée par Node.js, seule sa réponse dépasse la limite : pas de nouvel essai
+        return 502, 'text/plain', str(exc).encode(), None
+    retry_after = retry_after_seconds(response_headers) if 'Retry-After' in response_headers else None
+    return status, response_headers.get('Content-Type'), response_body, retry_after
+
+# Écritures différées (opt-in) : spool durable vidé par des threads de fond
+write_spool = WriteSpool(
+    WRITE_SPOOL_PATH,
+    send_spooled,
+    workers=WRITE_SPOOL_WORKERS,
+    max_attempts=WRITE_SPOOL_MAX_ATTEMPTS,
+    lease_seconds=WRITE_SPOOL_LEASE,
+    retention=WRITE_SPOOL_RETENTION
+) if WRITE_SPOOL_PATH else None
+
+def prefers_async(value):
+    """Prefer: respond-async (RFC 7240) : le client accepte un 202 et un suivi différé"""
+    if not value:
+        return False
+    return any(token.split(';', 1)[0].strip().lower() == 'respond-async' for token in value.split(','))
+
+def can_spool():
+    """Écriture différable : spool actif, demandée par le client, corps de taille connue et raisonnable"""
+    return (write_spool is not None and prefers_async(request.headers.get('Prefer'))
+            and 'Transfer-Encoding' not in request.headers
+            and (request.content_length or 0) <= WRITE_SPOOL_MAX_BODY_BYTES)
+
+def spool_write(path, headers, query):
+    """Enregistre l'écriture sur disque et répond 202 sans attendre Node.js"""
+    body = request.get_data() if request.content_length else None
+    headers['Accept-Encoding'] = 'identity'
+    job_id = write_spool.enqueue(request.method, path, query, headers, body, g.request_id)
+    status_url = f"/api/notion/_jobs/{job_id}"
+    response = jsonify({'job_id': job_id, 'status': 'queued', 'status_url': status_url})
+    response.status_code = 202
+    response.headers['Location'] = status_url
+    response.headers['Preference-Applied'] = 'respond-async'
+    return response
+
+def error_payload(exc, path):
+    """Traduit une erreur d'appel amont en (corps JSON, status, Retry-After ou None)"""
+    if isinstance(exc, RequestEntityTooLarge):
+        return {
+            'error': 'Corps de requête trop volumineux',
+            'message': f"Maximum {MAX_REQUEST_BYTES} octets"
+        }, 413, None
+    if isinstance(exc, BodyTooLarge):
+        return {
+            'error': 'Réponse Node.js trop volumineuse',
+            'message': f"Réponse de {path} non relayée : {exc}"
+        }, 502, None
+    if isinstance(exc, RateLimitExceeded):
+        return {
+            'error': 'Trop de requêtes vers Notion',
+            'message': str(exc)
+        }, 429, exc.retry_after
+    if isinstance(exc, CircuitOpenError):
+        return {
+            'error': 'Serveur Node.js non disponible',
+            'message': 'Disjoncteur ouvert après des échecs répétés',
+            'solution': 'Exécutez: cd portal-project/server && npm start'
+        }, 503, exc.retry_after
+    if isinstance(exc, requests.exceptions.Timeout):
+        return {
+            'error': 'Serveur Node.js trop lent',
+            'message': f"Pas de réponse dans le délai imparti {upstream.timeout_for(path)}"
+        }, 504, None
+    if isinstance(exc, requests.exceptions.ConnectionError):
+        return {
+            'error': 'Serveur Node.js non disponible',
+            'message': 'Assurez-vous que le serveur Node.js est démarré sur le port 3000',
+            'solution': 'Exécutez: cd portal-project/server && npm start'
+        }, 503, None
+    return {
+        'error': 'Erreur proxy',
+        'message': str(exc)
+    }, 500, None
+
+def forwarded_headers():
+    """En-têtes transmis au serveur Node.js pour la requête en cours"""
+    headers = forward_request_headers(request.headers, request.remote_addr, request.scheme,
+                                      request.host, g.request_id)
+    headers.setdefault('Content-Type', 'application/json')
+    headers.setdefault('Authorization', f'Bearer {DEFAULT_AUTH_TOKEN}')
+    return headers
+
+@app.before_request
+def start_health_prober():
+    """Démarre la sonde dans chaque processus qui sert des requêtes"""
+    health_prober.ensure_started()
+
+@app.before_request
+def start_write_spool():
+    if write_spool is not None:
+        write_spool.ensure_started()
+
+@app.before_request
+def start_buffer_meter():
+    current_meter.set(BufferMeter())
+
+@app.before_request
+def assign_request_id():
+    """Identifiant transmis à Node.js et renvoyé au client, pour suivre une requête lente"""
+    g.request_id = request_id(request.headers.get(REQUEST_ID_HEADER))
+
+@app.after_request
+def echo_request_id(response):
+    rid = g.get('request_id')
+    if rid:
+        response.headers[REQUEST_ID_HEADER] = rid
+    return response
+
+@app.after_request
+def observe_buffer_meter(response):
+    """Le maximum n'est connu qu'une fois le corps entièrement relayé"""
+    meter = current_meter.get()
+    if meter is not None:
+        response.call_on_close(lambda: record_buffers(meter))
+    return response
+
+@app.errorhandler(RequestEntityTooLarge)
+def request_too_large(exc):
+    payload, status, _ = error_payload(exc, request.path)
+    return jsonify(payload), status
 
 @app.route('/api/notion/<path:path>', methods=['GET', 'POST', 'PATCH', 'PUT', 'DELETE'])
 def proxy_notion(path):
     """Proxy toutes les requêtes Notion vers le serveur Node.js"""
     try:
-        # Construire l'URL cible
-        target_url = f"{NODE_SERVER_URL}/api/notion/{path}"
-        
         # Récupérer les headers de la requête originale
-        headers = {
-            'Content-Type': request.headers.get('Content-Type', 'application/json'),
-            'Authorization': request.headers.get('Authorization', f'Bearer {DEFAULT_AUTH_TOKEN}')
-        }
+        headers = forwarded_headers()
+        # Node.js ne peut répondre que dans l'encodage servi au client, ou en clair
+        encoding = compressor.negotiate(request.headers.get('Accept-Encoding'))
+        headers['Accept-Encoding'] = encoding or 'identity'
+        priority = request_priority(request.headers.get(PRIORITY_HEADER))
+        query = list(request.args.items(multi=True))
         
-        # Récupérer les données de la requête
-        data = None
-        if request.method in ['POST', 'PATCH', 'PUT']:
-            if request.is_json:
-                data = request.get_json()
-            else:
-                data = request.data
+        # HEAD suit le chemin des lectures (Flask l'accepte sur les routes GET)
+        if request.method in WRITE_METHODS and can_spool():
+            return spool_write(path, headers, query)
+
+        if request.method in WRITE_METHODS:
+            # Relayer le corps par blocs, sans le parser ni le charger en mémoire
+            # (request.stream lève 413 d'emblée si le Content-Length dépasse la limite)
+            data = None
+            if request.method in ['POST', 'PATCH', 'PUT']:
+                data = request_body(request.stream, request.content_length, STREAM_CHUNK_SIZE)
+            # Écriture : les lectures en cours ne doivent plus remplir le cache
+            response_cache.invalidate(path)
+            status, response_headers, body = fetch_upstream(
+                request.method, path, headers, query, data, priority, encoding)
+            return Response(body, status, response_headers)
         
-        # Faire la requête vers le serveur Node.js
-        response = requests.request(
-            method=request.method,
-            url=target_url,
-            headers=headers,
-            json=data if request.is_json else None,
-            data=data if not request.is_json else None,
-            params=request.args
-        )
+        # Lecture : servir depuis le cache, ou le revalider avec son ETag
+        status, response_headers, prefix, rest = fetch_read(path, headers, query, priority, encoding)
+        if rest is None:
+            if status == 200 and etag_matches(request.headers.get('If-None-Match'),
+                                              response_headers.get('ETag')):
+                return Response(status=304, headers=response_headers)
+            return Response(prefix, status, response_headers)
         
-        # Retourner la réponse
-        return make_response(
-            response.content,
-            response.status_code,
-            {'Content-Type': response.headers.get('Content-Type', 'application/json')}
-        )
+        # Retourner la réponse au fil de l'eau
+        return Response(chain_prefix(prefix, rest), status, response_headers)
         
-    except requests.exceptions.ConnectionError:
-        return jsonify({
-            'error': 'Serveur Node.js non disponible',
-            'message': 'Assurez-vous que le serveur Node.js est démarré sur le port 3000',
-            'solution': 'Exécutez: cd portal-project/server && npm start'
-        }), 503
     except Exception as e:
+        payload, status, retry_after = error_payload(e, path)
+        response = jsonify(payload)
+        if retry_after is not None:
+            response.headers['Retry-After'] = str(max(1, round(retry_after)))
+        return response, status
+
+BATCH_METHODS = ('GET', 'POST', 'PATCH', 'PUT', 'DELETE')
+
+def batch_query(params):
+    """Paramètres d'une sous-requête : {'a': 1, 'b': [2, 3]} -> [('a', '1'), ('b', '2'), ('b', '3')]"""
+    if not isinstance(params, dict):
+        return []
+    query = []
+    for name, values in params.items():
+        for value in values if isinstance(values, list) else [values]:
+            query.append((str(name), str(value)))
+    return query
+
+def batch_body(body, content_type):
+    """Corps d'une sous-réponse : JSON décodé si possible, sinon texte"""
+    if not body:
+        return None
+    if 'json' in content_type:
+        try:
+            return json.loads(body)
+        except ValueError:
+            pass
+    return body.decode('utf-8', 'replace')
+
+def run_subrequest(item, base_headers, priority):
+    """Exécute une sous-requête de /_batch et retourne {status, headers, body}"""
+    method = str(item.get('method', 'GET')).upper()
+    path = str(item.get('path', '')).strip('/')
+    if method not in BATCH_METHODS or not path or path.startswith('_'):
+        batch_items.inc(method if method in BATCH_METHODS else 'other', '400')
+        return {'status': 400, 'body': {
+            'error': 'Sous-requête invalide',
+            'message': f"Méthode ou chemin non supporté: {method} {path or '(vide)'}"
+        }}
+
+    # Les sous-réponses sont intégrées au JSON du batch : corps en clair
+    headers = {**base_headers, 'Accept-Encoding': 'identity'}
+    query = batch_query(item.get('params'))
+    try:
+        if method == 'GET':
+            status, response_headers, prefix, rest = fetch_read(path, headers, query, priority, None)
+            body = prefix if rest is None else b''.join(chain((prefix,), rest))
+        else:
+            response_cache.invalidate(path)
+            data = None
+            if item.get('body') is not None and method in ('POST', 'PATCH', 'PUT'):
+                data = json.dumps(item['body']).encode()
+                headers['Content-Type'] = 'application/json'
+            status, response_headers, chunks = fetch_upstream(
+                method, path, headers, query, data, priority)
+            body = b''.join(chunks)
+        # Sous-réponses gardées jusqu'à l'encodage du JSON du batch
+        hold(len(body))
+    except Exception as e:
+        payload, status, retry_after = error_payload(e, path)
+        batch_items.inc(method, str(status))
+        result = {'status': status, 'body': payload}
+        if retry_after is not None:
+            result['retry_after'] = max(1, round(retry_after))
+        return result
+
+    batch_items.inc(method, str(status))
+    result_headers = {name: response_headers[name]
+                      for name in ('Content-Type', 'ETag', 'Cache-Control', 'Retry-After',
+                                   'X-Proxy-Cache', 'X-Proxy-Coalesced')
+                      if name in response_headers}
+    return {
+        'status': status,
+        'headers': result_headers,
+        'body': batch_body(body, response_headers.get('Content-Type', '')),
+    }
+
+def batch_groups(items):
+    """Regroupe les sous-requêtes qui doivent s'exécuter dans l'ordre
+
+    Une ressource visée par au moins une écriture est traitée séquentiellement,
+    dans l'ordre du tableau ; les lectures seules partent chacune de leur côté
+    """
+    by_resource = {}
+    for index, item in enumerate(items):
+        by_resource.setdefault(resource_of(str(item.get('path', ''))), []).append(index)
+    groups = []
+    for indexes in by_resource.values():
+        if any(str(items[i].get('method', 'GET')).upper() != 'GET' for i in indexes):
+            groups.append(indexes)
+        else:
+            groups.extend([i] for i in indexes)
+    return groups
+
+@app.route('/api/notion/_batch', methods=['POST'])
+def batch():
+    """Exécute plusieurs appels Notion en un aller-retour, résultats dans l'ordre
+
+    Corps : [{"method": "GET", "path": "pages/<id>", "params": {...}, "body": {...}}, ...]
+    (ou {"requests": [...]})
+    """
+    payload = request.get_json(silent=True)
+    items = payload.get('requests') if isinstance(payload, dict) else payload
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        return jsonify({
+            'error': 'Requête batch invalide',
+            'message': 'Un tableau de sous-requêtes {method, path, params, body} est attendu'
+        }), 400
+    if len(items) > BATCH_MAX_ITEMS:
         return jsonify({
-            'error': 'Erreur proxy',
-            'message': str(e)
-        }), 500
+            'error': 'Requête batch trop grande',
+            'message': f"{len(items)} sous-requêtes, maximum {BATCH_MAX_ITEMS}"
+        }), 413
+
+    headers = forwarded_headers()
+    priority = request_priority(request.headers.get(PRIORITY_HEADER))
+    results = [None] * len(items)
+
+    def run_group(indexes):
+        for index in indexes:
+            results[index] = run_subrequest(items[index], headers, priority)
+
+    groups = batch_groups(items)
+    if groups:
+        # Parallélisme borné : les latences amont se recouvrent sans saturer le pool
+        workers = min(BATCH_CONCURRENCY, len(groups))
+        # Les threads de travail comptent leurs tampons dans ceux de la requête
+        context = copy_context()
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='notion-batch') as executor:
+            list(executor.map(lambda indexes: context.copy().run(run_group, indexes), groups))
+
+    body = json.dumps({'results': results}).encode()
+    hold(len(body))
+    response_headers = {'Content-Type': 'application/json', 'Vary': 'Accept-Encoding'}
+    encoding = compressor.negotiate(request.headers.get('Accept-Encoding'))
+    if compressor.should_compress(encoding, 'application/json', len(body)):
+        body = b''.join(compressor.compress(iter((body,)), encoding))
+        response_headers['Content-Encoding'] = encoding
+    return Response(body, 200, response_headers)
+
+@app.route('/api/notion/_jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """État d'une écriture différée : queued, running, done ou failed, avec la réponse de Node.js"""
+    job = write_spool.get(job_id) if write_spool is not None else None
+    # Seul le jeton qui a soumis l'écriture peut la consulter
+    authorization = request.headers.get('Authorization', f'Bearer {DEFAULT_AUTH_TOKEN}')
+    if job is None or job.pop('authorization') != authorization:
+        return jsonify({
+            'error': 'Écriture différée inconnue',
+            'message': f"Aucune écriture {job_id} (inconnue, purgée ou soumise avec un autre jeton)"
+        }), 404
+    status = job.pop('response_status')
+    content_type = job.pop('response_type') or ''
+    body = job.pop('response_body')
+    job['response'] = None if status is None else {
+        'status': status,
+        'body': batch_body(body, content_type),
+    }
+    return jsonify(job)
 
 @app.route('/health', methods=['GET'])
 def health():
     """Health check du proxy"""
-    # Vérifier si le serveur Node.js est accessible
-    try:
-        node_health = requests.get(f"{NODE_SERVER_URL}/health", timeout=2)
-        node_status = node_health.json() if node_health.ok else {'status': 'error'}
-    except:
-        node_status = {'status': 'offline'}
-    
+    # Dernier résultat de la sonde : aucun appel bloquant vers Node.js
     return jsonify({
         'proxy_status': 'ok',
-        'node_server': node_status,
+        'node_server': health_prober.status,
+        'node_probe': health_prober.stats(),
+        'circuit_breaker': breaker.stats(),
         'configuration': {
             'node_url': NODE_SERVER_URL,
-            'proxy_port': 5000
-        }
+            'node_urls': NODE_SERVER_URLS,
+            'balancer_strategy': BALANCER_STRATEGY,
+            'proxy_port': PROXY_PORT
+        },
+        'upstream_pool': upstream.stats(),
+        'cache': response_cache.stats(),
+        'single_flight': single_flight.stats(),
+        'rate_limiter': rate_limiter.stats(),
+        'compression': compressor.stats(),
+        'request_buffers': {**buffer_stats.stats(), 'max_rss_bytes': max_rss_bytes()},
+        'write_spool': write_spool.stats() if write_spool is not None else None
     })
 
+@metrics.collector
+def collect_component_stats():
+    """Compteurs des composants internes, lus au moment de l'export"""
+    pool = upstream.stats()
+    cache = response_cache.stats()
+    flights = single_flight.stats()
+    breaker_stats = breaker.stats()
+    limiter = rate_limiter.stats()
+    return [
+        ('notion_proxy_upstream_in_flight', 'gauge', 'Appels en cours vers Node.js',
+         [({}, pool['in_flight'])]),
+        ('notion_proxy_upstream_retries_total', 'counter', 'Nouvelles tentatives vers Node.js',
+         [({}, pool['retried'])]),
+        ('notion_proxy_upstream_outstanding', 'gauge', 'Appels en cours par instance Node.js',
+         [({'upstream': u['url'], 'state': u['state']}, u['outstanding'])
+          for u in pool['upstreams']]),
+        ('notion_proxy_cache_events_total', 'counter', 'Événements du cache de réponses',
+         [({'event': event}, cache[event])
+          for event in ('hits', 'misses', 'revalidations', 'evictions', 'invalidations')]),
+        ('notion_proxy_cache_bytes', 'gauge', 'Taille du cache de réponses',
+         [({}, cache['bytes'])]),
+        ('notion_proxy_disk_cache_events_total', 'counter', 'Événements du cache disque',
+         [({'event': event}, disk[event])
+          for disk in (cache['disk'],) if disk is not None
+          for event in ('hits', 'stale_hits', 'misses', 'writes', 'evictions', 'errors')]),
+        ('notion_proxy_disk_cache_bytes', 'gauge', 'Taille des corps dans le cache disque',
+         [({}, disk['bytes']) for disk in (cache['disk'],) if disk is not None and disk['bytes'] is not None]),
+        ('notion_proxy_coalesced_requests_total', 'counter', 'GET regroupés (single-flight)',
+         [({}, flights['coalesced'])]),
+        ('notion_proxy_circuit_open', 'gauge', 'Disjoncteur ouvert (1) ou non (0)',
+         [({}, int(breaker_stats['state'] == 'open'))]),
+        ('notion_proxy_circuit_rejected_total', 'counter', 'Appels refusés par le disjoncteur',
+         [({}, breaker_stats['rejected'])]),
+        ('notion_proxy_rate_limit_queue_depth', 'gauge', 'Requêtes en attente de jeton',
+         [({'priority': name}, depth) for name, depth in limiter['queue_depth'].items()]),
+        ('notion_proxy_rate_limit_rejected_total', 'counter',
+         'Requêtes refusées par le limiteur (file pleine ou attente trop longue)',
+         [({}, limiter['rejected'])]),
+        ('notion_proxy_rate_limit_upstream_429_total', 'counter', 'Réponses 429 reçues de Node.js',
+         [({}, limiter['upstream_throttled'])]),
+        ('notion_proxy_process_max_rss_bytes', 'gauge', 'Pic de mémoire résidente du worker',
+         [({}, rss) for rss in (max_rss_bytes(),) if rss is not None]),
+        ('notion_proxy_write_spool_jobs', 'gauge', 'Écritures différées par état',
+         [({'state': state}, count)
+          for state, count in (write_spool.stats()['jobs'].items() if write_spool is not None else ())]),
+    ]
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Métriques au format texte Prometheus"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
     print("\n🔄 Proxy Notion démarré")
-    print(f"📍 Port: 5000")
-    print(f"🔗 Redirige vers: {NODE_SERVER_URL}")
-    print(f"🚀 URL du proxy: http://localhost:5000/api/notion/*")
+    print(f"📍 Port: {PROXY_PORT}")
+    print(f"🔗 Redirige vers: {', '.join(NODE_SERVER_URLS)} ({BALANCER_STRATEGY})")
+    print(f"🚀 URL du proxy: http://localhost:{PROXY_PORT}/api/notion/*")
+    print(f"♻️  Pool keep-alive: {UPSTREAM_POOL_SIZE} connexions")
     print("\n⚠️  Assurez-vous que le serveur Node.js est démarré sur le port 3000!")
-    print("   Commande: cd portal-project/server && npm start\n")
+    print("   Commande: cd portal-project/server && npm start")
+    print("🏭 Production (multi-processus): python serve.py --workers 4\n")
+    if response_cache.disk is not None:
+        print(f"💾 Cache disque: {CACHE_DISK_PATH}\n")
+    if write_spool is not None:
+        print(f"📨 Écritures différées (Prefer: respond-async): {WRITE_SPOOL_PATH}\n")
+        # Reprise des écritures en attente sans attendre une première requête
+        write_spool.ensure_started()
     
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    # Serveur de développement (reloader, debug) : un seul processus
+    app.run(host=PROXY_HOST, port=PROXY_PORT, debug=True)
\ No newline at end of file
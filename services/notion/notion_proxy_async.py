@@ -0,0 +1,724 @@
+"""
+Mode asynchrone du proxy Notion (asyncio + aiohttp)
+Même contrat que notion_proxy.py (/api/notion/<path> et /health), mais un seul
+processus garde des centaines de requêtes en vol vers le serveur Node.js
+sans bloquer un worker par requête
+
+Répartition entre NODE_SERVER_URLS, disjoncteur, limiteur de débit et
+métriques /metrics : les mêmes composants et réglages que le mode synchrone
+
+Dépendance : pip install aiohttp
+Lancement : python notion_proxy_async.py
+"""
+
+import json
+import time
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from concurrent.futures import ThreadPoolExecutor
+from aiohttp import web, ClientSession, ClientTimeout, TCPConnector, ClientConnectionError
+from multidict import CIMultiDict
+
+from proxy_config import (
+    NODE_SERVER_URLS, DEFAULT_AUTH_TOKEN, PROXY_PORT, ALLOWED_ORIGINS,
+    ASYNC_UPSTREAM_POOL_SIZE, UPSTREAM_CONNECT_TIMEOUT, UPSTREAM_READ_TIMEOUT,
+    ROUTE_TIMEOUTS, HEALTH_TIMEOUT, MAX_REQUEST_BYTES, MAX_RESPONSE_BYTES,
+    CACHE_MAX_BYTES, CACHE_MAX_ENTRY_BYTES, CACHE_DEFAULT_TTL, CACHE_TTLS,
+    COMPRESSION_MIN_BYTES, COMPRESSION_LEVEL, BROTLI_QUALITY,
+    BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_TIMEOUT, BREAKER_HALF_OPEN_CALLS,
+    BALANCER_STRATEGY, BALANCER_EJECT_AFTER, BALANCER_EJECT_SECONDS, BALANCER_SLOW_FACTOR,
+    RATE_LIMIT_GLOBAL_RPS, RATE_LIMIT_GLOBAL_BURST, RATE_LIMIT_KEY_RPS, RATE_LIMIT_KEY_BURST,
+    RATE_LIMIT_MAX_QUEUE, RATE_LIMIT_MAX_WAIT, PRIORITY_HEADER, HEALTH_PROBE_INTERVAL
+)
+from upstream import (
+    sort_route_timeouts, match_route_timeout, CircuitOpenError, RETRY_STATUSES, WRITE_METHODS
+)
+from balancer import LoadBalancer
+from circuit_breaker import CircuitBreaker
+from health_probe import AsyncHealthProber
+from rate_limiter import (
+    RateLimiter, RateLimitExceeded, PRIORITY_NAMES, request_priority, retry_after_seconds
+)
+from metrics import MetricsRegistry
+from response_cache import ResponseCache, etag_matches, keyed_values, storable
+from compression import ResponseCompressor, weak_etag
+from forwarding import (
+    REQUEST_ID_HEADER, request_id, forward_request_headers, forward_response_headers,
+    cacheable_headers, merge_vary
+)
+from streaming import BodyTooLarge, BufferMeter, BufferStats, check_length, current_meter, hold, release
+
+PROXY_METHODS = ('GET', 'POST', 'PATCH', 'PUT', 'DELETE')
+PROXY_PREFIX = '/api/notion/'
+
+
+def _client_timeout(timeout):
+    """Convertit un tuple (connexion, lecture) en ClientTimeout aiohttp"""
+    connect, read = timeout
+    return ClientTimeout(total=None, sock_connect=connect, sock_read=read)
+
+
+class AsyncUpstreamClient:
+    """Client non bloquant avec pool keep-alive, timeouts par route, répartition
+    entre les instances Node.js et disjoncteur (mêmes composants que le mode synchrone)"""
+
+    def __init__(self, urls, pool_size=32, default_timeout=(3.05, 30), route_timeouts=None,
+                 breaker=None, balancer=None, on_response=None):
+        if isinstance(urls, str):
+            urls = [urls]
+        self.balancer = balancer or LoadBalancer(urls)
+        self.breaker = breaker
+        self.pool_size = pool_size
+        self.default_timeout = _client_timeout(default_timeout)
+        # ClientTimeout pré-calculés : aucune allocation par requête
+        self._route_timeouts = [
+            (prefix, _client_timeout(timeout))
+            for prefix, timeout in sort_route_timeouts(route_timeouts)
+        ]
+        # Rappel (url du serveur, secondes jusqu'aux en-têtes) pour les métriques
+        self._on_response = on_response
+        self._session = None
+        self._connector = None
+
+        # Boucle d'événements unique : pas besoin de verrou pour les compteurs
+        self._requests = 0
+        self._errors = 0
+        self._in_flight = 0
+
+    async def start(self):
+        self._connector = TCPConnector(limit=self.pool_size, keepalive_timeout=30)
+        # Corps relayés avec leur Content-Encoding d'origine
+        self._session = ClientSession(connector=self._connector, auto_decompress=False)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+    def timeout_for(self, path):
+        return match_route_timeout(self._route_timeouts, path, self.default_timeout)
+
+    @asynccontextmanager
+    async def stream(self, method, path, timeout=None, route=None, backend=None, **kwargs):
+        """Ouvre la requête et cède la réponse dont le corps reste à lire
+
+        Sans backend imposé, l'appel passe par le disjoncteur puis par le
+        répartiteur ; le verdict (statut, latence jusqu'aux en-têtes) est rendu
+        dès les en-têtes reçus, comme UpstreamClient._send
+        """
+        if timeout is None:
+            timeout = self.timeout_for(route if route is not None else path)
+        elif isinstance(timeout, tuple):
+            timeout = _client_timeout(timeout)
+
+        probing = backend is not None
+        breaker = None if probing else self.breaker
+        if breaker is not None and not breaker.allow():
+            raise CircuitOpenError(breaker.retry_after())
+        backend = self.balancer.acquire(backend)
+
+        self._requests += 1
+        self._in_flight += 1
+        started = time.perf_counter()
+        latency = None
+        ok = True
+        try:
+            async with self._session.request(
+                method, f"{backend.url}{path}", timeout=timeout, **kwargs
+            ) as response:
+                latency = time.perf_counter() - started
+                ok = response.status not in RETRY_STATUSES
+                if breaker is not None and ok:
+                    breaker.record_success()
+                elif breaker is not None:
+                    breaker.record_failure()
+                yield response
+        except (ClientConnectionError, asyncio.TimeoutError):
+            self._errors += 1
+            if latency is None:
+                # Pas d'en-têtes : l'échec revient au serveur
+                ok = False
+                if breaker is not None:
+                    breaker.record_failure()
+            raise
+        finally:
+            self._in_flight -= 1
+            # Erreur locale avant les en-têtes (corps client trop gros) : latence non comptée
+            self.balancer.release(backend, None if probing else latency, ok)
+            if latency is not None and not probing and self._on_response is not None:
+                self._on_response(backend.url, latency)
+
+    async def request(self, method, path, **kwargs):
+        """Envoie la requête et retourne (status, headers, corps)"""
+        async with self.stream(method, path, **kwargs) as response:
+            body = await response.read()
+            return response.status, response.headers, body
+
+    async def probe(self, path, timeout):
+        """Sonde de chaque serveur (hors disjoncteur) : met à jour sa santé, retourne un statut
+
+        Lève ClientConnectionError si aucun serveur ne répond correctement
+        """
+        status = None
+        for backend in self.balancer.backends:
+            try:
+                code, _, body = await self.request('GET', path, timeout=timeout, backend=backend)
+                ok = 200 <= code < 400
+                if ok and status is None:
+                    status = json.loads(body)
+            except (ClientConnectionError, asyncio.TimeoutError, ValueError):
+                ok = False
+            self.balancer.mark(backend, ok)
+
+        if status is None:
+            raise ClientConnectionError("Aucun serveur Node.js disponible")
+        return status
+
+    def stats(self):
+        """Statistiques du pool pour /health"""
+        return {
+            'pool_size': self.pool_size,
+            'requests': self._requests,
+            'errors': self._errors,
+            'in_flight': self._in_flight,
+            'upstreams': self.balancer.stats(),
+        }
+
+
+class ProxyMetrics:
+    """Métriques exportées sur /metrics, sous les mêmes noms que le mode synchrone"""
+
+    methods = frozenset(PROXY_METHODS + ('HEAD', 'OPTIONS'))
+
+    def __init__(self):
+        self.registry = MetricsRegistry()
+        self.requests = self.registry.counter(
+            'notion_proxy_requests_total', 'Requêtes servies par le proxy',
+            ('method', 'route', 'status'))
+        self.duration = self.registry.histogram(
+            'notion_proxy_request_duration_seconds', 'Durée totale des requêtes (corps inclus)',
+            ('method', 'route'))
+        self.in_flight = self.registry.gauge(
+            'notion_proxy_in_flight_requests', 'Requêtes en cours de traitement')
+        self.upstream_response = self.registry.histogram(
+            'notion_proxy_upstream_response_seconds',
+            'Temps de réponse de Node.js jusqu\'aux en-têtes', ('upstream',))
+        self.rate_limit_wait = self.registry.histogram(
+            'notion_proxy_rate_limit_wait_seconds',
+            'Attente dans la file du limiteur de débit', ('priority',))
+
+    def labels(self, request):
+        """(méthode, route) à cardinalité bornée, comme MetricsMiddleware"""
+        path = request.path
+        if path.startswith(PROXY_PREFIX):
+            route = self.registry.route_template(path[len(PROXY_PREFIX):])
+        else:
+            route = path if path in ('/health', '/metrics') else 'other'
+        method = request.method if request.method in self.methods else 'other'
+        return method, route
+
+
+UPSTREAM = web.AppKey('upstream', AsyncUpstreamClient)
+CACHE = web.AppKey('cache', ResponseCache)
+COMPRESSOR = web.AppKey('compressor', ResponseCompressor)
+BUFFERS = web.AppKey('buffers', BufferStats)
+BREAKER = web.AppKey('breaker', CircuitBreaker)
+BALANCER = web.AppKey('balancer', LoadBalancer)
+RATE_LIMITER = web.AppKey('rate_limiter', RateLimiter)
+LIMITER_POOL = web.AppKey('limiter_pool', ThreadPoolExecutor)
+METRICS = web.AppKey('metrics', ProxyMetrics)
+HEALTH_PROBER = web.AppKey('health_prober', AsyncHealthProber)
+
+
+@web.middleware
+async def metrics_middleware(request, handler):
+    """Durée totale, statut et requêtes en cours (le handler rend la main après le corps)"""
+    metrics = request.app[METRICS]
+    method, route = metrics.labels(request)
+    status = '500'
+    started = time.perf_counter()
+    metrics.in_flight.inc()
+    try:
+        response = await handler(request)
+        status = str(response.status)
+        return response
+    except web.HTTPException as e:
+        status = str(e.status)
+        raise
+    finally:
+        metrics.in_flight.dec()
+        metrics.requests.inc(method, route, status)
+        metrics.duration.observe(time.perf_counter() - started, method, route)
+
+
+@web.middleware
+async def cors_middleware(request, handler):
+    """Équivalent de flask_cors pour les origines de l'interface OCR"""
+    origin = request.headers.get('Origin')
+    allowed = origin in ALLOWED_ORIGINS
+
+    if request.method == 'OPTIONS' and allowed:
+        response = web.Response(status=200)
+        response.headers['Access-Control-Allow-Methods'] = ', '.join(PROXY_METHODS)
+        requested = request.headers.get('Access-Control-Request-Headers')
+        if requested:
+            response.headers['Access-Control-Allow-Headers'] = requested
+    else:
+        response = await handler(request)
+
+    if allowed:
+        response.headers['Access-Control-Allow-Origin'] = origin
+        vary = response.headers.get('Vary')
+        response.headers['Vary'] = f'{vary}, Origin' if vary else 'Origin'
+    return response
+
+
+def _request_id(request):
+    """Identifiant transmis à Node.js et renvoyé au client, pour suivre une requête lente"""
+    rid = request.get('request_id')
+    if rid is None:
+        rid = request['request_id'] = request_id(request.headers.get(REQUEST_ID_HEADER))
+    return rid
+
+
+async def _echo_request_id(request, response):
+    """Juste avant l'envoi des en-têtes, réponses en flux comprises"""
+    response.headers[REQUEST_ID_HEADER] = _request_id(request)
+
+
+def _error_response(exc, path=''):
+    """Réponse JSON équivalente à celles du proxy synchrone"""
+    if isinstance(exc, RateLimitExceeded):
+        return web.json_response({
+            'error': 'Trop de requêtes vers Notion',
+            'message': str(exc)
+        }, status=429, headers={'Retry-After': str(max(1, round(exc.retry_after)))})
+    if isinstance(exc, CircuitOpenError):
+        return web.json_response({
+            'error': 'Serveur Node.js non disponible',
+            'message': 'Disjoncteur ouvert après des échecs répétés',
+            'solution': 'Exécutez: cd portal-project/server && npm start'
+        }, status=503, headers={'Retry-After': str(max(1, round(exc.retry_after)))})
+    if isinstance(exc, BodyTooLarge):
+        return web.json_response({
+            'error': 'Réponse Node.js trop volumineuse',
+            'message': f"Réponse de {path} non relayée : {exc}"
+        }, status=502)
+    if isinstance(exc, asyncio.TimeoutError):
+        return web.json_response({
+            'error': 'Serveur Node.js trop lent',
+            'message': 'Pas de réponse dans le délai imparti'
+        }, status=504)
+    if isinstance(exc, ClientConnectionError):
+        return web.json_response({
+            'error': 'Serveur Node.js non disponible',
+            'message': 'Assurez-vous que le serveur Node.js est démarré sur le port 3000',
+            'solution': 'Exécutez: cd portal-project/server && npm start'
+        }, status=503)
+    return web.json_response({
+        'error': 'Erreur proxy',
+        'message': str(exc)
+    }, status=500)
+
+
+def _cached_response(request, entry, status):
+    """Réponse servie depuis le cache, ou 304 si le client a déjà cette version"""
+    headers = CIMultiDict(entry.headers)
+    headers['Content-Type'] = entry.content_type
+    headers['X-Proxy-Cache'] = status
+    headers.setdefault('Vary', 'Accept-Encoding')
+    if entry.content_encoding:
+        headers['Content-Encoding'] = entry.content_encoding
+    if entry.etag:
+        headers['ETag'] = entry.etag
+        if etag_matches(request.headers.get('If-None-Match'), entry.etag):
+            return web.Response(status=304, headers=headers)
+    return web.Response(body=entry.body, headers=headers)
+
+
+def _request_too_large():
+    return web.json_response({
+        'error': 'Corps de requête trop volumineux',
+        'message': f"Maximum {MAX_REQUEST_BYTES} octets"
+    }, status=413)
+
+
+class _RequestBody:
+    """Corps client relayé par blocs tels que reçus, interrompu au-delà de limit
+
+    iter_chunks() cède les tampons du transport sans les redécouper ni les recopier
+    """
+
+    def __init__(self, content, limit):
+        self._content = content
+        self._limit = limit
+        self.exceeded = False
+
+    async def __aiter__(self):
+        size = 0
+        async for chunk, _ in self._content.iter_chunks():
+            size += len(chunk)
+            if self._limit and size > self._limit:
+                self.exceeded = True
+                raise BodyTooLarge(self._limit, size)
+            yield chunk
+
+
+async def _iter_upstream(content, limit, size=0):
+    """Blocs amont tels que reçus, interrompus au-delà de limit octets (size déjà lus)"""
+    async for chunk, _ in content.iter_chunks():
+        size += len(chunk)
+        if limit and size > limit:
+            raise BodyTooLarge(limit, size)
+        yield chunk
+
+
+async def _read_prefix(content, limit):
+    """Lit jusqu'à limit octets du flux amont (moins s'il s'épuise avant)"""
+    buffer, size = [], 0
+    while size < limit:
+        chunk = await content.read(limit - size)
+        if not chunk:
+            break
+        buffer.append(chunk)
+        size += len(chunk)
+    return b''.join(buffer)
+
+
+async def _acquire_token(app, key, priority):
+    """Jeton du limiteur partagé avec le mode synchrone
+
+    Jeton disponible : pris sans quitter la boucle. Sinon l'attente (bloquante,
+    dans la file prioritaire du limiteur) se fait dans un thread dédié
+    """
+    limiter = app[RATE_LIMITER]
+    if not limiter.enabled:
+        return
+    waited = 0.0
+    if not limiter.try_acquire(key):
+        waited = await asyncio.get_running_loop().run_in_executor(
+            app[LIMITER_POOL], limiter.acquire, key, priority)
+    app[METRICS].rate_limit_wait.observe(waited, PRIORITY_NAMES[priority])
+
+
+async def proxy_notion(request):
+    """Proxy toutes les requêtes Notion vers le serveur Node.js"""
+    client = request.app[UPSTREAM]
+    cache = request.app[CACHE]
+    compressor = request.app[COMPRESSOR]
+    path = request.match_info['path']
+    # HEAD suit le chemin des lectures, comme en mode synchrone : corps lu (et mis en cache), pas envoyé
+    method = 'GET' if request.method == 'HEAD' else request.method
+    response = None
+    body = None
+    if MAX_REQUEST_BYTES and (request.content_length or 0) > MAX_REQUEST_BYTES:
+        return _request_too_large()
+    # Tâche dédiée à la requête : le compteur ne voit que ses propres tampons
+    meter = BufferMeter()
+    current_meter.set(meter)
+    try:
+        headers = forward_request_headers(request.headers.items(), request.remote,
+                                          request.scheme, request.host, _request_id(request))
+        headers.setdefault('Content-Type', 'application/json')
+        headers.setdefault('Authorization', f'Bearer {DEFAULT_AUTH_TOKEN}')
+        # Node.js ne peut répondre que dans l'encodage servi au client, ou en clair
+        encoding = compressor.negotiate(request.headers.get('Accept-Encoding'))
+        headers['Accept-Encoding'] = encoding or 'identity'
+
+        # Lecture : servir depuis le cache, ou le revalider avec son ETag
+        cache_key = entry = None
+        if method == 'GET' and cache.enabled and cache.ttl_for(path) > 0:
+            cache_key = cache.make_key(path, request.query.items(), headers['Authorization'],
+                                       encoding, keyed_values(headers.items()))
+            entry, fresh = cache.lookup(cache_key)
+            if fresh:
+                return _cached_response(request, entry, 'HIT')
+            if entry is not None and entry.etag:
+                headers['If-None-Match'] = entry.etag
+            generation = cache.generation(path)
+        elif request.method in WRITE_METHODS:
+            # Écriture : les lectures en cours ne doivent plus remplir le cache
+            cache.invalidate(path)
+
+        # Un jeton par appel réellement émis : les réponses du cache n'en consomment pas
+        priority = request_priority(request.headers.get(PRIORITY_HEADER))
+        await _acquire_token(request.app, headers['Authorization'], priority)
+
+        # Le corps est relayé par blocs, sans être parsé ni chargé en mémoire
+        if request.method in ('POST', 'PATCH', 'PUT') and request.body_exists:
+            body = _RequestBody(request.content, MAX_REQUEST_BYTES)
+            if request.content_length is not None:
+                headers['Content-Length'] = str(request.content_length)
+
+        async with client.stream(
+            method,
+            f"/api/notion/{path}",
+            route=path,
+            headers=headers,
+            data=body,
+            params=request.query
+        ) as upstream_response:
+            if upstream_response.status == 429:
+                # Limite atteinte malgré le lissage : le jeton est mis en pause côté proxy
+                request.app[RATE_LIMITER].penalize(headers['Authorization'],
+                                                   retry_after_seconds(upstream_response.headers))
+            if request.method in WRITE_METHODS:
+                cache.invalidate(path)
+            check_length(upstream_response.content_length, MAX_RESPONSE_BYTES)
+
+            if cache_key is not None and entry is not None and upstream_response.status == 304:
+                cache.refresh(cache_key, path)
+                return _cached_response(request, entry, 'REVALIDATED')
+
+            content_type = upstream_response.headers.get('Content-Type', 'application/json')
+            # Cache-Control, Retry-After, limites de débit... relayés ; valeurs multiples conservées
+            forwarded = forward_response_headers(upstream_response.headers.items())
+            vary = merge_vary(upstream_response.headers.get('Vary'))
+            response_headers = CIMultiDict(forwarded)
+            response_headers['Content-Type'] = content_type
+            response_headers['Vary'] = vary
+            buffer = None
+
+            # Corps déjà compressé par Node.js : relayé sans décompression ni recompression
+            content_encoding = upstream_response.headers.get('Content-Encoding')
+            stream_compressor = None
+            prefix = b''
+            length = upstream_response.content_length
+            if not content_encoding and compressor.should_compress(encoding, content_type, length):
+                if length is None:
+                    # Longueur inconnue : on lit au plus le seuil avant de décider
+                    prefix = await _read_prefix(upstream_response.content, compressor.min_size)
+                    hold(len(prefix))
+                if length is not None or len(prefix) >= compressor.min_size:
+                    stream_compressor = compressor.stream(encoding)
+                    content_encoding = encoding
+            if content_encoding:
+                response_headers['Content-Encoding'] = content_encoding
+
+            if (cache_key is not None and upstream_response.status == 200
+                    and storable(', '.join(upstream_response.headers.getall('Cache-Control', ())),
+                                 ', '.join(upstream_response.headers.getall('Vary', ())))):
+                etag = upstream_response.headers.get('ETag')
+                if stream_compressor is not None:
+                    # Représentation produite par le proxy : l'ETag amont n'est plus exact à l'octet
+                    etag = weak_etag(etag)
+                if etag:
+                    response_headers['ETag'] = etag
+                response_headers['X-Proxy-Cache'] = 'MISS'
+                buffer, size = [], 0
+
+            response = web.StreamResponse(status=upstream_response.status, headers=response_headers)
+            await response.prepare(request)
+
+            async def emit(chunk):
+                nonlocal buffer, size
+                if not chunk:
+                    return
+                if buffer is not None:
+                    size += len(chunk)
+                    if size <= cache.max_entry_bytes:
+                        buffer.append(chunk)
+                        hold(len(chunk))
+                    else:
+                        buffer = None  # Trop gros : on relaie sans mettre en cache
+                        release(size - len(chunk))
+                if request.method != 'HEAD':
+                    await response.write(chunk)
+
+            chunks = _iter_upstream(upstream_response.content, MAX_RESPONSE_BYTES, len(prefix))
+            if stream_compressor is None:
+                await emit(prefix)
+                async for chunk in chunks:
+                    await emit(chunk)
+            else:
+                await emit(stream_compressor.compress(prefix))
+                async for chunk in chunks:
+                    await emit(stream_compressor.compress(chunk))
+                await emit(stream_compressor.finish())
+                compressor.record(stream_compressor)
+            await response.write_eof()
+
+            if buffer is not None:
+                cache.store(cache_key, path, generation, b''.join(buffer), content_type, etag,
+                            content_encoding, cacheable_headers(forwarded) + (('Vary', vary),))
+            return response
+
+    except Exception as e:
+        if response is not None and response.prepared:
+            # En-têtes déjà envoyés : aiohttp coupe la connexion (corps tronqué)
+            raise
+        if body is not None and body.exceeded:
+            return _request_too_large()
+        return _error_response(e, path)
+    finally:
+        request.app[BUFFERS].record(meter)
+
+
+async def sync_only(request):
+    """/_batch et /_jobs n'existent qu'en mode synchrone : jamais relayés à Node.js"""
+    return web.json_response({
+        'error': 'Non disponible en mode asynchrone',
+        'message': f"{request.path} n'est servi que par notion_proxy.py"
+    }, status=501)
+
+
+async def health(request):
+    """Health check du proxy"""
+    client = request.app[UPSTREAM]
+    prober = request.app[HEALTH_PROBER]
+    # Dernier résultat de la sonde : aucun appel vers Node.js
+    return web.json_response({
+        'proxy_status': 'ok',
+        'mode': 'async',
+        'node_server': prober.status,
+        'node_probe': prober.stats(),
+        'circuit_breaker': request.app[BREAKER].stats(),
+        'configuration': {
+            'node_url': NODE_SERVER_URLS[0],
+            'node_urls': NODE_SERVER_URLS,
+            'balancer_strategy': BALANCER_STRATEGY,
+            'proxy_port': PROXY_PORT
+        },
+        'upstream_pool': client.stats(),
+        'cache': request.app[CACHE].stats(),
+        'rate_limiter': request.app[RATE_LIMITER].stats(),
+        'compression': request.app[COMPRESSOR].stats(),
+        'request_buffers': request.app[BUFFERS].stats()
+    })
+
+
+async def metrics_endpoint(request):
+    """Métriques au format texte Prometheus"""
+    return web.Response(body=request.app[METRICS].registry.render().encode(),
+                        headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'})
+
+
+def collect_component_stats(app):
+    """Compteurs des composants internes, lus au moment de l'export"""
+    pool = app[UPSTREAM].stats()
+    cache = app[CACHE].stats()
+    breaker_stats = app[BREAKER].stats()
+    limiter = app[RATE_LIMITER].stats()
+    return [
+        ('notion_proxy_upstream_in_flight', 'gauge', 'Appels en cours vers Node.js',
+         [({}, pool['in_flight'])]),
+        ('notion_proxy_upstream_outstanding', 'gauge', 'Appels en cours par instance Node.js',
+         [({'upstream': u['url'], 'state': u['state']}, u['outstanding'])
+          for u in pool['upstreams']]),
+        ('notion_proxy_cache_events_total', 'counter', 'Événements du cache de réponses',
+         [({'event': event}, cache[event])
+          for event in ('hits', 'misses', 'revalidations', 'evictions', 'invalidations')]),
+        ('notion_proxy_cache_bytes', 'gauge', 'Taille du cache de réponses',
+         [({}, cache['bytes'])]),
+        ('notion_proxy_circuit_open', 'gauge', 'Disjoncteur ouvert (1) ou non (0)',
+         [({}, int(breaker_stats['state'] == 'open'))]),
+        ('notion_proxy_circuit_rejected_total', 'counter', 'Appels refusés par le disjoncteur',
+         [({}, breaker_stats['rejected'])]),
+        ('notion_proxy_rate_limit_queue_depth', 'gauge', 'Requêtes en attente de jeton',
+         [({'priority': name}, depth) for name, depth in limiter['queue_depth'].items()]),
+        ('notion_proxy_rate_limit_rejected_total', 'counter',
+         'Requêtes refusées par le limiteur (file pleine ou attente trop longue)',
+         [({}, limiter['rejected'])]),
+        ('notion_proxy_rate_limit_upstream_429_total', 'counter', 'Réponses 429 reçues de Node.js',
+         [({}, limiter['upstream_throttled'])]),
+    ]
+
+
+async def _upstream_ctx(app):
+    """Ouvre le client partagé au démarrage et le ferme à l'arrêt"""
+    client = AsyncUpstreamClient(
+        NODE_SERVER_URLS,
+        pool_size=ASYNC_UPSTREAM_POOL_SIZE,
+        default_timeout=(UPSTREAM_CONNECT_TIMEOUT, UPSTREAM_READ_TIMEOUT),
+        route_timeouts=ROUTE_TIMEOUTS,
+        breaker=app[BREAKER],
+        balancer=app[BALANCER],
+        on_response=lambda url, seconds: app[METRICS].upstream_response.observe(seconds, url)
+    )
+    await client.start()
+    app[UPSTREAM] = client
+    # Un thread par requête en attente de jeton, au plus la taille de la file du limiteur
+    app[LIMITER_POOL] = ThreadPoolExecutor(max_workers=max(1, RATE_LIMIT_MAX_QUEUE),
+                                           thread_name_prefix='rate-limit')
+    yield
+    await client.close()
+    app[LIMITER_POOL].shutdown(wait=False, cancel_futures=True)
+
+
+async def _health_probe_ctx(app):
+    """Sonde Node.js dans une tâche de fond, arrêtée avec l'application"""
+    breaker = app[BREAKER]
+    client = app[UPSTREAM]
+    app[HEALTH_PROBER] = AsyncHealthProber(
+        lambda: client.probe('/health', HEALTH_TIMEOUT),
+        interval=HEALTH_PROBE_INTERVAL,
+        on_success=breaker.probe_succeeded,
+        on_failure=breaker.trip
+    )
+    task = asyncio.create_task(app[HEALTH_PROBER].run())
+    yield
+    task.cancel()
+    with suppress(asyncio.CancelledError):
+        await task
+
+
+def create_app():
+    """Construit l'application aiohttp"""
+    app = web.Application(middlewares=[metrics_middleware, cors_middleware])
+    app[METRICS] = ProxyMetrics()
+    app[METRICS].registry.collector(lambda: collect_component_stats(app))
+    # Disjoncteur, répartition et limiteur : mêmes classes et réglages que notion_proxy.py
+    app[BREAKER] = CircuitBreaker(
+        failure_threshold=BREAKER_FAILURE_THRESHOLD,
+        reset_timeout=BREAKER_RESET_TIMEOUT,
+        half_open_max_calls=BREAKER_HALF_OPEN_CALLS
+    )
+    app[BALANCER] = LoadBalancer(
+        NODE_SERVER_URLS,
+        strategy=BALANCER_STRATEGY,
+        eject_after=BALANCER_EJECT_AFTER,
+        eject_seconds=BALANCER_EJECT_SECONDS,
+        slow_factor=BALANCER_SLOW_FACTOR
+    )
+    app[RATE_LIMITER] = RateLimiter(
+        global_rate=RATE_LIMIT_GLOBAL_RPS,
+        global_burst=RATE_LIMIT_GLOBAL_BURST,
+        key_rate=RATE_LIMIT_KEY_RPS,
+        key_burst=RATE_LIMIT_KEY_BURST,
+        max_queue=RATE_LIMIT_MAX_QUEUE,
+        max_wait=RATE_LIMIT_MAX_WAIT
+    )
+    app[CACHE] = ResponseCache(
+        max_bytes=CACHE_MAX_BYTES,
+        max_entry_bytes=CACHE_MAX_ENTRY_BYTES,
+        default_ttl=CACHE_DEFAULT_TTL,
+        prefix_ttls=CACHE_TTLS
+    )
+    app[COMPRESSOR] = ResponseCompressor(
+        min_size=COMPRESSION_MIN_BYTES,
+        level=COMPRESSION_LEVEL,
+        brotli_quality=BROTLI_QUALITY
+    )
+    app[BUFFERS] = BufferStats()
+    app.on_response_prepare.append(_echo_request_id)
+    app.cleanup_ctx.append(_upstream_ctx)
+    app.cleanup_ctx.append(_health_probe_ctx)
+    app.router.add_get('/health', health)
+    app.router.add_get('/metrics', metrics_endpoint)
+    # Routes propres au mode synchrone (lots, écritures différées), avant le relais générique
+    app.router.add_post('/api/notion/_batch', sync_only)
+    app.router.add_get('/api/notion/_jobs/{job_id}', sync_only)
+    for method in PROXY_METHODS + ('HEAD',):
+        app.router.add_route(method, '/api/notion/{path:.+}', proxy_notion)
+    return app
+
+
+if __name__ == '__main__':
+    print("\n🔄 Proxy Notion démarré (mode asynchrone)")
+    print(f"📍 Port: {PROXY_PORT}")
+    print(f"🔗 Redirige vers: {', '.join(NODE_SERVER_URLS)} ({BALANCER_STRATEGY})")
+    print(f"🚀 URL du proxy: http://localhost:{PROXY_PORT}/api/notion/*")
+    print(f"♻️  Pool keep-alive: {ASYNC_UPSTREAM_POOL_SIZE} connexions")
+    print("\n⚠️  Assurez-vous que le serveur Node.js est démarré sur le port 3000!")
+    print("   Commande: cd portal-project/server && npm start\n")
+
+    web.run_app(create_app(), host='0.0.0.0', port=PROXY_PORT, print=None)
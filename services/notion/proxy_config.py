@@ -0,0 +1,150 @@
+"""
+Configuration partagée du proxy Notion
+Les valeurs par défaut peuvent être surchargées par variables d'environnement
+"""
+
+import os
+
+
+def _env_int(name, default):
+    """Lit un entier depuis l'environnement"""
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def _env_float(name, default):
+    """Lit un flottant depuis l'environnement"""
+    value = os.environ.get(name)
+    return float(value) if value else default
+
+
+# Serveur Node.js
+NODE_SERVER_URL = os.environ.get('NODE_SERVER_URL', "http://localhost:3000")
+# Plusieurs instances Node.js (PM2) : NODE_SERVER_URLS="http://localhost:3000,http://localhost:3001"
+NODE_SERVER_URLS = [
+    url.strip() for url in os.environ.get('NODE_SERVER_URLS', NODE_SERVER_URL).split(',')
+    if url.strip()
+]
+DEFAULT_AUTH_TOKEN = "demo-token"  # Token par défaut pour les tests
+PROXY_PORT = _env_int('NOTION_PROXY_PORT', 5000)
+
+# Origines autorisées (CORS) pour l'interface OCR
+ALLOWED_ORIGINS = ['http://localhost:8000', 'http://127.0.0.1:8000']
+
+# Répartition de charge : 'p2c' (power of two choices) ou 'least_outstanding'
+BALANCER_STRATEGY = os.environ.get('NOTION_PROXY_LB_STRATEGY', 'p2c')
+# Santé passive : erreurs consécutives avant mise à l'écart, durée de mise à l'écart
+BALANCER_EJECT_AFTER = _env_int('NOTION_PROXY_LB_EJECT_AFTER', 3)
+BALANCER_EJECT_SECONDS = _env_float('NOTION_PROXY_LB_EJECT_SECONDS', 10)
+# Un nœud plus lent que ce multiple de la latence médiane des autres est drainé
+BALANCER_SLOW_FACTOR = _env_float('NOTION_PROXY_LB_SLOW_FACTOR', 3.0)
+
+# Pool de connexions keep-alive vers le serveur Node.js
+UPSTREAM_POOL_SIZE = _env_int('NOTION_PROXY_POOL_SIZE', 32)
+UPSTREAM_POOL_BLOCK = os.environ.get('NOTION_PROXY_POOL_BLOCK', '0') == '1'
+# Le mode asynchrone garde beaucoup plus de requêtes en vol par processus
+ASYNC_UPSTREAM_POOL_SIZE = _env_int('NOTION_PROXY_ASYNC_POOL_SIZE', 256)
+
+# Timeouts (connexion, lecture) en secondes
+UPSTREAM_CONNECT_TIMEOUT = _env_float('NOTION_PROXY_CONNECT_TIMEOUT', 3.05)
+UPSTREAM_READ_TIMEOUT = _env_float('NOTION_PROXY_READ_TIMEOUT', 30)
+
+HEALTH_TIMEOUT = (1, 2)
+
+# Sonde de santé en tâche de fond (secondes entre deux vérifications)
+HEALTH_PROBE_INTERVAL = _env_float('NOTION_PROXY_HEALTH_INTERVAL', 5)
+
+# Disjoncteur : échecs consécutifs avant ouverture, durée d'ouverture, appels d'essai
+BREAKER_FAILURE_THRESHOLD = _env_int('NOTION_PROXY_BREAKER_FAILURES', 5)
+BREAKER_RESET_TIMEOUT = _env_float('NOTION_PROXY_BREAKER_RESET', 10)
+BREAKER_HALF_OPEN_CALLS = _env_int('NOTION_PROXY_BREAKER_TRIALS', 1)
+
+# Nouvelles tentatives (méthodes idempotentes uniquement) avec gigue exponentielle
+UPSTREAM_RETRIES = _env_int('NOTION_PROXY_RETRIES', 2)
+RETRY_BACKOFF_BASE = _env_float('NOTION_PROXY_BACKOFF_BASE', 0.05)
+RETRY_BACKOFF_CAP = _env_float('NOTION_PROXY_BACKOFF_CAP', 1.0)
+
+# Taille des blocs relayés entre le client et le serveur Node.js
+STREAM_CHUNK_SIZE = _env_int('NOTION_PROXY_CHUNK_SIZE', 64 * 1024)
+
+# Tailles maximales des corps relayés (0 = sans limite) : au-delà, 413 pour un corps
+# client et 502 pour une réponse de Node.js (taille transmise, avant décompression)
+MAX_REQUEST_BYTES = _env_int('NOTION_PROXY_MAX_REQUEST_BYTES', 50 * 1024 * 1024)
+MAX_RESPONSE_BYTES = _env_int('NOTION_PROXY_MAX_RESPONSE_BYTES', 100 * 1024 * 1024)
+
+# Timeouts spécifiques par préfixe de route (chemin relatif à /api/notion/)
+ROUTE_TIMEOUTS = {
+    'databases': (UPSTREAM_CONNECT_TIMEOUT, 60),
+    'ocr': (UPSTREAM_CONNECT_TIMEOUT, 120),
+}
+
+# Cache mémoire des GET (0 octet = cache désactivé)
+CACHE_MAX_BYTES = _env_int('NOTION_PROXY_CACHE_BYTES', 64 * 1024 * 1024)
+CACHE_MAX_ENTRY_BYTES = _env_int('NOTION_PROXY_CACHE_ENTRY_BYTES', 2 * 1024 * 1024)
+CACHE_DEFAULT_TTL = _env_float('NOTION_PROXY_CACHE_TTL', 5)
+# Second niveau sur disque (fichier SQLite partagé par les workers, conservé entre
+# deux démarrages). Chaîne vide = désactivé
+CACHE_DISK_PATH = os.environ.get('NOTION_PROXY_CACHE_DISK', '')
+CACHE_DISK_MAX_BYTES = _env_int('NOTION_PROXY_CACHE_DISK_BYTES', 256 * 1024 * 1024)
+
+# TTL en secondes par préfixe de route (0 = jamais en cache)
+CACHE_TTLS = {
+    'databases': 10,
+    'pages': 5,
+    'users': 300,
+    'ocr': 0,
+}
+
+# Taille maximale d'une réponse partagée entre GET identiques concurrents
+SINGLE_FLIGHT_MAX_BYTES = _env_int('NOTION_PROXY_SINGLE_FLIGHT_BYTES', 2 * 1024 * 1024)
+
+# Limitation du débit sortant vers Notion (0 requête/s = désactivée)
+# Seau global partagé et un seau par jeton Authorization (Notion : ~3 requêtes/s par intégration)
+RATE_LIMIT_GLOBAL_RPS = _env_float('NOTION_PROXY_RATE_GLOBAL', 15)
+RATE_LIMIT_GLOBAL_BURST = _env_float('NOTION_PROXY_RATE_GLOBAL_BURST', 30)
+RATE_LIMIT_KEY_RPS = _env_float('NOTION_PROXY_RATE_PER_TOKEN', 3)
+RATE_LIMIT_KEY_BURST = _env_float('NOTION_PROXY_RATE_PER_TOKEN_BURST', 10)
+# File d'attente bornée : au-delà, ou après l'attente maximale, le proxy répond 429
+RATE_LIMIT_MAX_QUEUE = _env_int('NOTION_PROXY_RATE_QUEUE', 200)
+RATE_LIMIT_MAX_WAIT = _env_float('NOTION_PROXY_RATE_MAX_WAIT', 20)
+# En-tête de priorité : 'interactive' (défaut, interface) passe avant 'bulk' (lots OCR, tâches de fond)
+PRIORITY_HEADER = 'X-Notion-Priority'
+
+# Compression des réponses (gzip, brotli si le module est installé)
+# Seuil en octets sous lequel le corps part en clair (0 = compression désactivée)
+COMPRESSION_MIN_BYTES = _env_int('NOTION_PROXY_COMPRESS_MIN_BYTES', 1024)
+COMPRESSION_LEVEL = _env_int('NOTION_PROXY_GZIP_LEVEL', 6)
+BROTLI_QUALITY = _env_int('NOTION_PROXY_BROTLI_QUALITY', 4)
+
+# POST /api/notion/_batch : nombre maximal de sous-requêtes et exécutions simultanées
+BATCH_MAX_ITEMS = _env_int('NOTION_PROXY_BATCH_MAX_ITEMS', 100)
+BATCH_CONCURRENCY = _env_int('NOTION_PROXY_BATCH_CONCURRENCY', 8)
+
+# Serveur de production pré-fork (gunicorn, voir serve.py et gunicorn.conf.py)
+PROXY_HOST = os.environ.get('NOTION_PROXY_HOST', '0.0.0.0')
+SERVER_WORKERS = _env_int('NOTION_PROXY_WORKERS', os.cpu_count() or 1)
+SERVER_THREADS = _env_int('NOTION_PROXY_THREADS', 8)
+# Connexions clientes gardées ouvertes par worker et durée d'inactivité tolérée
+SERVER_WORKER_CONNECTIONS = _env_int('NOTION_PROXY_WORKER_CONNECTIONS', 1000)
+SERVER_KEEPALIVE = _env_int('NOTION_PROXY_KEEPALIVE', 5)
+# Au-delà du plus long timeout de lecture amont (routes OCR : 120 s)
+SERVER_TIMEOUT = _env_int('NOTION_PROXY_WORKER_TIMEOUT', 130)
+# Délai laissé aux requêtes en cours lors d'un redémarrage gracieux (HUP) ou d'un arrêt (TERM)
+SERVER_GRACEFUL_TIMEOUT = _env_int('NOTION_PROXY_GRACEFUL_TIMEOUT', 130)
+# Recyclage des workers après N requêtes (0 = jamais)
+SERVER_MAX_REQUESTS = _env_int('NOTION_PROXY_MAX_REQUESTS', 0)
+SERVER_BACKLOG = _env_int('NOTION_PROXY_BACKLOG', 2048)
+
+# Écritures différées : avec un spool configuré, une mutation envoyée avec
+# « Prefer: respond-async » est enregistrée sur disque et acquittée en 202
+# (suivi : GET /api/notion/_jobs/<id>). Chaîne vide = désactivé
+WRITE_SPOOL_PATH = os.environ.get('NOTION_PROXY_WRITE_SPOOL', '')
+WRITE_SPOOL_WORKERS = _env_int('NOTION_PROXY_WRITE_SPOOL_WORKERS', 2)
+WRITE_SPOOL_MAX_ATTEMPTS = _env_int('NOTION_PROXY_WRITE_SPOOL_ATTEMPTS', 8)
+# Corps plus gros (uploads OCR) ou de longueur inconnue : toujours relayés en direct
+WRITE_SPOOL_MAX_BODY_BYTES = _env_int('NOTION_PROXY_WRITE_SPOOL_MAX_BODY', 1024 * 1024)
+# Une écriture en cours depuis plus longtemps (processus arrêté pendant l'envoi) est reprise :
+# au-delà du plus long timeout de lecture amont (routes OCR : 120 s)
+WRITE_SPOOL_LEASE = _env_float('NOTION_PROXY_WRITE_SPOOL_LEASE', 180)
+# Conservation des écritures terminées, consultables sur /_jobs/<id>
+WRITE_SPOOL_RETENTION = _env_float('NOTION_PROXY_WRITE_SPOOL_RETENTION', 86400)
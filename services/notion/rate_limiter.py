@@ -0,0 +1,227 @@
+"""
+Limitation du débit sortant vers Notion (via le serveur Node.js)
+Seau à jetons global et par jeton Authorization, file d'attente bornée où
+les requêtes interactives passent avant les traitements de masse
+"""
+
+import time
+import heapq
+import itertools
+import threading
+
+INTERACTIVE = 0
+BULK = 1
+PRIORITY_NAMES = {INTERACTIVE: 'interactive', BULK: 'bulk'}
+
+
+def request_priority(value):
+    """Priorité demandée par le client : les lots et tâches de fond passent après l'interface"""
+    value = (value or '').strip().lower()
+    return BULK if value in ('bulk', 'background', 'batch') else INTERACTIVE
+
+
+def retry_after_seconds(headers, default=1.0):
+    """Valeur de Retry-After (en secondes) d'une réponse 429 du serveur Node.js"""
+    try:
+        return max(0.0, float(headers.get('Retry-After', default)))
+    except ValueError:
+        return default
+
+
+class RateLimitExceeded(Exception):
+    """File pleine ou attente trop longue : la requête est refusée localement"""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Seau à jetons (non thread-safe : protégé par le verrou du limiteur)"""
+
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self):
+        """Secondes avant qu'un jeton soit disponible (après refill)"""
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+
+class _Waiter:
+    __slots__ = ('key', 'priority', 'event', 'granted')
+
+    def __init__(self, key, priority):
+        self.key = key
+        self.priority = priority
+        self.event = threading.Event()
+        self.granted = False
+
+
+class RateLimiter:
+    """Limiteur à deux niveaux (global et par clé) avec file prioritaire bornée
+
+    Un débit nul (global ou par clé) désactive la limitation
+    """
+
+    def __init__(self, global_rate=15, global_burst=30, key_rate=3, key_burst=10,
+                 max_queue=200, max_wait=20, max_keys=1024):
+        now = time.monotonic()
+        self.global_bucket = TokenBucket(global_rate, global_burst, now)
+        self.key_rate = key_rate
+        self.key_burst = key_burst
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.max_keys = max_keys
+        self.enabled = global_rate > 0 and key_rate > 0
+
+        self._buckets = {}
+        self._queue = []
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+
+        self.granted = 0
+        self.delayed = 0
+        self.rejected = 0
+        self.upstream_throttled = 0
+
+    def _bucket(self, key, now):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                # Les seaux pleins n'ont plus d'historique utile
+                for stale in [k for k, b in self._buckets.items() if b.tokens >= b.burst]:
+                    del self._buckets[stale]
+            bucket = self._buckets[key] = TokenBucket(self.key_rate, self.key_burst, now)
+        bucket.refill(now)
+        return bucket
+
+    def _take(self, key, now):
+        """Prend un jeton global et un jeton de la clé, seulement si les deux sont là (verrou détenu)"""
+        bucket = self._bucket(key, now)
+        if self.global_bucket.tokens >= 1 and bucket.tokens >= 1:
+            self.global_bucket.tokens -= 1
+            bucket.tokens -= 1
+            return True
+        return False
+
+    def _dispatch(self, now):
+        """Sert les requêtes en attente par ordre de priorité (verrou détenu)
+
+        Une requête bloquée par le seau de sa propre clé ne bloque pas les
+        suivantes ; une requête bloquée par le seau global arrête la distribution
+        """
+        self.global_bucket.refill(now)
+        skipped = []
+        while self._queue and self.global_bucket.tokens >= 1:
+            entry = heapq.heappop(self._queue)
+            waiter = entry[2]
+            if self._take(waiter.key, now):
+                waiter.granted = True
+                waiter.event.set()
+            else:
+                skipped.append(entry)
+        for entry in skipped:
+            heapq.heappush(self._queue, entry)
+
+    def try_acquire(self, key):
+        """Jeton immédiat s'il y en a un et que personne n'attend ; ne bloque jamais"""
+        if not self.enabled:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self.global_bucket.refill(now)
+            if not self._queue and self._take(key, now):
+                self.granted += 1
+                return True
+        return False
+
+    def acquire(self, key, priority=INTERACTIVE):
+        """Attend un jeton ; retourne la durée d'attente en secondes
+
+        Lève RateLimitExceeded si la file est pleine ou si l'attente dépasse max_wait
+        """
+        if not self.enabled:
+            return 0.0
+        started = time.monotonic()
+        with self._lock:
+            self.global_bucket.refill(started)
+            if not self._queue and self._take(key, started):
+                self.granted += 1
+                return 0.0
+            if len(self._queue) >= self.max_queue:
+                self.rejected += 1
+                raise RateLimitExceeded("File d'attente pleine", self._estimated_wait(key))
+            waiter = _Waiter(key, priority)
+            heapq.heappush(self._queue, (priority, next(self._sequence), waiter))
+            self.delayed += 1
+
+        deadline = started + self.max_wait
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._dispatch(now)
+                if waiter.granted:
+                    self.granted += 1
+                    return now - started
+                if now >= deadline:
+                    self._queue = [e for e in self._queue if e[2] is not waiter]
+                    heapq.heapify(self._queue)
+                    self.rejected += 1
+                    raise RateLimitExceeded("Attente maximale dépassée", self._estimated_wait(key))
+                pause = max(self.global_bucket.delay(), self._bucket(key, now).delay(), 0.001)
+            waiter.event.wait(min(pause, deadline - now))
+
+    def penalize(self, key, seconds):
+        """Le serveur a répondu 429 : la clé ne reçoit plus de jeton pendant seconds"""
+        if not self.enabled:
+            return
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._bucket(key, now)
+            bucket.tokens = min(bucket.tokens, 0) - seconds * bucket.rate
+            self.upstream_throttled += 1
+
+    def scale(self, factor):
+        """Réduit débits et rafales d'un facteur
+
+        Chaque worker pré-forké a ses propres seaux : avec N workers, chacun
+        prend 1/N de la limite pour que le total reste sous celle de Notion
+        """
+        with self._lock:
+            self.key_rate *= factor
+            self.key_burst = max(1, self.key_burst * factor)
+            for bucket in (self.global_bucket, *self._buckets.values()):
+                bucket.rate *= factor
+                bucket.burst = max(1, bucket.burst * factor)
+                bucket.tokens = min(bucket.tokens, bucket.burst)
+
+    def _estimated_wait(self, key):
+        """Estimation grossière pour Retry-After (verrou détenu)"""
+        now = time.monotonic()
+        backlog = len(self._queue) / max(self.global_bucket.rate, 0.001)
+        return max(backlog, self._bucket(key, now).delay())
+
+    def stats(self):
+        """Profondeur de file par priorité et compteurs"""
+        with self._lock:
+            depth = {name: 0 for name in PRIORITY_NAMES.values()}
+            for priority, _, _ in self._queue:
+                depth[PRIORITY_NAMES[priority]] += 1
+            return {
+                'enabled': self.enabled,
+                'queue_depth': depth,
+                'granted': self.granted,
+                'delayed': self.delayed,
+                'rejected': self.rejected,
+                'upstream_throttled': self.upstream_throttled,
+                'tracked_keys': len(self._buckets),
+            }
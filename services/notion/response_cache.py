@@ -0,0 +1,275 @@
+"""
+Cache mémoire des réponses GET du proxy Notion
+TTL par préfixe de chemin, éviction LRU bornée en octets, revalidation ETag
+et invalidation automatique lors des écritures sur la même ressource
+Un cache disque optionnel (disk_cache.DiskCache) sert de second niveau
+"""
+
+import time
+import threading
+from collections import OrderedDict
+
+from streaming import hold, release
+
+# En-têtes de requête dont la valeur entre dans la clé (Node.js peut les citer dans Vary)
+KEYED_REQUEST_HEADERS = ('notion-version',)
+
+# Vary satisfait par la clé : encodage servi, jeton et KEYED_REQUEST_HEADERS
+KEYED_VARY = frozenset(('accept-encoding', 'authorization') + KEYED_REQUEST_HEADERS)
+
+
+def resource_of(path):
+    """Ressource Notion visée par un chemin : 'pages/<id>/children' -> 'pages/<id>'"""
+    return '/'.join(path.strip('/').split('/', 2)[:2])
+
+
+def etag_matches(if_none_match, etag):
+    """Comparaison faible d'un en-tête If-None-Match avec l'ETag en cache"""
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    wanted = etag.removeprefix('W/')
+    return any(tag.strip().removeprefix('W/') == wanted for tag in if_none_match.split(','))
+
+
+def keyed_values(items):
+    """Valeurs des KEYED_REQUEST_HEADERS parmi des (nom, valeur) de requête, casse ignorée"""
+    found = {name.lower(): value for name, value in items}
+    return tuple(found.get(name) for name in KEYED_REQUEST_HEADERS)
+
+
+def storable(cache_control, vary):
+    """Réponse 200 que Node.js autorise à mettre en cache, et que la clé distingue
+
+    Refusée si Cache-Control l'interdit (no-store, private, no-cache, max-age=0)
+    ou si Vary cite un en-tête de requête absent de la clé
+    """
+    for directive in (cache_control or '').lower().split(','):
+        name, _, value = directive.strip().partition('=')
+        if name in ('no-store', 'private', 'no-cache'):
+            return False
+        if name in ('max-age', 's-maxage'):
+            try:
+                if int(value.strip().strip('"')) <= 0:
+                    return False
+            except ValueError:
+                return False
+    fields = {field.strip().lower() for field in (vary or '').split(',')} - {''}
+    return fields <= KEYED_VARY
+
+
+class CacheEntry:
+    """Réponse mise en cache"""
+
+    __slots__ = ('body', 'content_type', 'etag', 'expires_at', 'resource', 'size',
+                 'content_encoding', 'headers')
+
+    def __init__(self, body, content_type, etag, expires_at, resource, content_encoding=None,
+                 headers=()):
+        self.body = body
+        self.content_type = content_type
+        self.etag = etag
+        self.content_encoding = content_encoding
+        # Autres en-têtes de Node.js rejoués tels quels : ((nom, valeur), ...)
+        self.headers = headers
+        self.expires_at = expires_at
+        self.resource = resource
+        self.size = len(body)
+
+
+class ResponseCache:
+    """Cache LRU thread-safe borné par la taille totale des corps"""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_entry_bytes=2 * 1024 * 1024,
+                 default_ttl=5, prefix_ttls=None, disk=None):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = min(max_entry_bytes, max_bytes)
+        self.default_ttl = default_ttl
+        self._prefix_ttls = sorted(
+            (prefix_ttls or {}).items(), key=lambda item: len(item[0]), reverse=True
+        )
+
+        # Second niveau partagé entre workers et redémarrages (lectures bloquantes : proxy WSGI)
+        self.disk = disk
+
+        self._entries = OrderedDict()
+        self._by_resource = {}
+        self._generations = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def ttl_for(self, path):
+        """TTL en secondes du préfixe le plus spécifique (0 = jamais en cache)"""
+        for prefix, ttl in self._prefix_ttls:
+            if path.startswith(prefix):
+                return ttl
+        return self.default_ttl
+
+    @staticmethod
+    def make_key(path, query_items, authorization, encoding=None, keyed=()):
+        """Clé de cache : chemin, paramètres triés, jeton d'autorisation, encodage servi
+        et valeurs des KEYED_REQUEST_HEADERS (voir keyed_values)
+        """
+        return (path, tuple(sorted(query_items)), authorization, encoding, tuple(keyed))
+
+    def generation(self, path):
+        """Numéro d'écriture de la ressource, relevé avant l'appel au serveur Node.js
+
+        Une réponse lue avant une écriture concurrente n'est pas mise en cache
+        """
+        with self._lock:
+            return self._generations.get(resource_of(path), 0)
+
+    def lookup(self, key):
+        """Retourne (entrée, fraîche) ; une entrée expirée reste utilisable pour l'ETag
+
+        Hors de la mémoire ou expirée, l'entrée est cherchée sur disque (écrite par
+        un autre worker ou avant un redémarrage) puis remontée en mémoire
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                if entry.expires_at > time.monotonic():
+                    self.hits += 1
+                    return entry, True
+                self.misses += 1
+            if self.disk is None:
+                return entry, False
+            generation = self._generations.get(resource_of(key[0]), 0)
+
+        found = self.disk.get(key)
+        if found is None:
+            return entry, False
+        body, content_type, etag, content_encoding, headers, expires_at = found
+        # Expiration en temps réel sur disque, monotone en mémoire
+        entry = CacheEntry(body, content_type, etag, time.monotonic() + expires_at - time.time(),
+                           resource_of(key[0]), content_encoding, headers)
+        with self._lock:
+            # Écriture de la ressource pendant la lecture du disque : entrée servie, pas remontée
+            if (self._generations.get(entry.resource, 0) == generation
+                    and entry.size <= self.max_entry_bytes):
+                self._insert(key, entry)
+        return entry, entry.expires_at > time.monotonic()
+
+    def refresh(self, key, path):
+        """Prolonge une entrée après un 304 Not Modified du serveur Node.js"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.expires_at = time.monotonic() + self.ttl_for(path)
+                self.revalidations += 1
+        if entry is not None and self.disk is not None:
+            self.disk.touch(key, time.time() + self.ttl_for(path))
+        return entry
+
+    def store(self, key, path, generation, body, content_type, etag, content_encoding=None,
+              headers=()):
+        """Ajoute une réponse puis évince les moins récemment utilisées"""
+        ttl = self.ttl_for(path)
+        if ttl <= 0 or len(body) > self.max_entry_bytes:
+            return
+
+        entry = CacheEntry(body, content_type, etag, time.monotonic() + ttl, resource_of(path),
+                           content_encoding, headers)
+        with self._lock:
+            if self._generations.get(entry.resource, 0) != generation:
+                return
+            self._insert(key, entry)
+        if self.disk is not None:
+            # Une invalidation venue d'un autre worker entre-temps laisse au plus une
+            # entrée périmée jusqu'à son TTL, comme dans son cache mémoire
+            self.disk.put(key, entry.resource, body, content_type, etag, content_encoding,
+                          headers, time.time() + ttl)
+
+    def _insert(self, key, entry):
+        """Ajoute une entrée puis évince les moins récemment utilisées (verrou déjà détenu)"""
+        self._remove(key)
+        self._entries[key] = entry
+        self._by_resource.setdefault(entry.resource, set()).add(key)
+        self._bytes += entry.size
+
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def capture(self, key, path, generation, chunks, content_type, etag, content_encoding=None,
+                headers=()):
+        """Relaie un flux de blocs et le met en cache s'il tient dans une entrée"""
+        buffer = []
+        size = 0
+        complete = False
+        try:
+            for chunk in chunks:
+                if buffer is not None:
+                    size += len(chunk)
+                    if size <= self.max_entry_bytes:
+                        buffer.append(chunk)
+                    else:
+                        buffer = None  # Trop gros : on relaie sans mettre en cache
+                yield chunk
+            complete = True
+        finally:
+            if complete and buffer is not None:
+                # Les blocs sont déjà comptés par le lecteur du préfixe : seule la copie l'est ici
+                hold(size)
+                self.store(key, path, generation, b''.join(buffer), content_type, etag,
+                           content_encoding, headers)
+                release(size)
+
+    def invalidate(self, path):
+        """Supprime toutes les entrées de la ressource modifiée"""
+        resource = resource_of(path)
+        with self._lock:
+            self._generations[resource] = self._generations.get(resource, 0) + 1
+            keys = self._by_resource.pop(resource, ())
+            for key in keys:
+                entry = self._entries.pop(key, None)
+                if entry is not None:
+                    self._bytes -= entry.size
+                    self.invalidations += 1
+        if self.disk is not None:
+            self.disk.invalidate(resource)
+
+    def _remove(self, key):
+        """Retire une entrée (verrou déjà détenu)"""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= entry.size
+        keys = self._by_resource.get(entry.resource)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_resource[entry.resource]
+
+    def stats(self):
+        """Compteurs exposés sur /health"""
+        # Lu hors du verrou : requêtes SQLite
+        disk = self.disk.stats() if self.disk is not None else None
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'revalidations': self.revalidations,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'disk': disk,
+            }
@@ -0,0 +1,54 @@
+"""
+Point d'entrée de production du proxy Notion
+Traduit les options de ligne de commande en variables d'environnement puis
+remplace le processus par un maître gunicorn (signaux HUP/TERM reçus directement)
+
+Dépendance : pip install gunicorn
+Lancement : python serve.py --workers 4 --threads 8 --port 5000 \
+                --node-url http://localhost:3000,http://localhost:3001
+"""
+
+import os
+import sys
+import argparse
+
+PROXY_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Option -> variable lue par proxy_config.py
+OPTIONS = {
+    'host': 'NOTION_PROXY_HOST',
+    'port': 'NOTION_PROXY_PORT',
+    'node_url': 'NODE_SERVER_URLS',
+    'workers': 'NOTION_PROXY_WORKERS',
+    'threads': 'NOTION_PROXY_THREADS',
+    'keepalive': 'NOTION_PROXY_KEEPALIVE',
+    'graceful_timeout': 'NOTION_PROXY_GRACEFUL_TIMEOUT',
+    'max_requests': 'NOTION_PROXY_MAX_REQUESTS',
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Proxy Notion en production (gunicorn pré-fork)")
+    parser.add_argument('--host', help="Adresse d'écoute (défaut 0.0.0.0)")
+    parser.add_argument('--port', type=int, help="Port d'écoute (défaut 5000)")
+    parser.add_argument('--node-url', help="Serveur(s) Node.js, séparés par des virgules")
+    parser.add_argument('--workers', type=int, help="Processus (défaut : nombre de cœurs)")
+    parser.add_argument('--threads', type=int, help="Threads par processus (défaut 8)")
+    parser.add_argument('--keepalive', type=int, help="Keep-alive client en secondes (défaut 5)")
+    parser.add_argument('--graceful-timeout', type=int,
+                        help="Secondes laissées aux requêtes en cours au redémarrage (défaut 130)")
+    parser.add_argument('--max-requests', type=int, help="Recyclage des workers (0 = jamais)")
+    args = parser.parse_args()
+
+    for option, variable in OPTIONS.items():
+        value = getattr(args, option)
+        if value is not None:
+            os.environ[variable] = str(value)
+
+    os.chdir(PROXY_DIR)
+    os.execvp(sys.executable, [sys.executable, '-m', 'gunicorn',
+                               '-c', 'gunicorn.conf.py', 'notion_proxy:app'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Regroupement des appels identiques concurrents (single-flight)
+Le premier appelant interroge le serveur Node.js, les suivants attendent
+son résultat au lieu d'envoyer la même requête une nouvelle fois
+"""
+
+import threading
+
+
+class _Call:
+    """Appel en cours partagé par plusieurs requêtes"""
+
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """Regroupe les appels concurrents portant la même clé"""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key, fn, shareable=None):
+        """Exécute fn une seule fois pour tous les appelants concurrents de key
+
+        Retourne (valeur, partagée). Si shareable(valeur) est faux, les
+        appelants en attente exécutent fn eux-mêmes
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+
+        if leader:
+            try:
+                call.value = fn()
+                return call.value, False
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        if shareable is not None and not shareable(call.value):
+            return fn(), False
+
+        with self._lock:
+            self.coalesced += 1
+        return call.value, True
+
+    def stats(self):
+        """Compteurs exposés sur /health"""
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'leaders': self.leaders,
+                'coalesced': self.coalesced,
+            }
@@ -0,0 +1,180 @@
+"""
+Relais par blocs des corps de requête et de réponse
+Le proxy ne garde jamais un corps complet en mémoire : la mémoire reste
+constante quelle que soit la taille des uploads OCR ou des pages Notion
+"""
+
+import threading
+from contextvars import ContextVar
+
+
+class BodyTooLarge(Exception):
+    """Corps amont au-delà de la taille maximale relayée"""
+
+    def __init__(self, limit, size):
+        super().__init__(f"{size} octets, maximum {limit}")
+        self.limit = limit
+        self.size = size
+
+
+def check_length(content_length, limit):
+    """Rejet immédiat d'un corps dont la longueur annoncée dépasse limit (0 = sans limite)"""
+    if limit and content_length is not None and int(content_length) > limit:
+        raise BodyTooLarge(limit, int(content_length))
+
+
+class BufferMeter:
+    """Octets de corps gardés en mémoire par le proxy pour une requête
+
+    Seuls les tampons comptent (préfixes lus d'avance, capture pour le cache,
+    sous-réponses de /_batch) : un corps relayé bloc par bloc reste à zéro.
+    Un bloc référencé par deux tampons n'est compté qu'une fois
+    """
+
+    def __init__(self):
+        self.current = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def hold(self, size):
+        with self._lock:
+            self.current += size
+            if self.current > self.peak:
+                self.peak = self.current
+
+    def release(self, size):
+        with self._lock:
+            self.current -= size
+
+
+# Compteur de la requête en cours (un contexte par thread ou tâche asyncio)
+current_meter = ContextVar('notion_proxy_buffer_meter', default=None)
+
+
+def hold(size):
+    meter = current_meter.get()
+    if meter is not None:
+        meter.hold(size)
+
+
+def release(size):
+    meter = current_meter.get()
+    if meter is not None:
+        meter.release(size)
+
+
+class BufferStats:
+    """Maximum de mémoire tampon par requête, agrégé pour /health"""
+
+    def __init__(self):
+        self.requests = 0
+        self.total = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def record(self, meter):
+        with self._lock:
+            self.requests += 1
+            self.total += meter.peak
+            if meter.peak > self.peak:
+                self.peak = meter.peak
+
+    def stats(self):
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'peak_bytes': self.peak,
+                'mean_peak_bytes': round(self.total / self.requests) if self.requests else 0,
+            }
+
+
+def _readinto(stream, view):
+    readinto = getattr(stream, 'readinto', None)
+    if readinto is not None:
+        return readinto(view) or 0
+    data = stream.read(len(view))
+    view[:len(data)] = data
+    return len(data)
+
+
+class RequestBodyStream:
+    """Corps entrant lu par blocs, avec la longueur annoncée par le client
+
+    requests détecte __len__ et envoie un Content-Length au lieu de
+    basculer en Transfer-Encoding: chunked. Les blocs sont lus dans un tampon
+    alloué une fois par requête : read() retourne une vue valable jusqu'à
+    l'appel suivant, ce qui suffit à urllib3 qui l'envoie aussitôt
+    """
+
+    def __init__(self, stream, length, chunk_size):
+        self._stream = stream
+        self._length = length
+        self._buffer = memoryview(bytearray(chunk_size))
+        hold(chunk_size)
+
+    def __len__(self):
+        return self._length
+
+    def read(self, size=-1):
+        view = self._buffer if size is None or size < 0 else self._buffer[:size]
+        return view[:_readinto(self._stream, view)]
+
+
+def _iter_request(stream, chunk_size):
+    buffer = memoryview(bytearray(chunk_size))
+    hold(chunk_size)
+    while True:
+        size = _readinto(stream, buffer)
+        if not size:
+            return
+        yield buffer[:size]
+
+
+def request_body(stream, content_length, chunk_size):
+    """Corps à transmettre en amont sans le charger en mémoire"""
+    if content_length:
+        return RequestBodyStream(stream, content_length, chunk_size)
+    # Longueur inconnue : générateur envoyé en Transfer-Encoding: chunked
+    return _iter_request(stream, chunk_size)
+
+
+def iter_upstream(response, chunk_size, limit=0):
+    """Relaie la réponse amont par blocs puis rend la connexion au pool
+
+    Le corps garde son Content-Encoding : un corps compressé par le serveur
+    Node.js n'est pas décompressé au passage. Au-delà de limit octets reçus
+    (0 = sans limite), BodyTooLarge interrompt le relais
+    """
+    size = 0
+    try:
+        for chunk in response.raw.stream(chunk_size, decode_content=False):
+            if chunk:
+                size += len(chunk)
+                if limit and size > limit:
+                    raise BodyTooLarge(limit, size)
+                yield chunk
+    finally:
+        response.close()
+
+
+def read_prefix(chunks, limit):
+    """Lit au plus limit octets d'un flux
+
+    Retourne (corps, None) si le flux est épuisé, sinon (début, suite du flux)
+    """
+    buffer = []
+    size = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        size += len(chunk)
+        hold(len(chunk))
+        if size > limit:
+            return b''.join(buffer), chunks
+    return b''.join(buffer), None
+
+
+def chain_prefix(prefix, rest):
+    """Relaie un début déjà lu puis la suite du flux"""
+    yield prefix
+    release(len(prefix))
+    yield from rest
@@ -0,0 +1,255 @@
+"""
+Client HTTP partagé vers le ou les serveurs Node.js
+Réutilise des connexions keep-alive via un pool commun à tous les threads
+"""
+
+import time
+import random
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from balancer import LoadBalancer
+
+# Méthodes rejouables sans effet de bord supplémentaire
+IDEMPOTENT_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'))
+# Méthodes qui modifient une ressource : invalident le cache, seules différables
+WRITE_METHODS = frozenset(('POST', 'PATCH', 'PUT', 'DELETE'))
+# Réponses du serveur Node.js traitées comme une indisponibilité passagère
+RETRY_STATUSES = frozenset((502, 503, 504))
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Appel refusé sans contacter le serveur Node.js : disjoncteur ouvert"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Disjoncteur ouvert, nouvel essai dans {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+def sort_route_timeouts(route_timeouts):
+    """Trie les préfixes du plus long au plus court : le plus spécifique gagne"""
+    return sorted((route_timeouts or {}).items(), key=lambda item: len(item[0]), reverse=True)
+
+
+def match_route_timeout(sorted_timeouts, path, default):
+    """Timeout (connexion, lecture) du premier préfixe correspondant à path"""
+    for prefix, timeout in sorted_timeouts:
+        if path.startswith(prefix):
+            return timeout
+    return default
+
+
+def _timed_pool_classes(on_connect):
+    """Classes de pool urllib3 dont les connexions mesurent leur établissement TCP/TLS
+
+    Seules les nouvelles connexions sont mesurées : une connexion keep-alive
+    réutilisée ne coûte rien
+    """
+    def timed(connection_cls):
+        def connect(self):
+            started = time.perf_counter()
+            connection_cls.connect(self)
+            on_connect(time.perf_counter() - started)
+        return type(f'Timed{connection_cls.__name__}', (connection_cls,), {'connect': connect})
+
+    return {
+        'http': type('TimedHTTPConnectionPool', (HTTPConnectionPool,),
+                     {'ConnectionCls': timed(HTTPConnection)}),
+        'https': type('TimedHTTPSConnectionPool', (HTTPSConnectionPool,),
+                      {'ConnectionCls': timed(HTTPSConnection)}),
+    }
+
+
+class UpstreamClient:
+    """Client thread-safe avec pool de connexions et timeouts par route"""
+
+    def __init__(self, urls, pool_size=32, pool_block=False,
+                 default_timeout=(3.05, 30), route_timeouts=None,
+                 breaker=None, retries=0, backoff_base=0.05, backoff_cap=1.0,
+                 balancer=None, on_connect=None, on_response=None):
+        if isinstance(urls, str):
+            urls = [urls]
+        self.balancer = balancer or LoadBalancer(urls)
+        self.pool_size = pool_size
+        self.default_timeout = default_timeout
+        self._route_timeouts = sort_route_timeouts(route_timeouts)
+
+        self.breaker = breaker
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+
+        # Un seul adaptateur (un pool urllib3 par serveur) partagé par toutes les sessions
+        self._adapter = HTTPAdapter(
+            pool_connections=max(4, len(urls)),
+            pool_maxsize=pool_size,
+            pool_block=pool_block,
+            max_retries=0
+        )
+        if on_connect is not None:
+            self._adapter.poolmanager.pool_classes_by_scheme = _timed_pool_classes(on_connect)
+        # Rappel (url du serveur, secondes jusqu'aux en-têtes) pour les métriques
+        self._on_response = on_response
+        # Une session par thread : l'état de Session (cookies...) n'est pas thread-safe
+        self._local = threading.local()
+
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._errors = 0
+        self._retried = 0
+        self._in_flight = 0
+
+    def _session(self):
+        """Retourne la session du thread courant"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.mount('http://', self._adapter)
+            session.mount('https://', self._adapter)
+            self._local.session = session
+        return session
+
+    def after_fork(self):
+        """Repart sans les connexions du processus parent (worker pré-forké)
+
+        Un socket hérité serait partagé entre plusieurs workers
+        """
+        self._adapter.poolmanager.clear()
+        self._local = threading.local()
+
+    def timeout_for(self, path):
+        """Timeout (connexion, lecture) applicable à un chemin /api/notion/<path>"""
+        return match_route_timeout(self._route_timeouts, path, self.default_timeout)
+
+    def backoff(self, attempt):
+        """Attente avant la tentative suivante : exponentielle avec gigue complète"""
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+
+    def request(self, method, path, timeout=None, route=None, guarded=True, **kwargs):
+        """Envoie une requête vers base_url + path via le pool partagé
+
+        Avec guarded, l'appel passe par le disjoncteur et les méthodes
+        idempotentes sans corps en flux sont rejouées sur erreur passagère
+        """
+        if timeout is None:
+            timeout = self.timeout_for(route if route is not None else path)
+        if not guarded:
+            return self._send(method, path, timeout, **kwargs)
+
+        breaker = self.breaker
+        attempts = 1
+        if method in IDEMPOTENT_METHODS and kwargs.get('data') is None:
+            attempts += self.retries
+
+        for attempt in range(attempts):
+            if attempt:
+                with self._lock:
+                    self._retried += 1
+                time.sleep(self.backoff(attempt - 1))
+            if breaker is not None and not breaker.allow():
+                raise CircuitOpenError(breaker.retry_after())
+
+            try:
+                response = self._send(method, path, timeout, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if breaker is not None:
+                    breaker.record_failure()
+                if attempt + 1 < attempts:
+                    continue
+                raise
+
+            if response.status_code not in RETRY_STATUSES:
+                if breaker is not None:
+                    breaker.record_success()
+                return response
+            if breaker is not None:
+                breaker.record_failure()
+            if attempt + 1 == attempts:
+                return response
+            response.close()
+
+    def _send(self, method, path, timeout, backend=None, **kwargs):
+        """Un seul aller-retour HTTP vers le serveur choisi par le répartiteur
+
+        La latence mesurée va jusqu'aux en-têtes : c'est elle qui révèle un nœud lent
+        """
+        probing = backend is not None
+        backend = self.balancer.acquire(backend)
+        with self._lock:
+            self._requests += 1
+            self._in_flight += 1
+        started = time.perf_counter()
+        ok = local_error = False
+        try:
+            response = self._session().request(
+                method, f"{backend.url}{path}", timeout=timeout, **kwargs
+            )
+            ok = response.status_code not in RETRY_STATUSES
+            return response
+        except requests.exceptions.RequestException:
+            with self._lock:
+                self._errors += 1
+            raise
+        except Exception:
+            # Erreur locale (corps client trop gros ou illisible) : rien à reprocher au serveur
+            ok = local_error = True
+            raise
+        finally:
+            latency = None if probing or local_error else time.perf_counter() - started
+            self.balancer.release(backend, latency, ok)
+            if latency is not None and self._on_response is not None:
+                self._on_response(backend.url, latency)
+            with self._lock:
+                self._in_flight -= 1
+
+    def probe(self, path, timeout):
+        """Sonde active de chaque serveur : met à jour sa santé et retourne un statut
+
+        Lève ConnectionError si aucun serveur ne répond correctement
+        """
+        status = None
+        for backend in self.balancer.backends:
+            try:
+                response = self._send('GET', path, timeout, backend=backend)
+                ok = response.ok
+                if ok and status is None:
+                    status = response.json()
+            except (requests.exceptions.RequestException, ValueError):
+                ok = False
+            self.balancer.mark(backend, ok)
+
+        if status is None:
+            raise requests.exceptions.ConnectionError("Aucun serveur Node.js disponible")
+        return status
+
+    def stats(self):
+        """Statistiques du pool pour /health"""
+        pools = []
+        manager = self._adapter.poolmanager
+        for key in list(manager.pools.keys()):
+            pool = manager.pools.get(key)
+            if pool is None:
+                continue
+            pools.append({
+                'host': f"{pool.scheme}://{pool.host}:{pool.port}",
+                'connections_opened': pool.num_connections,
+                'requests_sent': pool.num_requests,
+                # La file est pré-remplie de None : seules les vraies connexions sont au repos
+                'idle_connections': sum(1 for conn in list(pool.pool.queue) if conn)
+                if pool.pool else 0,
+                'max_size': pool.pool.maxsize if pool.pool else self.pool_size,
+            })
+
+        with self._lock:
+            return {
+                'pool_size': self.pool_size,
+                'requests': self._requests,
+                'errors': self._errors,
+                'retried': self._retried,
+                'in_flight': self._in_flight,
+                'pools': pools,
+                'upstreams': self.balancer.stats(),
+            }
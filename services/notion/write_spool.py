@@ -0,0 +1,270 @@
+"""
+Écritures Notion différées (write-behind) via un spool SQLite durable
+Une mutation acceptée est enregistrée sur disque puis acquittée aussitôt ;
+des threads de fond la rejouent vers Node.js, dans l'ordre pour une même
+ressource, avec nouvelles tentatives. Livraison « au moins une fois » : une
+écriture dont la réponse s'est perdue peut être rejouée
+
+Le fichier contient les en-têtes Authorization des écritures en attente :
+il est créé en lecture/écriture pour son seul propriétaire
+"""
+
+import os
+import json
+import time
+import uuid
+import random
+import sqlite3
+import threading
+
+from response_cache import resource_of
+from upstream import RETRY_STATUSES as UPSTREAM_RETRY_STATUSES
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+# Réponses de Node.js qui valent une nouvelle tentative : indisponibilité passagère
+# (502, 503, 504 comme upstream.py), limite de débit, erreur interne, et 409 (conflit
+# de transaction Notion)
+RETRY_STATUSES = UPSTREAM_RETRY_STATUSES | {409, 429, 500}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    resource TEXT NOT NULL,
+    method TEXT NOT NULL,
+    path TEXT NOT NULL,
+    query TEXT NOT NULL,
+    headers TEXT NOT NULL,
+    body BLOB,
+    request_id TEXT,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL,
+    lease_until REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    response_status INTEGER,
+    response_type TEXT,
+    response_body BLOB,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_pending ON jobs (resource, seq) WHERE state IN ('queued', 'running');
+CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (updated_at) WHERE state IN ('done', 'failed');
+"""
+
+# Prochaine écriture exécutable : la plus ancienne non terminée de sa ressource,
+# en attente ou dont le bail a expiré (processus mort pendant l'envoi)
+CLAIM_QUERY = """
+SELECT seq, id, method, path, query, headers, body, attempts FROM jobs AS j
+WHERE ((j.state = 'queued' AND j.next_attempt <= :now)
+       OR (j.state = 'running' AND j.lease_until <= :now))
+  AND NOT EXISTS (SELECT 1 FROM jobs AS p
+                  WHERE p.resource = j.resource AND p.seq < j.seq
+                    AND p.state IN ('queued', 'running'))
+ORDER BY j.seq
+LIMIT 1
+"""
+
+
+class WriteSpool:
+    """File durable des écritures différées et threads qui la vident
+
+    send(method, path, query, headers, body) envoie une écriture et retourne
+    (status, content-type, corps, Retry-After ou None) ; une exception vaut
+    échec passager
+    """
+
+    def __init__(self, path, send, workers=2, max_attempts=8, backoff_base=1.0, backoff_cap=60.0,
+                 lease_seconds=180.0, retention=86400.0, poll_interval=1.0,
+                 max_result_bytes=64 * 1024):
+        self.path = path
+        self._send = send
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.lease_seconds = lease_seconds
+        self.retention = retention
+        self.poll_interval = poll_interval
+        self.max_result_bytes = max_result_bytes
+
+        self._pid = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition()
+        self._local = threading.local()
+        self._pruned_at = 0.0
+
+        self._create()
+
+    def _create(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Fichier privé avant que SQLite ne l'ouvre
+        os.close(os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600))
+        connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        try:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.executescript(SCHEMA)
+        finally:
+            connection.close()
+
+    def _db(self):
+        """Connexion propre au thread et au processus (jamais héritée d'un fork)"""
+        pid = os.getpid()
+        if getattr(self._local, 'pid', None) != pid:
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.execute('PRAGMA synchronous=FULL')
+            self._local.connection = connection
+            self._local.pid = pid
+        return self._local.connection
+
+    def ensure_started(self):
+        """Démarre les threads une fois par processus (les threads ne survivent pas à fork)"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            for index in range(self.workers):
+                threading.Thread(target=self._run, name=f'notion-write-spool-{index}',
+                                 daemon=True).start()
+
+    def enqueue(self, method, path, query, headers, body, request_id=None):
+        """Enregistre une écriture (durable au retour) et retourne son identifiant"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._db().execute(
+            'INSERT INTO jobs (id, resource, method, path, query, headers, body, request_id, state,'
+            ' next_attempt, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (job_id, resource_of(path), method, path, json.dumps(query), json.dumps(headers), body,
+             request_id, QUEUED, now, now, now))
+        with self._wakeup:
+            self._wakeup.notify()
+        return job_id
+
+    def get(self, job_id):
+        """État d'une écriture pour /_jobs/<id> (None si inconnue ou purgée)"""
+        row = self._db().execute(
+            'SELECT id, method, path, headers, request_id, state, attempts, next_attempt,'
+            ' created_at, updated_at, response_status, response_type, response_body, error'
+            ' FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+        (job_id, method, path, headers, request_id, state, attempts, next_attempt,
+         created_at, updated_at, response_status, response_type, response_body, error) = row
+        return {
+            'job_id': job_id,
+            'status': state,
+            'method': method,
+            'path': path,
+            'authorization': json.loads(headers).get('Authorization'),
+            'request_id': request_id,
+            'attempts': attempts,
+            'created_at': created_at,
+            'updated_at': updated_at,
+            'next_attempt_at': next_attempt if state == QUEUED else None,
+            'response_status': response_status,
+            'response_type': response_type,
+            'response_body': response_body,
+            'error': error,
+        }
+
+    def _claim(self):
+        """Réserve la prochaine écriture exécutable, de façon atomique entre processus"""
+        db = self._db()
+        now = time.time()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            row = db.execute(CLAIM_QUERY, {'now': now}).fetchone()
+            if row is not None:
+                db.execute(
+                    'UPDATE jobs SET state = ?, attempts = attempts + 1, lease_until = ?,'
+                    ' updated_at = ? WHERE seq = ?',
+                    (RUNNING, now + self.lease_seconds, now, row[0]))
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        return row
+
+    def _finish(self, seq, state, status=None, content_type=None, body=None, error=None,
+                retry_at=None):
+        if body is not None and len(body) > self.max_result_bytes:
+            body = body[:self.max_result_bytes]
+        self._db().execute(
+            'UPDATE jobs SET state = ?, next_attempt = COALESCE(?, next_attempt), lease_until = NULL,'
+            ' updated_at = ?, response_status = ?, response_type = ?, response_body = ?, error = ?'
+            ' WHERE seq = ?',
+            (state, retry_at, time.time(), status, content_type, body, error, seq))
+
+    def backoff(self, attempts, retry_after=None):
+        """Délai avant la tentative suivante : exponentiel avec gigue, Retry-After respecté"""
+        delay = min(self.backoff_cap, self.backoff_base * 2 ** (attempts - 1))
+        delay = random.uniform(delay / 2, delay)
+        return max(delay, retry_after or 0)
+
+    def _process(self, row):
+        seq, _, method, path, query, headers, body, attempts = row
+        attempts += 1
+        try:
+            status, content_type, response_body, retry_after = self._send(
+                method, path, [tuple(pair) for pair in json.loads(query)], json.loads(headers), body)
+        except Exception as exc:
+            status, content_type, response_body = None, None, None
+            retry_after = getattr(exc, 'retry_after', None)
+            error = f"{type(exc).__name__}: {exc}"
+        else:
+            if status not in RETRY_STATUSES:
+                state = DONE if status < 400 else FAILED
+                self._finish(seq, state, status, content_type, response_body,
+                             None if state == DONE else f"HTTP {status}")
+                return
+            error = f"HTTP {status}"
+
+        if attempts >= self.max_attempts:
+            self._finish(seq, FAILED, status, content_type, response_body,
+                         f"{error} après {attempts} tentatives")
+        else:
+            self._finish(seq, QUEUED, status, content_type, response_body, error,
+                         retry_at=time.time() + self.backoff(attempts, retry_after))
+
+    def _prune(self):
+        """Oublie les écritures terminées depuis plus de retention secondes"""
+        now = time.time()
+        if now - self._pruned_at < 60:
+            return
+        self._pruned_at = now
+        self._db().execute("DELETE FROM jobs WHERE state IN ('done', 'failed') AND updated_at < ?",
+                           (now - self.retention,))
+
+    def _run(self):
+        while True:
+            try:
+                row = self._claim()
+                if row is not None:
+                    self._process(row)
+                    continue
+                self._prune()
+            except sqlite3.Error:
+                pass  # Base verrouillée trop longtemps : nouvel essai au prochain tour
+            with self._wakeup:
+                self._wakeup.wait(self.poll_interval)
+
+    def stats(self):
+        """Écritures par état et ancienneté de la plus vieille en attente, pour /health"""
+        db = self._db()
+        counts = dict.fromkeys((QUEUED, RUNNING, DONE, FAILED), 0)
+        counts.update(db.execute('SELECT state, COUNT(*) FROM jobs GROUP BY state').fetchall())
+        oldest = db.execute("SELECT MIN(created_at) FROM jobs WHERE state IN ('queued', 'running')"
+                            ).fetchone()[0]
+        return {
+            'workers': self.workers,
+            'jobs': counts,
+            'oldest_pending_seconds': None if oldest is None else round(time.time() - oldest, 3),
+        }
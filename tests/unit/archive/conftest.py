@@ -0,0 +1,5 @@
+import os
+import sys
+
+ARCHIVE_SCRIPTS = os.path.join(os.path.dirname(__file__), "..", "..", "..", "scripts", "archive")
+sys.path.insert(0, os.path.abspath(ARCHIVE_SCRIPTS))
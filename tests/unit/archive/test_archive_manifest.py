@@ -0,0 +1,85 @@
+"""
+Manifeste de l'archive : un doublon enregistré avant son original
+(catégories traitées dans un ordre quelconque) ne doit rien perdre
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from archive_manifest import ArchiveManifest, ARCHIVE_DIR, MANIFEST_PATH
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..",
+                      "scripts", "archive", "archive-md-files.py")
+
+def test_duplicate_before_original(tmp_path):
+    dest = f"{ARCHIVE_DIR}/context/CONTEXT_1.md"
+    (tmp_path / ARCHIVE_DIR / "context").mkdir(parents=True)
+    (tmp_path / dest).write_text("# Contexte\n")
+
+    manifest = ArchiveManifest()
+    manifest.record_duplicate("X_REPORT.md", "abc123")
+    manifest.record_move("CONTEXT_1.md", dest, "abc123", 11, root=str(tmp_path))
+
+    document = manifest.documents["abc123"]
+    assert document["paths"] == [dest]
+    assert document["aliases"] == ["X_REPORT.md"]
+    assert manifest.sources == {"X_REPORT.md": "abc123", "CONTEXT_1.md": "abc123"}
+    assert [blob for blob, _ in manifest.find("X_REPORT")] == ["abc123"]
+
+def test_duplicate_after_original(tmp_path):
+    manifest = ArchiveManifest()
+    manifest.record_move("A.md", f"{ARCHIVE_DIR}/reports/A.md", "abc123", 3, root=str(tmp_path))
+    manifest.record_duplicate("B.md", "abc123")
+    manifest.record_duplicate("B.md", "abc123")
+    assert manifest.documents["abc123"]["aliases"] == ["B.md"]
+
+def git(root, *args, **env):
+    subprocess.run(["git", *args], cwd=root, check=True, capture_output=True,
+                   env={**os.environ, **env})
+
+@pytest.fixture
+def repo(tmp_path):
+    git(tmp_path, "init", "-q", "-b", "main")
+    git(tmp_path, "config", "user.email", "test@example.com")
+    git(tmp_path, "config", "user.name", "Test")
+    # X_REPORT.md (reports) est traité avant CONTEXT_1.md (context), son original
+    (tmp_path / "CONTEXT_1.md").write_text("# Même contenu\n")
+    (tmp_path / "X_REPORT.md").write_text("# Même contenu\n")
+    (tmp_path / "AUDIT-1.md").write_text("# Audit\n")
+    git(tmp_path, "add", ".")
+    old = "2020-01-01T00:00:00"
+    git(tmp_path, "commit", "-q", "-m", "docs", GIT_AUTHOR_DATE=old, GIT_COMMITTER_DATE=old)
+    return tmp_path
+
+def test_archive_duplicate_of_later_category(repo):
+    result = subprocess.run([sys.executable, SCRIPT], cwd=repo, capture_output=True, text=True)
+    assert result.returncode == 0, result.stdout + result.stderr
+
+    manifest = ArchiveManifest.load(root=str(repo))
+    original = manifest.documents[manifest.sources["CONTEXT_1.md"]]
+    assert original["paths"] == [f"{ARCHIVE_DIR}/context/CONTEXT_1.md"]
+    assert original["aliases"] == ["X_REPORT.md"]
+    assert not (repo / "X_REPORT.md").exists()
+
+    tracked = subprocess.run(["git", "ls-tree", "-r", "--name-only", "HEAD"], cwd=repo,
+                             capture_output=True, text=True, check=True).stdout.split()
+    assert sorted(tracked) == sorted([f"{ARCHIVE_DIR}/context/CONTEXT_1.md",
+                                      f"{ARCHIVE_DIR}/reports/AUDIT-1.md", MANIFEST_PATH])
+
+def test_locally_modified_copy_is_moved_not_deleted(repo):
+    # Même blob dans l'index, mais une modification non indexée sur disque
+    (repo / "X_REPORT.md").write_text("# Même contenu\n\nNote locale\n")
+
+    result = subprocess.run([sys.executable, SCRIPT], cwd=repo, capture_output=True, text=True)
+    assert result.returncode == 0, result.stdout + result.stderr
+
+    moved = repo / ARCHIVE_DIR / "reports" / "X_REPORT.md"
+    assert moved.read_text() == "# Même contenu\n\nNote locale\n"
+    manifest = ArchiveManifest.load(root=str(repo))
+    assert manifest.documents[manifest.sources["CONTEXT_1.md"]]["aliases"] == []
+    status = subprocess.run(["git", "status", "--porcelain"], cwd=repo,
+                            capture_output=True, text=True, check=True).stdout
+    assert status == f" M {ARCHIVE_DIR}/reports/X_REPORT.md\n"
@@ -0,0 +1,5 @@
+import os
+import sys
+
+NOTION_SERVICE = os.path.join(os.path.dirname(__file__), "..", "..", "..", "services", "notion")
+sys.path.insert(0, os.path.abspath(NOTION_SERVICE))
@@ -0,0 +1,86 @@
+"""
+En-têtes relayés : hop-by-hop et jetons Connection retirés dans les deux sens
+"""
+
+from forwarding import (
+    REQUEST_ID_HEADER, forward_request_headers, forward_response_headers, cacheable_headers,
+    merge_vary, request_id
+)
+
+def test_request_drops_hop_by_hop_and_connection_tokens():
+    headers = forward_request_headers([
+        ("Connection", "keep-alive, X-Trace-Hop"),
+        ("Keep-Alive", "timeout=5"),
+        ("Transfer-Encoding", "chunked"),
+        ("TE", "trailers"),
+        ("Upgrade", "h2c"),
+        ("Proxy-Authorization", "Basic xyz"),
+        ("X-Trace-Hop", "1"),
+        ("Host", "proxy.local"),
+        ("Content-Length", "12"),
+        ("Accept-Encoding", "gzip"),
+        ("Cookie", "session=1"),
+        ("If-None-Match", '"v1"'),
+        ("authorization", "Bearer t"),
+        ("content-type", "application/json"),
+        ("Notion-Version", "2022-06-28"),
+    ], "10.0.0.2", "https", "proxy.local", "rid-1")
+
+    assert headers == {
+        "Authorization": "Bearer t",
+        "Content-Type": "application/json",
+        "Notion-Version": "2022-06-28",
+        "X-Forwarded-For": "10.0.0.2",
+        "X-Forwarded-Proto": "https",
+        "X-Forwarded-Host": "proxy.local",
+        REQUEST_ID_HEADER: "rid-1",
+    }
+
+def test_request_extends_forwarded_chain():
+    headers = forward_request_headers([
+        ("X-Forwarded-For", "203.0.113.7"),
+        ("X-Forwarded-Proto", "https"),
+        ("X-Forwarded-Host", "app.example.ch"),
+        ("X-Request-ID", "from-client"),
+    ], "10.0.0.2", "http", "proxy.local", "rid-1")
+
+    assert headers["X-Forwarded-For"] == "203.0.113.7, 10.0.0.2"
+    # Posés par le proxy frontal : conservés
+    assert headers["X-Forwarded-Proto"] == "https"
+    assert headers["X-Forwarded-Host"] == "app.example.ch"
+    assert headers[REQUEST_ID_HEADER] == "rid-1"
+
+def test_response_drops_hop_by_hop_and_keeps_repeated_values():
+    forwarded = forward_response_headers([
+        ("Connection", "close, X-Backend-Hop"),
+        ("Transfer-Encoding", "chunked"),
+        ("Keep-Alive", "timeout=5"),
+        ("X-Backend-Hop", "node-1"),
+        ("Content-Length", "10"),
+        ("Content-Encoding", "gzip"),
+        ("ETag", '"v1"'),
+        ("Access-Control-Allow-Origin", "*"),
+        ("Set-Cookie", "a=1"),
+        ("Set-Cookie", "b=2"),
+        ("Cache-Control", "private, max-age=5"),
+        ("X-RateLimit-Remaining", "2"),
+    ])
+
+    assert forwarded == [
+        ("Set-Cookie", "a=1"),
+        ("Set-Cookie", "b=2"),
+        ("Cache-Control", "private, max-age=5"),
+        ("X-RateLimit-Remaining", "2"),
+    ]
+    assert cacheable_headers(forwarded) == (("Cache-Control", "private, max-age=5"),)
+
+def test_merge_vary():
+    assert merge_vary(None) == "Accept-Encoding"
+    assert merge_vary("Authorization") == "Authorization, Accept-Encoding"
+    assert merge_vary("accept-encoding, Origin") == "accept-encoding, Origin"
+
+def test_request_id_rejects_unreasonable_values():
+    assert request_id("abc-123") == "abc-123"
+    for value in (None, "", "x" * 129, "é", "a\nb"):
+        generated = request_id(value)
+        assert generated != value and len(generated) == 32
@@ -0,0 +1,77 @@
+"""
+Métriques du proxy : labels de route bornés, requêtes en cours jamais perdues
+"""
+
+import io
+
+from metrics import MetricsRegistry, MetricsMiddleware
+
+PAGE_ID = "0123456789abcdef0123456789abcdef"
+
+def _environ(path="/api/notion/search", method="GET"):
+    return {"PATH_INFO": path, "REQUEST_METHOD": method, "wsgi.input": io.BytesIO()}
+
+def _app(chunks, closed=None):
+    class Body:
+        def __iter__(self):
+            return iter(chunks)
+
+        def close(self):
+            if closed is not None:
+                closed.append(True)
+
+    def app(environ, start_response):
+        start_response("200 OK", [])
+        return Body()
+    return app
+
+def test_route_template_replaces_ids():
+    registry = MetricsRegistry()
+    assert registry.route_template(f"pages/{PAGE_ID}") == "/pages/:id"
+    assert registry.route_template("blocks/42/children") == "/blocks/:id/children"
+
+def test_route_labels_are_capped():
+    registry = MetricsRegistry(max_routes=2)
+    assert registry.route_template("search") == "/search"
+    assert registry.route_template(f"pages/{PAGE_ID}") == "/pages/:id"
+    # Gabarits connus : toujours leur propre label
+    assert registry.route_template(f"pages/{PAGE_ID[::-1]}") == "/pages/:id"
+    # Au-delà de la limite : premier segment connu, sinon un label unique
+    assert registry.route_template(f"pages/{PAGE_ID}/properties/title") == "/pages/:other"
+    routes = {registry.route_template(f"random-{i}/x") for i in range(100)}
+    assert routes == {"/:other"}
+
+def test_unknown_methods_share_a_label():
+    registry = MetricsRegistry()
+    middleware = MetricsMiddleware(_app([b"ok"]), registry)
+    for method in ("GET", "BREW", "PROPFIND"):
+        body = middleware(_environ(method=method), lambda status, headers, exc_info=None: None)
+        list(body)
+        body.close()
+    assert sorted(key[0] for key in middleware.requests._values) == ["GET", "other"]
+
+def test_in_flight_released_when_closed_before_iteration():
+    registry = MetricsRegistry()
+    closed = []
+    middleware = MetricsMiddleware(_app([b"a", b"b"], closed), registry)
+
+    body = middleware(_environ(), lambda status, headers, exc_info=None: None)
+    assert middleware.in_flight._values[()] == 1
+    # Client parti avant le premier bloc : le serveur ferme sans itérer
+    body.close()
+    body.close()
+
+    assert middleware.in_flight._values[()] == 0
+    assert closed == [True]
+    assert middleware.requests._values == {("GET", "/search", "200"): 1}
+
+def test_sent_bytes_counted_on_close():
+    registry = MetricsRegistry()
+    middleware = MetricsMiddleware(_app([b"abc", b"de"]), registry)
+
+    body = middleware(_environ(), lambda status, headers, exc_info=None: None)
+    assert b"".join(body) == b"abcde"
+    body.close()
+
+    assert middleware.in_flight._values[()] == 0
+    assert middleware.bytes_out._values == {("/search",): 5}
@@ -0,0 +1,86 @@
+"""
+Limiteur de débit : file prioritaire, seaux par jeton et refus explicites
+"""
+
+import threading
+import time
+
+import pytest
+
+from rate_limiter import (
+    RateLimiter, RateLimitExceeded, INTERACTIVE, BULK, request_priority, retry_after_seconds
+)
+
+def wait_for_queue(limiter, depth):
+    deadline = time.monotonic() + 2
+    while sum(limiter.stats()["queue_depth"].values()) < depth:
+        assert time.monotonic() < deadline, "file d'attente jamais remplie"
+        time.sleep(0.001)
+
+def start_waiter(limiter, key, priority, granted):
+    thread = threading.Thread(target=lambda: (limiter.acquire(key, priority), granted.append(priority)))
+    thread.start()
+    return thread
+
+def test_interactive_served_before_earlier_bulk():
+    limiter = RateLimiter(global_rate=10, global_burst=1, key_rate=100, key_burst=10)
+    assert limiter.acquire("Bearer a") == 0.0
+
+    granted = []
+    threads = [start_waiter(limiter, "Bearer a", BULK, granted)]
+    wait_for_queue(limiter, 1)
+    threads.append(start_waiter(limiter, "Bearer b", BULK, granted))
+    wait_for_queue(limiter, 2)
+    # Arrivée en dernier, servie en premier
+    threads.append(start_waiter(limiter, "Bearer c", INTERACTIVE, granted))
+    wait_for_queue(limiter, 3)
+    assert limiter.stats()["queue_depth"] == {"interactive": 1, "bulk": 2}
+
+    for thread in threads:
+        thread.join(2)
+    assert granted == [INTERACTIVE, BULK, BULK]
+    assert limiter.stats()["delayed"] == 3
+
+def test_exhausted_key_does_not_block_other_keys():
+    limiter = RateLimiter(global_rate=1000, global_burst=100, key_rate=1, key_burst=1)
+    limiter.acquire("Bearer a")
+    assert not limiter.try_acquire("Bearer a")
+    assert limiter.try_acquire("Bearer b")
+
+def test_full_queue_is_refused():
+    limiter = RateLimiter(global_rate=1, global_burst=1, key_rate=100, key_burst=10, max_queue=0)
+    limiter.acquire("Bearer a")
+    with pytest.raises(RateLimitExceeded, match="File d'attente pleine"):
+        limiter.acquire("Bearer a")
+    assert limiter.stats()["rejected"] == 1
+
+def test_wait_is_bounded():
+    limiter = RateLimiter(global_rate=0.5, global_burst=1, key_rate=100, key_burst=10, max_wait=0.05)
+    limiter.acquire("Bearer a")
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire("Bearer a")
+    assert limiter.stats()["queue_depth"] == {"interactive": 0, "bulk": 0}
+
+def test_upstream_429_pauses_the_key():
+    limiter = RateLimiter(global_rate=1000, global_burst=100, key_rate=10, key_burst=10)
+    limiter.penalize("Bearer a", 5)
+    assert not limiter.try_acquire("Bearer a")
+    assert limiter.try_acquire("Bearer b")
+    assert limiter.stats()["upstream_throttled"] == 1
+
+def test_disabled_limiter_never_waits():
+    limiter = RateLimiter(global_rate=0)
+    assert all(limiter.acquire("Bearer a") == 0.0 for _ in range(100))
+    assert limiter.try_acquire("Bearer a")
+
+@pytest.mark.parametrize("value, expected", [
+    (None, INTERACTIVE), ("", INTERACTIVE), ("interactive", INTERACTIVE),
+    ("bulk", BULK), (" Background ", BULK), ("batch", BULK),
+])
+def test_request_priority(value, expected):
+    assert request_priority(value) == expected
+
+def test_retry_after_seconds():
+    assert retry_after_seconds({"Retry-After": "3"}) == 3.0
+    assert retry_after_seconds({}) == 1.0
+    assert retry_after_seconds({"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}) == 1.0
@@ -0,0 +1,125 @@
+"""
+Cache des réponses : revalidation ETag des entrées expirées, générations
+d'écriture et second niveau sur disque
+"""
+
+import time
+
+import pytest
+
+import response_cache
+from disk_cache import DiskCache
+from response_cache import ResponseCache, etag_matches, keyed_values, storable
+
+PATH = "pages/abc"
+
+class FakeClock:
+    """Horloge du cache avancée à la main ; le temps réel suit, pour le cache disque"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.epoch = time.time() - self.now
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.epoch + self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(response_cache, "time", fake)
+    return fake
+
+def _key(path=PATH):
+    return ResponseCache.make_key(path, [], "Bearer t")
+
+def test_expired_entry_kept_for_revalidation(clock):
+    cache = ResponseCache(default_ttl=5)
+    cache.store(_key(), PATH, cache.generation(PATH), b'{"a": 1}', "application/json", '"v1"')
+
+    entry, fresh = cache.lookup(_key())
+    assert fresh and entry.body == b'{"a": 1}'
+
+    clock.now += 6
+    entry, fresh = cache.lookup(_key())
+    assert not fresh
+    # Expirée mais gardée : son ETag part en If-None-Match vers Node.js
+    assert entry.etag == '"v1"'
+
+    # 304 : l'entrée repart pour un TTL complet sans recopier le corps
+    assert cache.refresh(_key(), PATH) is entry
+    entry, fresh = cache.lookup(_key())
+    assert fresh and entry.body == b'{"a": 1}'
+    assert cache.stats()["revalidations"] == 1
+
+def test_write_during_read_is_not_cached(clock):
+    cache = ResponseCache(default_ttl=5)
+    generation = cache.generation(PATH)
+    # Écriture concurrente entre l'appel à Node.js et la mise en cache
+    cache.invalidate(f"{PATH}/children")
+    cache.store(_key(), PATH, generation, b"old", "application/json", '"v1"')
+    assert cache.lookup(_key()) == (None, False)
+
+def test_invalidate_drops_every_entry_of_the_resource(clock):
+    cache = ResponseCache(default_ttl=5)
+    for path in (PATH, f"{PATH}/properties/title", "pages/other"):
+        cache.store(_key(path), path, cache.generation(path), b"x", "application/json", None)
+
+    cache.invalidate(PATH)
+
+    assert cache.lookup(_key(PATH))[0] is None
+    assert cache.lookup(_key(f"{PATH}/properties/title"))[0] is None
+    assert cache.lookup(_key("pages/other"))[1]
+
+def test_disk_tier_survives_restart_and_revalidation(clock, tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = ResponseCache(default_ttl=5, disk=DiskCache(path))
+    cache.store(_key(), PATH, cache.generation(PATH), b"body", "application/json", '"v1"',
+                headers=(("Cache-Control", "max-age=60"),))
+
+    # Nouveau processus : mémoire vide, entrée relue du disque et remontée en mémoire
+    restarted = ResponseCache(default_ttl=5, disk=DiskCache(path))
+    entry, fresh = restarted.lookup(_key())
+    assert fresh and entry.body == b"body" and entry.etag == '"v1"'
+    assert entry.headers == (("Cache-Control", "max-age=60"),)
+    assert restarted.stats()["entries"] == 1
+
+    restarted.invalidate(PATH)
+    assert ResponseCache(default_ttl=5, disk=DiskCache(path)).lookup(_key()) == (None, False)
+
+@pytest.mark.parametrize("header, etag, expected", [
+    ('"v1"', '"v1"', True),
+    ('W/"v1"', '"v1"', True),
+    ('"v0", "v1"', 'W/"v1"', True),
+    ("*", '"v1"', True),
+    ('"v2"', '"v1"', False),
+    (None, '"v1"', False),
+    ('"v1"', None, False),
+])
+def test_etag_matches(header, etag, expected):
+    assert etag_matches(header, etag) is expected
+
+@pytest.mark.parametrize("cache_control, vary, expected", [
+    (None, None, True),
+    ("max-age=60", "Accept-Encoding", True),
+    ("public, max-age=60", "Accept-Encoding, Notion-Version", True),
+    ("no-store", None, False),
+    ("private, max-age=60", None, False),
+    ("no-cache", None, False),
+    ("max-age=0", None, False),
+    ("public, s-maxage=0", None, False),
+    (None, "Accept-Language", False),
+    (None, "*", False),
+])
+def test_storable(cache_control, vary, expected):
+    assert storable(cache_control, vary) is expected
+
+def test_key_distinguishes_notion_version():
+    def key(headers):
+        return ResponseCache.make_key(PATH, [], "Bearer t", None, keyed_values(headers))
+
+    assert key([("Notion-Version", "2022-06-28")]) == key([("notion-version", "2022-06-28")])
+    assert key([("Notion-Version", "2022-06-28")]) != key([("Notion-Version", "2025-09-03")])
+    assert key([]) != key([("Notion-Version", "2022-06-28")])
@@ -0,0 +1,119 @@
+"""
+Spool des écritures différées : nouvelles tentatives, état final et ordre
+par ressource. Les threads ne sont pas démarrés : le test réserve et
+exécute les écritures lui-même
+"""
+
+import time
+
+import pytest
+
+from write_spool import WriteSpool, QUEUED, DONE, FAILED
+
+HEADERS = {"Authorization": "Bearer t", "Content-Type": "application/json"}
+
+class FakeNode:
+    """send() du spool : rejoue une liste de réponses (status, Retry-After) ou d'exceptions"""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = []
+
+    def __call__(self, method, path, query, headers, body):
+        self.calls.append((method, path, query, body))
+        outcome = self.outcomes.pop(0) if len(self.outcomes) > 1 else self.outcomes[0]
+        if isinstance(outcome, Exception):
+            raise outcome
+        status, retry_after = outcome if isinstance(outcome, tuple) else (outcome, None)
+        return status, "application/json", b'{"object": "page"}', retry_after
+
+def make_spool(tmp_path, send, **options):
+    options.setdefault("backoff_base", 0)
+    return WriteSpool(str(tmp_path / "spool.db"), send, **options)
+
+def drain(spool):
+    """Exécute les écritures prêtes jusqu'à ce qu'il n'y en ait plus"""
+    while True:
+        row = spool._claim()
+        if row is None:
+            return
+        spool._process(row)
+
+def test_retried_until_done(tmp_path):
+    node = FakeNode(503, 502, 200)
+    spool = make_spool(tmp_path, node)
+    job_id = spool.enqueue("PATCH", "pages/abc", [("x", "1")], HEADERS, b'{"archived": true}', "rid-1")
+
+    drain(spool)
+
+    job = spool.get(job_id)
+    assert job["status"] == DONE
+    assert job["attempts"] == 3
+    assert job["response_status"] == 200
+    assert job["response_body"] == b'{"object": "page"}'
+    assert job["error"] is None
+    assert job["request_id"] == "rid-1"
+    assert node.calls == [("PATCH", "pages/abc", [("x", "1")], b'{"archived": true}')] * 3
+
+def test_client_error_fails_without_retry(tmp_path):
+    node = FakeNode(400)
+    spool = make_spool(tmp_path, node)
+    job_id = spool.enqueue("POST", "pages", [], HEADERS, b"{}")
+
+    drain(spool)
+
+    job = spool.get(job_id)
+    assert job["status"] == FAILED
+    assert job["attempts"] == 1
+    assert job["error"] == "HTTP 400"
+    assert len(node.calls) == 1
+
+def test_gives_up_after_max_attempts(tmp_path):
+    node = FakeNode(ConnectionError("refused"))
+    spool = make_spool(tmp_path, node, max_attempts=3)
+    job_id = spool.enqueue("DELETE", "blocks/abc", [], HEADERS, None)
+
+    drain(spool)
+
+    job = spool.get(job_id)
+    assert job["status"] == FAILED
+    assert job["attempts"] == 3
+    assert job["error"] == "ConnectionError: refused après 3 tentatives"
+
+def test_retry_after_delays_next_attempt(tmp_path):
+    spool = make_spool(tmp_path, FakeNode((429, 30), 200))
+    job_id = spool.enqueue("PATCH", "pages/abc", [], HEADERS, b"{}")
+
+    before = time.time()
+    drain(spool)
+
+    job = spool.get(job_id)
+    assert job["status"] == QUEUED
+    assert job["next_attempt_at"] >= before + 30
+    assert spool._claim() is None
+
+def test_writes_to_one_resource_stay_in_order(tmp_path):
+    node = FakeNode(503, 200)
+    spool = make_spool(tmp_path, node, backoff_base=60)
+    first = spool.enqueue("PATCH", "pages/abc", [], HEADERS, b"1")
+    second = spool.enqueue("PATCH", "pages/abc/properties/title", [], HEADERS, b"2")
+    other = spool.enqueue("PATCH", "pages/other", [], HEADERS, b"3")
+
+    drain(spool)
+
+    # La première est en attente de nouvel essai : la seconde (même page) attend derrière elle
+    assert spool.get(first)["status"] == QUEUED
+    assert spool.get(second)["status"] == QUEUED
+    assert spool.get(second)["attempts"] == 0
+    assert spool.get(other)["status"] == DONE
+    assert spool.stats()["jobs"] == {QUEUED: 2, "running": 0, DONE: 1, FAILED: 0}
+
+@pytest.mark.parametrize("status", [409, 429, 500, 502, 503, 504])
+def test_transient_statuses_are_retried(tmp_path, status):
+    spool = make_spool(tmp_path, FakeNode(status, 200))
+    job_id = spool.enqueue("PATCH", "pages/abc", [], HEADERS, b"{}")
+
+    drain(spool)
+
+    assert spool.get(job_id)["status"] == DONE
+    assert spool.get(job_id)["attempts"] == 2